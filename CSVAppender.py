@@ -0,0 +1,239 @@
+"""
+Buffered appender for the monthly <month><YYYY><suffix> logs in envdata_directory. BinaryAppender (EnvBinary.py) uses the same batching for binary logs.
+The file of the current month stays open and rows are kept in memory, then written with a single write every flush_interval seconds, so the SD card sees few, larger writes.
+The appender opens the next month's file itself and writes the header only to an empty file. A row torn by a crash or power loss is cut off when the file is reopened, so a restart neither repeats the header nor leaves half a row.
+fsync policies:
+    never - leave writing to disk to the operating system
+    flush - fsync each time rows are written, at most flush_interval seconds of rows are lost at power loss
+    close - fsync when a month's file is closed at rollover or exit
+"""
+import os
+import time
+import datetime
+import threading
+import collections
+from EnvQuery import IndexPath, LoadIndex
+from EnvArchive import HoldLog, ReleaseLog, MonthLogs, OpenLog
+
+#fsync policies
+FSYNC_NEVER = 'never'
+FSYNC_FLUSH = 'flush'
+FSYNC_CLOSE = 'close'
+
+def TrimTornRow(path):
+    """
+    Cut a partial last row (no trailing newline) off the end of a file. Returns the number of bytes removed.
+    """
+    with open(path, 'rb+') as fin:
+        size = fin.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:                                                          #search backwards for the last newline, a block at a time
+            start = max(end - 4096, 0)
+            fin.seek(start)
+            block = fin.read(end - start)
+            if end == size and block.endswith(b'\n'):
+                return 0
+            newline = block.rfind(b'\n')
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        fin.truncate(end)
+    return size - end
+
+def LastRowTime(path):
+    """
+    Time of the last complete row of a plain or compressed log (EnvArchive.py) in seconds since epoch, 0 if the file has no rows
+    """
+    if not os.path.isfile(path):
+        return 0
+    if path.endswith('.env.csv'):
+        with open(path, 'rb') as fin:
+            size = fin.seek(0, os.SEEK_END)
+            fin.seek(max(size - 4096, 0))
+            lines = fin.read().decode('ascii', 'replace').split('\n')[:-1]      #last element is empty or a torn row
+    else:                                                                       #compressed logs are only read forwards
+        with OpenLog(path) as fin:
+            lines = [line for line in collections.deque(fin, 2) if line.endswith('\n')]
+    for line in reversed(lines):
+        try:
+            return time.mktime(datetime.datetime.strptime(line.split(',')[0], "%Y-%m-%d %H:%M:%S").timetuple())
+        except ValueError:                                                      #header
+            continue
+    return 0
+
+class CSVAppender:
+    """
+    Appends rows to <directory>/<month><YYYY><suffix>, starting each new file with header. Rows are written at least every flush_interval seconds (0 writes every row).
+    index_interval keeps the sidecar index of EnvQuery.py up to date with an entry every index_interval seconds, 0 for no index.
+    """
+    def __init__(self, directory, suffix, header, flush_interval=0, fsync=FSYNC_FLUSH, index_interval=0):
+        if fsync not in (FSYNC_NEVER, FSYNC_FLUSH, FSYNC_CLOSE):
+            raise ValueError('Unknown fsync policy '+str(fsync)+', use '+FSYNC_NEVER+', '+FSYNC_FLUSH+' or '+FSYNC_CLOSE)
+        self.directory = directory
+        self.suffix = suffix
+        self.header = header
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.lock = threading.Lock()                                            #close() may be called from another thread at exit
+        self.monthYYYY = None                                                   #month of the open file
+        self.envfile = None
+        self.path = None                                                        #path of the open file, held against archiving
+        self.rows = []                                                          #rows not yet written
+        self.flushed = time.monotonic()
+        self.replayed = None                                                    #month: last_time when replaying started, None when not replaying
+        self.index_interval = index_interval
+        self.indexfile = None
+        self.indexrows = []                                                     #index entries not yet written
+        self.indexed = None                                                     #index interval of the last entry
+        self.offset = 0                                                         #byte offset of the next row, including queued rows
+
+    def filename(self, monthYYYY):
+        """
+        Path of the log file for a month
+        """
+        return self.directory+'/'+monthYYYY+self.suffix
+
+    def rollover(self, timestamp):
+        """
+        Make sure the file for the month of timestamp (seconds since epoch) is open, writing out and closing the previous month's file
+        """
+        monthYYYY = time.strftime("%B%Y", time.localtime(timestamp))
+        if monthYYYY == self.monthYYYY:
+            return
+        with self.lock:
+            self.close_file()
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            HoldLog(self.filename(monthYYYY))                                   #waits while the archiver compresses the file
+            try:
+                self.envfile = self.openfile(self.filename(monthYYYY))
+            except Exception:
+                ReleaseLog(self.filename(monthYYYY))
+                raise
+            self.path = self.filename(monthYYYY)
+            if self.index_interval:
+                self.openindex(self.filename(monthYYYY))
+            self.monthYYYY = monthYYYY
+
+    def openindex(self, path):
+        """
+        Open the sidecar index of a log for appending, rebuilding it if it is missing or stale
+        """
+        entries = LoadIndex(path, self.index_interval)
+        self.offset = os.path.getsize(path)
+        self.indexed = None
+        if entries:
+            self.indexed = int(time.mktime(datetime.datetime.strptime(entries[-1][0], "%Y-%m-%d %H:%M:%S").timetuple())//self.index_interval)
+        self.indexfile = open(IndexPath(path), 'a')
+
+    def openfile(self, path):
+        """
+        Open a log file for appending, trimming a torn row and writing the header to an empty file
+        """
+        if os.path.isfile(path) and TrimTornRow(path):
+            print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Removed a partial row from the end of '+path)
+        envfile = open(path, 'a')
+        if envfile.tell() == 0:                                                 #new or empty file
+            envfile.write(self.header+'\n')                                     #write header
+            envfile.flush()
+        return envfile
+
+    @property
+    def replaying(self):
+        """
+        True while replaying journaled samples (SampleJournal.py), rows already in the log are skipped, see replay_time
+        """
+        return self.replayed is not None
+
+    @replaying.setter
+    def replaying(self, replaying):
+        self.replayed = {} if replaying else None
+
+    def last_time(self, timestamp):
+        """
+        Time of the last row written to the log of the month of timestamp, including a log already archived (EnvArchive.py)
+        """
+        for path in reversed(MonthLogs(self.directory, time.strftime("%B%Y", time.localtime(timestamp)), self.suffix)):
+            last = LastRowTime(path)
+            if last:
+                return last
+        return 0
+
+    def replay_time(self, timestamp):
+        """
+        last_time of the month of timestamp when the replay started, the log is read once per month and replay
+        """
+        monthYYYY = time.strftime("%B%Y", time.localtime(timestamp))
+        if monthYYYY not in self.replayed:
+            self.replayed[monthYYYY] = self.last_time(timestamp)
+        return self.replayed[monthYYYY]
+
+    def append(self, timestamp, row):
+        """
+        Queue a row measured at timestamp (seconds since epoch). row is the text following the time, starting with a comma.
+        While replaying, rows no newer than the last row in the log are skipped.
+        """
+        if self.replaying and int(timestamp) <= self.replay_time(timestamp):    #rows are timed to the second
+            return
+        self.rollover(timestamp)
+        with self.lock:
+            row = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))+row+'\n'
+            if self.index_interval:
+                if int(timestamp//self.index_interval) != self.indexed:         #first row of an index interval
+                    self.indexed = int(timestamp//self.index_interval)
+                    self.indexrows.append(row[:19]+','+str(self.offset)+'\n')
+                self.offset += len(row.encode('ascii'))
+            self.rows.append(row)
+            if time.monotonic() - self.flushed >= self.flush_interval:
+                self.flush_rows()
+
+    def flush(self):
+        """
+        Write out queued rows now
+        """
+        with self.lock:
+            self.flush_rows()
+
+    def flush_rows(self):
+        """
+        Write queued rows with a single write, caller holds the lock
+        """
+        self.flushed = time.monotonic()
+        if not self.rows or self.envfile is None:
+            return
+        self.envfile.write(self.rows[0][:0].join(self.rows))                    #rows are str, or bytes for binary logs
+        self.envfile.flush()
+        self.rows = []                                                          #kept for the next attempt if the write failed
+        if self.fsync == FSYNC_FLUSH:
+            os.fsync(self.envfile.fileno())
+        if self.indexrows:                                                      #after the rows, an entry never points past the end of the log
+            self.indexfile.write(''.join(self.indexrows))
+            self.indexfile.flush()
+            self.indexrows = []
+
+    def close_file(self):
+        """
+        Write out queued rows and close the open file, caller holds the lock
+        """
+        if self.envfile is None:
+            return
+        self.flush_rows()
+        if self.fsync != FSYNC_NEVER:
+            os.fsync(self.envfile.fileno())
+        self.envfile.close()
+        self.envfile = None
+        ReleaseLog(self.path)
+        self.path = None
+        if self.indexfile is not None:
+            self.indexfile.close()
+            self.indexfile = None
+        self.monthYYYY = None
+
+    def close(self):
+        """
+        Write out queued rows and close the file, e.g. at exit. Rows appended afterwards are written straight away.
+        """
+        with self.lock:
+            self.close_file()
+            self.flush_interval = 0                                             #a stage may still be running
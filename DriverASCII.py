@@ -0,0 +1,48 @@
+"""
+Sensor driver for plain serial sensors that answer a text command with a line holding temperature (deg. C) and humidity (%RH), in that order, e.g. 'T=20.12 RH=41.3'.
+Set in the sensor of SensorList.py:
+    'command'  - text sent to request a reading, {address} is replaced by the sensor's address, e.g. '{address}R\r\n'. Leave empty for sensors that report continuously
+    'baudrate' - (optional) default 9600
+    'timeout'  - (optional) seconds to wait for the answer, default 2
+"""
+import re
+import time
+import serial                                                                   #pyserial
+from InstrInterface import EnvReading
+
+NUMBER = re.compile(r'[-+]?\d+(?:\.\d*)?')
+
+def Connect(port, address, sensor):
+    """
+    Open the serial port
+    """
+    print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Connecting to serial instrument '+str(address)+' on '+port+'...')
+    return serial.Serial(port, sensor.get('baudrate', 9600), timeout=sensor.get('timeout', 2))
+
+def Read(instr_obj, sensor):
+    """
+    Send the command and parse the first two numbers of the answer
+    """
+    command = sensor.get('command', '').format(address=sensor['address'])
+    if command:
+        instr_obj.reset_input_buffer()
+        instr_obj.write(command.encode('ascii'))
+    line = instr_obj.readline().decode('ascii', 'replace')
+    numbers = NUMBER.findall(line)
+    if len(numbers) < 2:
+        raise IOError('Unexpected answer from serial instrument: '+repr(line))
+    return EnvReading(round(float(numbers[0]), 4), round(float(numbers[1]), 4), tuple(numbers[:2]), time.time())
+
+def Clear(instr_obj, sensor):
+    """
+    Discard anything left in the serial buffers
+    """
+    instr_obj.reset_input_buffer()
+    instr_obj.reset_output_buffer()
+    return instr_obj
+
+def Disconnect(instr_obj, sensor):
+    """
+    Close the serial port
+    """
+    instr_obj.close()
@@ -0,0 +1,29 @@
+"""
+Sensor driver for the Comet T3311, and other modbus RTU sensors with a register map in RegisterMaps.py (sensor model).
+"""
+from InstrInterface import ConnectInstr, DisconnectInstr, ReadEnvironment, ClearInstr
+from RegisterMaps import registermaps
+
+def Connect(port, address, sensor):
+    """
+    Connect to the instrument at modbus slave address
+    """
+    return ConnectInstr(port, address)
+
+def Read(instr_obj, sensor):
+    """
+    Read temperature and humidity in one modbus transaction
+    """
+    return ReadEnvironment(instr_obj, registermaps[sensor['model']])
+
+def Clear(instr_obj, sensor):
+    """
+    Toggle the baud rate to clear the instrument buffer
+    """
+    return ClearInstr(instr_obj)
+
+def Disconnect(instr_obj, sensor):
+    """
+    Close the serial port, e.g. of an unplugged USB adapter
+    """
+    DisconnectInstr(instr_obj)
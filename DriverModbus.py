@@ -0,0 +1,38 @@
+"""
+Sensor driver for a generic modbus RTU sensor.
+Registers are described by the sensor model in RegisterMaps.py, the serial line by optional 'baudrate' (default 9600) and 'timeout' (seconds, default 1) keys of the sensor in SensorList.py.
+"""
+import time
+import minimalmodbus                                                            #for modbus RTU protocols
+from InstrInterface import ReadEnvironment
+from RegisterMaps import registermaps
+
+def Connect(port, address, sensor):
+    """
+    Open the serial port and address the sensor at modbus slave address
+    """
+    print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Connecting to modbus instrument '+str(address)+' on '+port+'...')
+    instr_obj = minimalmodbus.Instrument(port, address)
+    instr_obj.serial.baudrate = sensor.get('baudrate', 9600)
+    instr_obj.serial.timeout = sensor.get('timeout', 1)
+    return instr_obj
+
+def Read(instr_obj, sensor):
+    """
+    Read temperature and humidity in one modbus transaction
+    """
+    return ReadEnvironment(instr_obj, registermaps[sensor['model']])
+
+def Clear(instr_obj, sensor):
+    """
+    Discard anything left in the serial buffers
+    """
+    instr_obj.serial.reset_input_buffer()
+    instr_obj.serial.reset_output_buffer()
+    return instr_obj
+
+def Disconnect(instr_obj, sensor):
+    """
+    Close the serial port, shared by every sensor on the bus
+    """
+    instr_obj.serial.close()
@@ -0,0 +1,28 @@
+"""
+Sensor driver for the simulated sensor of InstrSimulator.py, selected for any 'sim:<scenario>' port.
+"""
+from InstrInterface import ReadEnvironment, ClearInstr
+from InstrSimulator import ConnectSimulator
+from RegisterMaps import registermaps
+
+instruments = {}                                                                #(port, address): SimulatedInstrument, reconnecting keeps the scenario's clock
+
+def Connect(port, address, sensor):
+    """
+    Build the simulated instrument for the scenario of the port, encoding registers as the sensor's model does, or return the one already built
+    """
+    if (port, address) not in instruments:
+        instruments[(port, address)] = ConnectSimulator(port, address, sensor['model'])
+    return instruments[(port, address)]
+
+def Read(instr_obj, sensor):
+    """
+    Read temperature and humidity in one simulated modbus transaction
+    """
+    return ReadEnvironment(instr_obj, registermaps[sensor['model']])
+
+def Clear(instr_obj, sensor):
+    """
+    Toggle the simulated baud rate, as for the Comet T3311
+    """
+    return ClearInstr(instr_obj)
@@ -0,0 +1,185 @@
+"""
+Compresses the .env.csv logs of closed months in envdata_directory, and reads plain and compressed logs alike.
+Archiver is a low priority background thread that compresses every <month><YYYY><suffix>.env.csv of a month before the current one, including the logs of additional sensors in subdirectories, to .env.csv.gz (gzip) or .env.csv.xz (lzma), then removes the plain file.
+A log still held open by an appender (CSVAppender.py), e.g. a log that only rolls over to the new month at its next row, is skipped until a later run, and an appender opening a log waits while it is being compressed, so no rows are written to a removed file.
+If rows of an archived month are written later (e.g. samples recovered from the journal) they are appended to the archive the next time the archiver runs.
+ReadRows(envdata_directory, 'July2017') streams the rows of a month as lists of strings whichever way it is stored.
+Run this file to archive closed months now: python3 EnvArchive.py <envdata_directory> <gzip or lzma>
+"""
+import os
+import sys
+import gzip
+import lzma
+import time
+import datetime
+import threading
+
+CODECS = {'gzip': ('.gz', gzip.open), 'lzma': ('.xz', lzma.open)}
+CHUNK = 1 << 16                                                                 #bytes compressed at a time
+held = {}                                                                       #path: number of appenders holding the plain log open
+claimed = set()                                                                 #paths being compressed
+held_lock = threading.Condition()
+
+def HoldLog(path):
+    """
+    Register a plain log as open for appending, waiting while it is being compressed
+    """
+    path = os.path.abspath(path)
+    with held_lock:
+        while path in claimed:
+            held_lock.wait()
+        held[path] = held.get(path, 0) + 1
+
+def ReleaseLog(path):
+    """
+    Register a plain log as closed by an appender
+    """
+    path = os.path.abspath(path)
+    with held_lock:
+        held[path] -= 1
+        if not held[path]:
+            del held[path]
+
+def ClaimLog(path):
+    """
+    Reserve a plain log for compressing, False if an appender holds it open. Call UnclaimLog(path) when done.
+    """
+    path = os.path.abspath(path)
+    with held_lock:
+        if path in held:
+            return False
+        claimed.add(path)
+        return True
+
+def UnclaimLog(path):
+    """
+    Let appenders open a log again after compressing
+    """
+    with held_lock:
+        claimed.discard(os.path.abspath(path))
+        held_lock.notify_all()
+
+def LogMonth(filename):
+    """
+    First day of the month of a <month><YYYY>-<kind>.env.csv filename, None for other files
+    """
+    if not filename.endswith('.env.csv'):
+        return None
+    try:
+        return datetime.datetime.strptime(filename.split('-')[0], "%B%Y")
+    except ValueError:
+        return None
+
+def ClosedLogs(directory, now=None):
+    """
+    Paths of the plain .env.csv logs of months before the month of now (seconds since epoch), in directory and its subdirectories
+    """
+    thismonth = datetime.datetime.fromtimestamp(time.time() if now is None else now).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    closed = []
+    for root, dirnames, filenames in os.walk(directory):
+        for filename in filenames:
+            month = LogMonth(filename)
+            if (month is not None) and (month < thismonth):
+                closed.append(os.path.join(root, filename))
+    return sorted(closed)
+
+def Compress(path, codec='gzip', pause=0.01):
+    """
+    Compress a plain log to <path>.gz or <path>.xz and remove it. Rows are appended if the archive already exists.
+    pause seconds are slept between chunks so the archiver yields to sampling. Returns the archive path.
+    """
+    extension, opener = CODECS[codec]
+    archive = path+extension
+    partial = archive+'.part'
+    if os.path.isfile(partial):                                                 #left by a crash
+        os.remove(partial)
+    if os.path.isfile(archive):                                                 #start from the existing archive, compressed streams can be concatenated
+        with open(archive, 'rb') as fin, open(partial, 'wb') as fout:
+            while True:
+                chunk = fin.read(CHUNK)
+                if not chunk:
+                    break
+                fout.write(chunk)
+    with open(path, 'rb') as fin, opener(partial, 'ab') as fout:
+        if os.path.isfile(archive):
+            fin.readline()                                                      #header is already in the archive
+        while True:
+            chunk = fin.read(CHUNK)
+            if not chunk:
+                break
+            fout.write(chunk)
+            time.sleep(pause)
+    with open(partial, 'rb') as fin:
+        os.fsync(fin.fileno())
+    os.replace(partial, archive)                                                #a crash leaves the plain log in place
+    os.remove(path)
+    if os.path.isfile(path+'.idx'):                                             #sidecar index of EnvQuery.py, archives are streamed
+        os.remove(path+'.idx')
+    return archive
+
+def MonthLogs(directory, monthYYYY, suffix='-all.env.csv'):
+    """
+    Paths holding the log of a month, archive first then plain file, the plain file holds any rows written after archiving
+    """
+    path = directory+'/'+monthYYYY+suffix
+    return [path+extension for extension, opener in CODECS.values() if os.path.isfile(path+extension)] + ([path] if os.path.isfile(path) else [])
+
+def OpenLog(path):
+    """
+    Open a plain or compressed log for reading text
+    """
+    for extension, opener in CODECS.values():
+        if path.endswith(extension):
+            return opener(path, 'rt')
+    return open(path, 'r')
+
+def ReadRows(directory, monthYYYY, suffix='-all.env.csv'):
+    """
+    Stream the rows of a month's log as lists of strings, without the header, from plain and compressed logs alike
+    """
+    for path in MonthLogs(directory, monthYYYY, suffix):
+        with OpenLog(path) as fin:
+            fin.readline()                                                      #skip header
+            for line in fin:
+                if line.endswith('\n'):                                         #skip a torn last row
+                    yield line.rstrip('\n').split(',')
+
+class Archiver(threading.Thread):
+    """
+    Background thread compressing closed months in directory with codec every interval hours, at the lowest scheduling priority
+    """
+    def __init__(self, directory, codec='gzip', interval=24):
+        if codec not in CODECS:
+            raise ValueError('Unknown archive codec '+str(codec)+', use one of '+', '.join(sorted(CODECS)))
+        threading.Thread.__init__(self, name='LEMAS archiver', daemon=True)
+        self.directory = directory
+        self.codec = codec
+        self.interval = interval
+
+    def run(self):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)      #on Linux this lowers only this thread
+        except (AttributeError, OSError):                                       #not available on this platform
+            pass
+        while True:
+            for path in ClosedLogs(self.directory):
+                if not ClaimLog(path):                                          #still open in an appender, archived on a later run
+                    continue
+                try:
+                    size = os.path.getsize(path)
+                    archive = Compress(path, self.codec)
+                    print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Archived '+path+' (%d kB to %d kB)' % (size/1024, os.path.getsize(archive)/1024))
+                except Exception as err:
+                    print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Error archiving '+path+': '+repr(err))
+                finally:
+                    UnclaimLog(path)
+            time.sleep(self.interval*3600)
+
+if __name__ == '__main__':
+    directory = sys.argv[1] if len(sys.argv) > 1 else '.'
+    codec = sys.argv[2] if len(sys.argv) > 2 else 'gzip'
+    for path in ClosedLogs(directory):
+        size = os.path.getsize(path)
+        tstart = time.monotonic()
+        archive = Compress(path, codec, pause=0)
+        print(archive+': %d kB to %d kB in %.2f s' % (size/1024, os.path.getsize(archive)/1024, time.monotonic() - tstart))
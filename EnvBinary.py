@@ -0,0 +1,133 @@
+"""
+Binary columnar storage of environment history, <month><YYYY>-all.env.bin next to the .env.csv files in envdata_directory.
+A file is a 16 byte header (magic, format version, record size) followed by fixed width little-endian records:
+    time        - float64, seconds since epoch
+    temperature - float32, deg. C, nan for gaps
+    humidity    - float32, %RH, nan for gaps
+    flags       - uint32, sample flag bits of Pipeline.py (spikes, gaps)
+Records are only ever appended, a record torn by a crash is dropped when the file is reopened or loaded.
+LoadBinary maps a file as a numpy record array without reading or parsing it, e.g. LoadBinary(path)['temperature'].
+Convert existing logs: python3 EnvBinary.py <file.env.csv> (writes <file.env.bin>) or python3 EnvBinary.py <file.env.bin> (writes <file.env.csv>)
+"""
+import os
+import sys
+import time
+import math
+import struct
+import datetime
+import numpy as np
+from CSVAppender import CSVAppender, FSYNC_FLUSH
+from Pipeline import FLAG_GAP
+
+MAGIC = b'LEMASENV'
+VERSION = 1
+RECORD = np.dtype([('time', '<f8'), ('temperature', '<f4'), ('humidity', '<f4'), ('flags', '<u4')])
+PACKER = struct.Struct('<dffI')                                                 #same layout as RECORD
+HEADER = struct.Struct('<8sII')                                                 #magic, version, record size
+
+def ReadHeader(path):
+    """
+    Check the header of a binary log. Returns the number of whole records in the file.
+    """
+    with open(path, 'rb') as fin:
+        magic, version, recordsize = HEADER.unpack(fin.read(HEADER.size))
+        size = fin.seek(0, os.SEEK_END)
+    if (magic != MAGIC) or (version != VERSION) or (recordsize != RECORD.itemsize):
+        raise ValueError(path+' is not a LEMAS binary log of version '+str(VERSION))
+    return (size - HEADER.size)//RECORD.itemsize
+
+def LoadBinary(path):
+    """
+    Map a binary log read-only as a numpy record array with fields time, temperature, humidity and flags. Nothing is copied until used.
+    """
+    nrecords = ReadHeader(path)
+    if nrecords == 0:
+        return np.zeros(0, dtype=RECORD)
+    return np.memmap(path, dtype=RECORD, mode='r', offset=HEADER.size, shape=(nrecords,))
+
+class BinaryAppender(CSVAppender):
+    """
+    Appends records to <directory>/<month><YYYY><suffix> like CSVAppender, with the same batching, rollover and fsync policies
+    """
+    def __init__(self, directory, suffix='-all.env.bin', flush_interval=0, fsync=FSYNC_FLUSH):
+        CSVAppender.__init__(self, directory, suffix, HEADER.pack(MAGIC, VERSION, RECORD.itemsize), flush_interval, fsync)
+
+    def openfile(self, path):
+        """
+        Open a binary log for appending, dropping a torn record and writing the header to an empty file
+        """
+        if os.path.isfile(path) and 0 < os.path.getsize(path) < HEADER.size:   #torn header
+            os.truncate(path, 0)
+        if os.path.isfile(path) and os.path.getsize(path) > 0:
+            end = HEADER.size + ReadHeader(path)*RECORD.itemsize
+            if os.path.getsize(path) > end:
+                print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Removed a partial record from the end of '+path)
+                os.truncate(path, end)
+        envfile = open(path, 'ab')
+        if envfile.tell() == 0:                                                 #new or empty file
+            envfile.write(self.header)
+            envfile.flush()
+        return envfile
+
+    def last_time(self, timestamp):
+        """
+        Time of the last record written to the file of the month of timestamp, 0 if there is none
+        """
+        path = self.filename(time.strftime("%B%Y", time.localtime(timestamp)))
+        if not os.path.isfile(path) or os.path.getsize(path) < HEADER.size + RECORD.itemsize:
+            return 0
+        return float(LoadBinary(path)['time'][-1])
+
+    def append(self, timestamp, temperature, humidity, flags=0):
+        """
+        Queue a record measured at timestamp (seconds since epoch). While replaying, records no newer than the last record in the file are skipped.
+        """
+        if self.replaying and timestamp <= self.replay_time(timestamp):
+            return
+        self.rollover(timestamp)
+        with self.lock:
+            self.rows.append(PACKER.pack(timestamp, temperature, humidity, flags))
+            if time.monotonic() - self.flushed >= self.flush_interval:
+                self.flush_rows()
+
+def CSVToBinary(csvpath, binpath):
+    """
+    Convert a <month><YYYY>-all.env.csv log to a binary log. Missed readings (nan) are flagged as gaps. Returns the number of records.
+    """
+    records = []
+    with open(csvpath) as fin:
+        fin.readline()                                                          #skip header
+        for line in fin:
+            fields = line.strip().split(',')
+            if len(fields) < 3:                                                 #blank or torn row
+                continue
+            timestamp = time.mktime(datetime.datetime.strptime(fields[0], "%Y-%m-%d %H:%M:%S").timetuple())
+            temperature, humidity = float(fields[1]), float(fields[2])
+            records.append((timestamp, temperature, humidity, FLAG_GAP if math.isnan(temperature) or math.isnan(humidity) else 0))
+    with open(binpath, 'wb') as fout:
+        fout.write(HEADER.pack(MAGIC, VERSION, RECORD.itemsize))
+        fout.write(np.array(records, dtype=RECORD).tobytes())
+    return len(records)
+
+def BinaryToCSV(binpath, csvpath):
+    """
+    Convert a binary log to the <month><YYYY>-all.env.csv layout. Returns the number of rows.
+    """
+    records = LoadBinary(binpath)
+    with open(csvpath, 'w') as fout:
+        fout.write('time,Temperature (deg. C),Humidity (%RH)\n')                #write header
+        for record in records:
+            fout.write(time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record['time']))+','+str(round(float(record['temperature']), 4))+','+str(round(float(record['humidity']), 4))+'\n')
+    return len(records)
+
+if __name__ == '__main__':
+    for path in sys.argv[1:]:
+        converted = path[:-4]+('.bin' if path.endswith('.csv') else '.csv')
+        if not path.endswith(('.csv', '.bin')):
+            print(path+': use a .env.csv or .env.bin file')
+        elif os.path.exists(converted):                                         #never overwrite a log
+            print(path+': '+converted+' already exists')
+        elif path.endswith('.csv'):
+            print(path+': '+str(CSVToBinary(path, converted))+' records')
+        else:
+            print(path+': '+str(BinaryToCSV(path, converted))+' rows')
@@ -0,0 +1,158 @@
+"""
+SQLite storage of samples and outages, kept alongside the monthly .env.csv files so time ranges can be queried without parsing logs, e.g.
+    EnvDatabase(path).samples('219/G032', time.time() - 72*3600) - last 72 hours of a lab
+    EnvDatabase(path).outages(start=<start of quarter>)          - every outage this quarter
+The database is in WAL mode so queries from other processes do not block logging. Rows are queued in memory and inserted in one transaction every flush_interval seconds.
+Both tables are indexed on (labID, timestamp), timestamps are seconds since epoch.
+Run this file to benchmark inserts and queries: python3 EnvDatabase.py <database> <number of samples>
+"""
+import os
+import sys
+import time
+import sqlite3
+import threading
+
+SCHEMA = ['CREATE TABLE IF NOT EXISTS samples (labID TEXT NOT NULL, timestamp REAL NOT NULL, temperature REAL, humidity REAL, flags INTEGER NOT NULL DEFAULT 0)',
+          'CREATE INDEX IF NOT EXISTS samples_lab_time ON samples (labID, timestamp)',
+          'CREATE TABLE IF NOT EXISTS outages (labID TEXT NOT NULL, timestamp REAL NOT NULL, temperature REAL, humidity REAL, Toutage INTEGER NOT NULL, RHoutage INTEGER NOT NULL)',
+          'CREATE INDEX IF NOT EXISTS outages_lab_time ON outages (labID, timestamp)']
+
+class EnvDatabase:
+    """
+    Connection to the database at path. Rows are inserted at least every flush_interval seconds (0 inserts every row).
+    """
+    def __init__(self, path, flush_interval=0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()                                            #shared by the storage stage, queries and close() at exit
+        if os.path.dirname(path) and not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')                      #readers never block the writer
+        self.connection.execute('PRAGMA synchronous=NORMAL')                    #in WAL mode, syncs at checkpoints instead of every commit
+        with self.connection:
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+        self.samplerows = []                                                    #rows not yet inserted
+        self.outagerows = []
+        self.flushed = time.monotonic()
+        self.replayed = None                                                    #(table, labID): last_time when replaying started, None when not replaying
+
+    @property
+    def replaying(self):
+        """
+        True while replaying journaled samples (SampleJournal.py), rows already stored are skipped, see replay_time
+        """
+        return self.replayed is not None
+
+    @replaying.setter
+    def replaying(self, replaying):
+        self.replayed = {} if replaying else None
+
+    def last_time(self, table, labID):
+        """
+        Time of the last row of labID stored in table ('samples' or 'outages'), 0 if there is none. Caller holds the lock.
+        """
+        return self.connection.execute('SELECT max(timestamp) FROM '+table+' WHERE labID = ?', (labID,)).fetchone()[0] or 0
+
+    def replay_time(self, table, labID):
+        """
+        last_time of table and labID when the replay started, so rows stored by the replay itself are not taken for rows stored before it. Caller holds the lock.
+        """
+        if (table, labID) not in self.replayed:
+            self.flush_rows()                                                   #rows queued before the replay count as stored
+            self.replayed[(table, labID)] = self.last_time(table, labID)
+        return self.replayed[(table, labID)]
+
+    def add_sample(self, labID, timestamp, temperature, humidity, flags=0):
+        """
+        Queue a sample, nan (gap) is stored as NULL. While replaying journaled samples (SampleJournal.py), samples no newer than the last stored one are skipped.
+        """
+        with self.lock:
+            if self.replaying and timestamp <= self.replay_time('samples', labID):
+                return
+            self.samplerows.append((labID, timestamp, None if temperature != temperature else temperature, None if humidity != humidity else humidity, flags))
+            self.flush_due()
+
+    def add_outage(self, labID, timestamp, temperature, humidity, Toutage, RHoutage):
+        """
+        Queue an out of range sample, Toutage and RHoutage are True for the quantities that are out. While replaying, outages no newer than the last stored one are skipped.
+        """
+        with self.lock:
+            if self.replaying and timestamp <= self.replay_time('outages', labID):
+                return
+            self.outagerows.append((labID, timestamp, temperature, humidity, int(Toutage), int(RHoutage)))
+            self.flush_due()
+
+    def flush_due(self):
+        """
+        Insert queued rows if flush_interval has passed, caller holds the lock
+        """
+        if time.monotonic() - self.flushed >= self.flush_interval:
+            self.flush_rows()
+
+    def flush(self):
+        """
+        Insert queued rows now
+        """
+        with self.lock:
+            self.flush_rows()
+
+    def flush_rows(self):
+        """
+        Insert queued rows in a single transaction, caller holds the lock
+        """
+        self.flushed = time.monotonic()
+        if not (self.samplerows or self.outagerows) or self.connection is None:
+            return
+        with self.connection:                                                   #commits, or rolls back and keeps the rows for the next attempt
+            self.connection.executemany('INSERT INTO samples VALUES (?, ?, ?, ?, ?)', self.samplerows)
+            self.connection.executemany('INSERT INTO outages VALUES (?, ?, ?, ?, ?, ?)', self.outagerows)
+        self.samplerows = []
+        self.outagerows = []
+
+    def samples(self, labID, start, end=None):
+        """
+        Samples of labID from start to end (seconds since epoch, end defaults to now) as a list of (timestamp, temperature, humidity, flags), gaps are None
+        """
+        with self.lock:
+            self.flush_rows()
+            return self.connection.execute('SELECT timestamp, temperature, humidity, flags FROM samples WHERE labID = ? AND timestamp BETWEEN ? AND ? ORDER BY timestamp',
+                                           (labID, start, time.time() if end is None else end)).fetchall()
+
+    def outages(self, labID=None, start=0, end=None):
+        """
+        Outages from start to end (seconds since epoch) as a list of (labID, timestamp, temperature, humidity, Toutage, RHoutage), of every lab if labID is None
+        """
+        end = time.time() if end is None else end
+        with self.lock:
+            self.flush_rows()
+            if labID is None:
+                return self.connection.execute('SELECT * FROM outages WHERE timestamp BETWEEN ? AND ? ORDER BY timestamp', (start, end)).fetchall()
+            return self.connection.execute('SELECT * FROM outages WHERE labID = ? AND timestamp BETWEEN ? AND ? ORDER BY timestamp', (labID, start, end)).fetchall()
+
+    def close(self):
+        """
+        Insert queued rows and close the database, e.g. at exit
+        """
+        with self.lock:
+            self.flush_rows()
+            if self.connection is not None:
+                self.connection.close()
+            self.connection = None                                              #a stage may still be running, later rows are not stored
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else 'benchmark.db'
+    nsamples = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    database = EnvDatabase(path, flush_interval=1)
+    tstart = time.monotonic()
+    now = time.time()
+    for isample in range(nsamples):                                             #one sample every 10 seconds up to now
+        database.add_sample('benchmark', now - (nsamples - isample)*10, 20 + (isample % 100)/100, 40.0)
+    database.flush()
+    elapsed = time.monotonic() - tstart
+    print('inserted '+str(nsamples)+' samples in %.2f s, %.0f samples/hr' % (elapsed, nsamples/elapsed*3600))
+    tstart = time.monotonic()
+    rows = database.samples('benchmark', now - 72*3600)
+    print('queried last 72 h, '+str(len(rows))+' samples in %.4f s' % (time.monotonic() - tstart))
+    database.close()
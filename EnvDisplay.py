@@ -0,0 +1,274 @@
+"""
+Temperature and humidity graphs of a rolling window (RingBuffer.py) that are built once and updated in place.
+EnvGraph creates the lines, control limit bands, labels and grid a single time. Each sample it only sets the line data, and changes the limits and ticks when they move.
+With blit=True (backends that support it) the lines and time labels are animated: when the limits and ticks are unchanged, the saved background is restored and only the lines and labels are drawn and blitted,
+so a window shifting by a sample, whose time labels change every time, is blitted too. Otherwise the whole figure is drawn and the background is saved again.
+Framebuffer copies a drawn figure straight to a Linux framebuffer device (e.g. /dev/fb0), for a screen attached to a node running without X.
+CompactImage shrinks a graph for MMS: a limited palette PNG, else JPEGs of falling quality and size, until it fits a carrier's byte budget.
+Run this file for the time per frame of the old full redraw and of EnvGraph, at 480 and 10000 points and for a week at 1 Hz in a MinMaxBuffer, and the size of the compact alert images: python3 EnvDisplay.py
+"""
+import io
+import os
+import math
+import time
+import numpy as np
+
+class EnvGraph:
+    """
+    Temperature graph on ax1 and humidity graph on ax2, ax2 shares its x-axis with ax1. Tlimits and RHlimits are the controls [<minimum>, <maximum>],
+    margins are [[graphTmin, graphTmax], [graphRHmin, graphRHmax]], fontsizes are (FontsizeLabel, FontsizeYticks, FontsizeXticks) and capacity the size of the window graphed.
+    There is a time tick every tickspacing_x points, or fewer so a full window has at most maxticks_x of them. Windows over a day long are labelled with the day as well.
+    The y limits are the window's minimum and maximum plus margins, widened to a multiple of 0.1.
+    """
+    def __init__(self, ax1, ax2, Tlimits, RHlimits, margins, capacity, linewidth=2.0, nticks_y=3, tickspacing_x=20, maxticks_x=24, fontsizes=(16, 5, 5), blit=False):
+        self.figure = ax1.figure
+        self.axes = [ax1, ax2]
+        self.channels = ['temperature', 'humidity']
+        self.margins = margins
+        self.nticks_y = nticks_y
+        self.tickspacing_x = max(tickspacing_x, math.ceil(capacity/maxticks_x))
+        self.fontsize_xticks = fontsizes[2]
+        self.blit = blit
+        self.x = np.arange(capacity, dtype=float)                               #x of every point, sliced for the points in the window
+        self.lines = []
+        for ax, limits, color, label in zip(self.axes, [Tlimits, RHlimits], ['r-', 'g-'], ['Temperature (deg. C)', 'Humidity (%RH) ']):
+            line, = ax.plot([], [], color, linewidth=linewidth, animated=blit)
+            self.lines.append(line)
+            ax.axhline(limits[0], color='b', linewidth=0.25)                    #controls, span the axes whatever the x-axis
+            ax.axhline(limits[1], color='b', linewidth=0.25)
+            ax.axhspan(-1000, limits[0], alpha=0.2, color='lightblue')
+            ax.axhspan(limits[1], 1000, alpha=0.2, color='lightblue')
+            ax.ticklabel_format(axis='y', style='plain', useOffset=False)       #disable scientific notation on y-axis
+            ax.grid(color='gray', alpha=0.3)
+            ax.text(0.05, 0.1, label, transform=ax.transAxes, alpha=0.5, fontsize=fontsizes[0], color='gray') #transparent text at the bottom left of the axes
+            ax.patch.set_facecolor('black')
+            ax.tick_params(axis='y', labelsize=fontsizes[1])
+        ax1.tick_params(axis='x', labelbottom=False)                            #hide tickmarks, will use shared axis
+        ax2.tick_params(axis='x', labelbottom=False)                            #time labels are texts of their own, the axis would draw tick labels into the background
+        self.xlabels = []                                                       #time labels under the ticks
+        self.view = None                                                        #limits and tick positions drawn
+        self.changed = True                                                     #the axes need drawing
+        self.background = None                                                  #figure without the lines, saved after each full draw
+        if blit:
+            self.figure.canvas.mpl_connect('draw_event', self.ondraw)
+
+    def update(self, window):
+        """
+        Set the lines to the RingBuffer window, changing limits and ticks only when they moved
+        """
+        npoints = len(window)
+        if npoints > len(self.x):                                               #a MinMaxBuffer's open bucket
+            self.x = np.arange(npoints, dtype=float)
+        for line, channel in zip(self.lines, self.channels):
+            line.set_data(self.x[:npoints], window[channel])
+        last = max(npoints - 1, 1)
+        xlim = (-0.05*last, 1.05*last)                                          #5% margins, as autoscaling would
+        xticks = range(0, npoints - 1, self.tickspacing_x)
+        xformat = "%H:%M\n%a" if npoints and (window['time'][-1] - window['time'][0] > 86400) else "%H:%M"
+        xlabels = tuple(time.strftime(xformat, time.localtime(window['time'][i])) for i in xticks)
+        ylims = []
+        for ax, channel, margins in zip(self.axes, self.channels, self.margins):
+            if math.isnan(window.min(channel)):                                 #nothing but gaps to graph, keep the limits
+                ylims.append(tuple(ax.get_ylim()))
+            else:
+                ylims.append((math.floor((window.min(channel) - margins[0])*10)/10, math.ceil((window.max(channel) + margins[1])*10)/10)) #on the 0.1 steps of the ticks, so they move rarely
+        view = (xlim, tuple(ylims), tuple(xticks))
+        if view != self.view:
+            self.view = view
+            self.changed = True
+            self.axes[1].set_xlim(xlim)
+            for ax, ylim in zip(self.axes, ylims):
+                ax.set_ylim(ylim)
+                ax.set_yticks(np.round(np.linspace(ylim[0], ylim[1], self.nticks_y), 1))
+            self.axes[1].set_xticks(list(xticks))
+            for label in self.xlabels[len(xticks):]:
+                label.remove()
+            del self.xlabels[len(xticks):]
+            for x in xticks[len(self.xlabels):]:
+                self.xlabels.append(self.axes[1].annotate('', (x, 0), xycoords=self.axes[1].get_xaxis_transform(), xytext=(0, -7), textcoords='offset points',
+                    rotation='vertical', ha='center', va='top', fontsize=self.fontsize_xticks, animated=self.blit)) #below the tick, as a tick label
+        for label, text in zip(self.xlabels, xlabels):
+            label.set_text(text)
+
+    def ondraw(self, event):
+        """
+        After a full draw, save the background and draw the animated lines and labels over it
+        """
+        canvas = self.figure.canvas
+        self.background = canvas.copy_from_bbox(self.figure.bbox)
+        self.draw_animated()
+
+    def draw_animated(self):
+        """
+        Draw the lines and time labels, which a full draw leaves out when blitting
+        """
+        for ax, line in zip(self.axes, self.lines):
+            ax.draw_artist(line)
+        for label in self.xlabels:
+            self.axes[1].draw_artist(label)
+
+    def draw(self):
+        """
+        Draw the update on the figure's canvas, blitting the lines and time labels alone when the limits and ticks are unchanged
+        """
+        canvas = self.figure.canvas
+        if self.blit and (self.background is not None) and not self.changed:
+            canvas.restore_region(self.background)
+            self.draw_animated()
+            canvas.blit(self.figure.bbox)
+        else:
+            canvas.draw()
+        self.changed = False
+
+class Framebuffer:
+    """
+    Linux framebuffer device, 16 (RGB565) or 32 (BGRA) bits per pixel. Its size and format are read from /sys/class/graphics.
+    """
+    def __init__(self, device='/dev/fb0'):
+        sysfs = '/sys/class/graphics/'+os.path.basename(device)+'/'
+        with open(sysfs+'virtual_size') as fin:
+            self.width, self.height = [int(value) for value in fin.read().split(',')]
+        with open(sysfs+'bits_per_pixel') as fin:
+            self.bits = int(fin.read())
+        with open(sysfs+'stride') as fin:
+            self.stride = int(fin.read())                                       #bytes per row of the screen
+        if self.bits not in (16, 32):
+            raise ValueError('Unsupported framebuffer format, '+str(self.bits)+' bits per pixel on '+device)
+        self.device = device
+
+    def show(self, figure):
+        """
+        Copy a figure drawn on an Agg canvas to the top left of the screen, cropped to the screen
+        """
+        rgba = np.asarray(figure.canvas.buffer_rgba())
+        height, width = min(rgba.shape[0], self.height), min(rgba.shape[1], self.width)
+        rgba = rgba[:height, :width]
+        if self.bits == 16:
+            pixels = ((rgba[..., 0].astype(np.uint16) >> 3) << 11) | ((rgba[..., 1].astype(np.uint16) >> 2) << 5) | (rgba[..., 2].astype(np.uint16) >> 3)
+        else:
+            pixels = rgba[..., [2, 1, 0, 3]]
+        rows = np.zeros((height, self.stride), dtype=np.uint8)
+        rows[:, :width*self.bits//8] = pixels.view(np.uint8).reshape(height, -1)
+        with open(self.device, 'r+b') as fout:
+            fout.write(rows.tobytes())
+
+def CompactImage(image, budget, colors=32, qualities=(85, 70, 55, 40), scale=0.75):
+    """
+    Image bytes (e.g. a PNG of a graph) re-encoded to at most budget bytes, as (bytes, MIME subtype). Tries a PNG of colors colors, then JPEGs of each quality,
+    then the same at scale times the size, and so on. If nothing fits before the image is under 100 pixels high, the smallest one tried is returned.
+    Without Pillow the PNG is returned as drawn.
+    """
+    try:
+        from PIL import Image                                                   #installed with matplotlib 3.3 and later
+    except ImportError:
+        return image, 'png'
+    picture = Image.open(io.BytesIO(image)).convert('RGB')
+    smallest = None
+    while True:
+        for subtype, options in [('png', {'optimize': True})] + [('jpeg', {'quality': quality, 'optimize': True}) for quality in qualities]:
+            buffer = io.BytesIO()
+            (picture.quantize(colors) if subtype == 'png' else picture).save(buffer, subtype.upper(), **options)
+            if len(buffer.getvalue()) <= budget:
+                return buffer.getvalue(), subtype
+            if (smallest is None) or (len(buffer.getvalue()) < len(smallest[0])):
+                smallest = (buffer.getvalue(), subtype)
+        if picture.height*scale < 100:
+            return smallest
+        picture = picture.resize((round(picture.width*scale), round(picture.height*scale)), Image.LANCZOS)
+
+if __name__ == '__main__':
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import matplotlib.gridspec as gridspec
+    from RingBuffer import RingBuffer, MinMaxBuffer, BucketSeconds
+    Tlimits, RHlimits, margins = [19.5, 20.5], [40, 50], [[0.5, 0.5], [1, 1]]
+
+    def NewFigure():
+        fig = plt.figure(figsize=(4.2, 2.2), dpi=190)
+        gs = gridspec.GridSpec(2, 1)
+        gs.update(hspace=0.07)
+        ax1 = fig.add_subplot(gs[0, :])
+        ax2 = fig.add_subplot(gs[1, :], sharex=ax1)
+        fig.subplots_adjust(left=0.06, right=1, top=0.98, bottom=0.14)
+        return fig, ax1, ax2
+
+    def Redraw(ax1, ax2, window):                                               #the full redraw EnvGraph replaces
+        for ax, channel, limits, margin, color in ((ax1, 'temperature', Tlimits, margins[0], 'r-'), (ax2, 'humidity', RHlimits, margins[1], 'g-')):
+            values = window[channel]
+            time_vec = range(len(values))
+            ax.cla()
+            ax.plot(time_vec, values, color, linewidth=2.0)
+            ax.plot(time_vec, np.zeros([len(time_vec),])+limits[0], 'b-', linewidth=0.25)
+            ax.plot(time_vec, np.zeros([len(time_vec),])+limits[1], 'b-', linewidth=0.25)
+            ax.fill_between(np.array(time_vec), np.zeros([len(time_vec),])+limits[0], np.zeros([len(time_vec),])-1000, alpha=0.2, color='lightblue')
+            ax.fill_between(np.array(time_vec), np.zeros([len(time_vec),])+limits[1], np.zeros([len(time_vec),])+1000, alpha=0.2, color='lightblue')
+            ax.set_ylim([np.nanmin(values)-margin[0], np.nanmax(values)+margin[1]])
+            ax.ticklabel_format(axis='y', style='plain', useOffset=False)
+            ax.grid(color='gray', alpha=0.3)
+            ax.text(0.05, 0.1, channel, transform=ax.transAxes, alpha=0.5, fontsize=16, color='gray')
+            ax.patch.set_facecolor('black')
+            ax.set_yticks(np.round(np.linspace(np.nanmin(values)-margin[0], np.nanmax(values)+margin[1], 3), 1))
+            ax.tick_params(axis='y', labelsize=5)
+        ax1.tick_params(axis='x', labelbottom=False)
+        xticks = np.arange(0, len(window) - 1, 20)
+        ax2.set_xticks(xticks)
+        ax2.set_xticklabels([time.strftime("%H:%M", time.localtime(window['time'][i])) for i in xticks], rotation='vertical', fontsize=5)
+        ax1.figure.canvas.draw()
+
+    for npoints, interval in [(480, 90), (10000, 1)]:                           #12 h at 40 pts/hr, about 3 h at 1 Hz
+        window = RingBuffer(npoints, 'temperature', 'humidity')
+        tstart = time.time() - 2*npoints*interval
+        for i in range(npoints):
+            window.append(tstart + i*interval, 20 + math.sin(i/200), 45 + 2*math.cos(i/300))
+        frames = 20
+        results = []
+        for name in ['full redraw', 'EnvGraph', 'EnvGraph blit']:
+            fig, ax1, ax2 = NewFigure()
+            graph = None if name == 'full redraw' else EnvGraph(ax1, ax2, Tlimits, RHlimits, margins, npoints, blit=name.endswith('blit'))
+            elapsed = 0
+            for i in range(npoints, npoints + frames + 1):
+                window.append(tstart + i*interval, 20 + math.sin(i/200), 45 + 2*math.cos(i/300))
+                tframe = time.perf_counter()
+                if graph is None:
+                    Redraw(ax1, ax2, window)
+                else:
+                    graph.update(window)
+                    graph.draw()
+                if i > npoints:                                                 #the first frame draws everything
+                    elapsed += time.perf_counter() - tframe
+            plt.close(fig)
+            results.append(name+' %.1f ms' % (elapsed/frames*1000))
+        print('%d points, one every %d s: ' % (npoints, interval)+', '.join(results))
+
+    seconds = BucketSeconds(7*86400, 1600)                                      #a week at 1 Hz, 604800 samples
+    buckets = MinMaxBuffer(2*math.ceil(7*86400/seconds), seconds, 'temperature', 'humidity')
+    tstart = time.time() - 7*86400
+    for i in range(7*86400):
+        buckets.append(tstart + i, 20 + math.sin(i/20000), 45 + 2*math.cos(i/30000))
+    fig, ax1, ax2 = NewFigure()
+    graph = EnvGraph(ax1, ax2, Tlimits, RHlimits, margins, buckets.capacity)
+    elapsed = 0
+    for i in range(7*86400, 7*86400 + frames + 1):
+        buckets.append(tstart + i, 20 + math.sin(i/20000), 45 + 2*math.cos(i/30000))
+        tframe = time.perf_counter()
+        graph.update(buckets)
+        graph.draw()
+        if i > 7*86400:
+            elapsed += time.perf_counter() - tframe
+    plt.close(fig)
+    print('%d samples, one every 1 s, in %d points of %d s buckets: EnvGraph %.1f ms' % (buckets.total, len(buckets), seconds, elapsed/frames*1000))
+
+    fig, ax1, ax2 = NewFigure()                                                 #last window, as an alert would attach it
+    graph = EnvGraph(ax1, ax2, Tlimits, RHlimits, margins, len(window))
+    graph.update(window)
+    for dpi in [190, 100]:                                                      #display and MMS profile
+        image = io.BytesIO()
+        fig.savefig(image, format='png', dpi=dpi)
+        jpeg = io.BytesIO()
+        fig.savefig(jpeg, format='jpg', dpi=dpi)
+        results = []
+        for budget in [300000, 20000, 8000]:
+            compact, subtype = CompactImage(image.getvalue(), budget)
+            results.append('%d byte budget %d byte %s' % (budget, len(compact), subtype))
+        print('%d dpi: JPEG %d bytes, ' % (dpi, len(jpeg.getvalue()))+', '.join(results))
@@ -0,0 +1,156 @@
+"""
+Time range queries over the monthly logs in envdata_directory, e.g. Tuesday 08:00-14:00:
+    QueryRange(envdata_directory, time.mktime((2017, 7, 25, 8, 0, 0, 0, 0, -1)), time.mktime((2017, 7, 25, 14, 0, 0, 0, 0, -1)))
+Each plain log has a sparse sidecar index, <log>.idx, holding the time and byte offset of the first row of every hour. CSVAppender adds to it as rows are written, and a missing or stale index is rebuilt by scanning the log once.
+A query seeks each month's log to the last indexed row before the start of the range and reads rows until the end of the range, so its cost follows the number of rows returned, not the size of the logs.
+Ranges spanning several months are read month by month. Archived months (EnvArchive.py) cannot be seeked and are streamed.
+RecentRows(envdata_directory, 480, time.time() - 12*3600) returns the last rows of the logs, reading plain logs backwards from their end, e.g. to warm start the display after a restart.
+"""
+import os
+import time
+import bisect
+import collections
+import datetime
+from EnvArchive import MonthLogs, OpenLog
+
+INDEX_INTERVAL = 3600                                                           #seconds between index entries
+TAIL_CHUNK = 1 << 16                                                            #bytes read at a time from the end of a log
+
+def IndexPath(path):
+    """
+    Path of the sidecar index of a log
+    """
+    return path+'.idx'
+
+def BuildIndex(path, interval=INDEX_INTERVAL):
+    """
+    Scan a log and return its index, a list of (time, byte offset) for the first row of every interval
+    """
+    entries = []
+    indexed = None
+    with open(path, 'rb') as fin:
+        offset = len(fin.readline())                                            #skip header
+        for line in fin:
+            if not line.endswith(b'\n'):                                        #torn last row
+                break
+            rowtime = line[:19].decode('ascii')
+            try:
+                bucket = int(time.mktime(datetime.datetime.strptime(rowtime, "%Y-%m-%d %H:%M:%S").timetuple())//interval)
+            except ValueError:
+                bucket = indexed
+            if bucket != indexed:
+                entries.append((rowtime, offset))
+                indexed = bucket
+            offset += len(line)
+    return entries
+
+def LoadIndex(path, interval=INDEX_INTERVAL, save=True):
+    """
+    Read the index of a log, rebuilding it if it is missing or points past the end of the log. save writes a rebuilt index to its sidecar file.
+    """
+    entries = []
+    if os.path.isfile(IndexPath(path)):
+        with open(IndexPath(path)) as fin:
+            for line in fin:
+                if line.endswith('\n'):                                         #skip a torn last entry
+                    rowtime, offset = line.rstrip('\n').split(',')
+                    entries.append((rowtime, int(offset)))
+    if entries and (entries[-1][1] < os.path.getsize(path)):
+        return entries
+    entries = BuildIndex(path, interval)
+    if save:
+        with open(IndexPath(path)+'.tmp', 'w') as fout:
+            fout.write(''.join(rowtime+','+str(offset)+'\n' for rowtime, offset in entries))
+        os.replace(IndexPath(path)+'.tmp', IndexPath(path))
+    return entries
+
+def ReadRange(path, start, end, save=True):
+    """
+    Stream the rows of a plain log with times from start to end ("%Y-%m-%d %H:%M:%S" strings), as lists of strings
+    """
+    entries = LoadIndex(path, save=save)
+    ientry = bisect.bisect_right([rowtime for rowtime, offset in entries], start) - 1
+    with open(path, 'rb') as fin:
+        if ientry >= 0:
+            fin.seek(entries[ientry][1])
+        else:
+            fin.readline()                                                      #skip header
+        for line in fin:
+            if not line.endswith(b'\n'):                                        #row still being written
+                break
+            rowtime = line[:19].decode('ascii')
+            if rowtime < start:
+                continue
+            if rowtime > end:
+                break
+            yield line.decode('ascii').rstrip('\n').split(',')
+
+def QueryRange(directory, start, end=None, suffix='-all.env.csv'):
+    """
+    Stream the rows of the logs in directory measured from start to end (seconds since epoch, end defaults to now) as lists of strings, the first being the time
+    """
+    end = time.time() if end is None else end
+    startstring = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start))
+    endstring = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(end))
+    month = datetime.datetime.fromtimestamp(start).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    thismonth = datetime.datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    while month <= datetime.datetime.fromtimestamp(end):
+        for path in MonthLogs(directory, month.strftime("%B%Y"), suffix):
+            if path.endswith(suffix):                                           #plain log, seek with its index
+                yield from ReadRange(path, startstring, endstring, save=month < thismonth) #the logging process keeps the index of the current month
+            else:                                                               #archived log, stream
+                with OpenLog(path) as fin:
+                    fin.readline()                                              #skip header
+                    for line in fin:
+                        if line.endswith('\n') and (startstring <= line[:19] <= endstring):
+                            yield line.rstrip('\n').split(',')
+        month = (month + datetime.timedelta(days=32)).replace(day=1)
+
+def TailRows(path, count, start=''):
+    """
+    The last count rows of a plain log with times from start on ("%Y-%m-%d %H:%M:%S" string), read backwards from the end of the log, oldest first
+    """
+    rows = []
+    with open(path, 'rb') as fin:
+        position = fin.seek(0, os.SEEK_END)
+        remainder = b''                                                         #start of the line cut by the previous chunk
+        torn = True                                                             #after the last newline, empty or a torn row
+        while (position > 0) and (len(rows) < count):
+            size = min(TAIL_CHUNK, position)
+            position -= size
+            fin.seek(position)
+            lines = (fin.read(size) + remainder).split(b'\n')
+            remainder = lines.pop(0)                                            #the header once the start of the log is reached
+            if torn and lines:
+                lines.pop()
+                torn = False
+            for line in reversed(lines):
+                rowtime = line[:19].decode('ascii')
+                if rowtime < start:
+                    return rows[::-1]
+                rows.append(line.decode('ascii').split(','))
+                if len(rows) == count:
+                    break
+    return rows[::-1]
+
+def RecentRows(directory, count, start, suffix='-all.env.csv'):
+    """
+    The last count rows of the logs in directory measured since start (seconds since epoch), oldest first.
+    Months are read backwards from the current one until count rows are found, so the cost follows count and not the size of the logs.
+    """
+    startstring = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start))
+    firstmonth = datetime.datetime.fromtimestamp(start).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    month = datetime.datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    rows = []
+    while (month >= firstmonth) and (len(rows) < count):
+        for path in reversed(MonthLogs(directory, month.strftime("%B%Y"), suffix)): #plain log holds the latest rows of a month
+            if len(rows) >= count:
+                break
+            if path.endswith(suffix):
+                rows = TailRows(path, count - len(rows), startstring) + rows
+            else:                                                               #archived log, stream keeping the last rows
+                with OpenLog(path) as fin:
+                    fin.readline()                                              #skip header
+                    rows = list(collections.deque((line.rstrip('\n').split(',') for line in fin if line.endswith('\n') and (line[:19] >= startstring)), count - len(rows))) + rows
+        month = (month - datetime.timedelta(days=1)).replace(day=1)
+    return rows
@@ -0,0 +1,150 @@
+"""
+Rollup tiers of the primary sensor, kept up to date as samples are stored, for long range graphs and reports without reading raw samples.
+Every 5 minute, hourly and daily bucket (aligned to local time) is logged when it closes to <month><YYYY>-rollup-<tier>.env.csv in envdata_directory, with the number of points, sum, sum of squares, minimum and maximum of temperature and humidity, and the seconds each was outside its controls.
+The open buckets are not logged. After a restart they are rebuilt from the raw samples (EnvQuery.py) since the start of the day of the first bucket not yet logged, looking back as far as the previous month's rollups,
+so a restart, even one across midnight or after a long stop, neither loses nor repeats a bucket.
+QueryRollup(envdata_directory, 'hourly', start, end) returns RollupStats with means and standard deviations.
+"""
+import math
+import time
+import datetime
+import collections
+from CSVAppender import CSVAppender, FSYNC_FLUSH
+from EnvQuery import QueryRange
+
+TIERS = collections.OrderedDict([('5min', 300), ('hourly', 3600), ('daily', 86400)]) #tier name: bucket length, seconds
+HEADER = 'time,Points,Temperature Sum,Temperature Sum of Squares,Temperature Min,Temperature Max,Humidity Sum,Humidity Sum of Squares,Humidity Min,Humidity Max,Temperature Out (s),Humidity Out (s)'
+
+#statistics of one bucket, time is the start of the bucket in seconds since epoch, Tout and RHout are seconds outside the controls
+RollupStats = collections.namedtuple('RollupStats', ['time', 'count', 'Tmean', 'Tstd', 'Tmin', 'Tmax', 'RHmean', 'RHstd', 'RHmin', 'RHmax', 'Tout', 'RHout'])
+
+def BucketStart(timestamp, seconds):
+    """
+    Start of the bucket of length seconds holding timestamp, aligned to local midnight
+    """
+    offset = time.localtime(timestamp).tm_gmtoff
+    return (timestamp + offset)//seconds*seconds - offset
+
+class Bucket:
+    """
+    Running totals of one bucket. Gaps (nan) are not counted.
+    """
+    def __init__(self, start):
+        self.start = start
+        self.count = 0
+        self.T = [0.0, 0.0, math.inf, -math.inf]                                #sum, sum of squares, minimum, maximum
+        self.RH = [0.0, 0.0, math.inf, -math.inf]
+        self.Tout = 0.0
+        self.RHout = 0.0
+
+    def add(self, temperature, humidity, Tout, RHout):
+        """
+        Add a sample and the seconds it spent outside the controls
+        """
+        if not (math.isnan(temperature) or math.isnan(humidity)):
+            self.count += 1
+            for totals, value in ((self.T, temperature), (self.RH, humidity)):
+                totals[0] += value
+                totals[1] += value*value
+                totals[2] = min(totals[2], value)
+                totals[3] = max(totals[3], value)
+        self.Tout += Tout
+        self.RHout += RHout
+
+    def row(self):
+        """
+        Log row following the time
+        """
+        return ',%d,%r,%r,%r,%r,%r,%r,%r,%r,%.0f,%.0f' % tuple([self.count] + [round(total, 6) for total in self.T + self.RH] + [self.Tout, self.RHout])
+
+class Rollup:
+    """
+    Keeps the tiers of one sensor with controls Tlimits and RHlimits ([<minimum>, <maximum>]). interval is the sampling interval in seconds,
+    each sample counts for the time since the previous one (at most 2*interval) when deciding the time outside the controls.
+    """
+    def __init__(self, directory, Tlimits, RHlimits, interval, flush_interval=0, fsync=FSYNC_FLUSH):
+        self.directory = directory
+        self.Tlimits = Tlimits
+        self.RHlimits = RHlimits
+        self.interval = interval
+        self.logs = collections.OrderedDict((tier, CSVAppender(directory, '-rollup-'+tier+'.env.csv', HEADER, flush_interval, fsync)) for tier in TIERS)
+        self.buckets = dict((tier, None) for tier in TIERS)
+        self.last = -math.inf                                                   #time of the last sample added
+        self.previous = None
+
+    def add(self, timestamp, temperature, humidity):
+        """
+        Add a sample, logging the buckets it closes. Samples no newer than the last one are ignored.
+        """
+        if timestamp <= self.last:
+            return
+        elapsed = self.interval if self.previous is None else min(timestamp - self.previous, 2*self.interval)
+        Tout = elapsed if (temperature > self.Tlimits[1]) or (temperature < self.Tlimits[0]) else 0
+        RHout = elapsed if (humidity > self.RHlimits[1]) or (humidity < self.RHlimits[0]) else 0
+        for tier, seconds in TIERS.items():
+            start = BucketStart(timestamp, seconds)
+            bucket = self.buckets[tier]
+            if (bucket is not None) and (bucket.start != start):                #bucket closed
+                self.logs[tier].append(bucket.start, bucket.row())
+            if (bucket is None) or (bucket.start != start):
+                bucket = self.buckets[tier] = Bucket(start)
+            bucket.add(temperature, humidity, Tout, RHout)
+        self.last = self.previous = timestamp
+
+    def logged(self, tier, now):
+        """
+        Start of the last bucket of tier logged in the month of now or the month before, None if there is none
+        """
+        lastmonth = datetime.datetime.fromtimestamp(now).replace(day=1) - datetime.timedelta(days=1)
+        return self.logs[tier].last_time(now) or self.logs[tier].last_time(time.mktime(lastmonth.timetuple())) or None
+
+    def resume(self, directory, suffix='-all.env.csv', now=None):
+        """
+        Rebuild the open buckets from the raw log rows, e.g. after a restart, starting from the day of the earliest bucket not yet logged in any tier (today if nothing was logged).
+        Every tier fits in a day, so the open bucket of each tier is rebuilt whole. Buckets already logged are not logged again.
+        """
+        now = time.time() if now is None else now
+        start = now
+        for tier, seconds in TIERS.items():
+            last = self.logged(tier, now)
+            if last is not None:
+                start = min(start, last + seconds)                              #first bucket of the tier that was not logged
+        for log in self.logs.values():
+            log.replaying = True
+        for row in QueryRange(directory, BucketStart(start, TIERS['daily']), now, suffix):
+            self.add(time.mktime(datetime.datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S").timetuple()), float(row[1]), float(row[2]))
+        for log in self.logs.values():
+            log.replaying = False
+        if self.last > -math.inf:
+            self.last += 0.999999                                               #rows are timed to the second, skip samples stored again from the journal
+
+    def flush(self):
+        """
+        Write out logged buckets
+        """
+        for log in self.logs.values():
+            log.flush()
+
+    def close(self):
+        """
+        Write out logged buckets, open buckets are rebuilt by resume()
+        """
+        for log in self.logs.values():
+            log.close()
+
+def QueryRollup(directory, tier, start, end=None):
+    """
+    RollupStats of the buckets of tier starting from start to end (seconds since epoch, end defaults to now)
+    """
+    stats = []
+    for row in QueryRange(directory, BucketStart(start, TIERS[tier]), end, '-rollup-'+tier+'.env.csv'):
+        bucketstart = time.mktime(datetime.datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S").timetuple())
+        count = int(row[1])
+        Tsum, Tsumsq, Tmin, Tmax, RHsum, RHsumsq, RHmin, RHmax, Tout, RHout = [float(value) for value in row[2:]]
+        if count:
+            Tmean, RHmean = Tsum/count, RHsum/count
+            Tstd, RHstd = math.sqrt(max(Tsumsq/count - Tmean**2, 0)), math.sqrt(max(RHsumsq/count - RHmean**2, 0))
+        else:                                                                   #only gaps
+            Tmean = Tstd = RHmean = RHstd = Tmin = Tmax = RHmin = RHmax = math.nan
+        stats.append(RollupStats(bucketstart, count, Tmean, Tstd, Tmin, Tmax, RHmean, RHstd, RHmin, RHmax, Tout, RHout))
+    return stats
@@ -0,0 +1,276 @@
+"""
+Draws the live display and alert graphs in a separate process, so a slow or stalled GUI never delays sampling, logging or alerting.
+LEMASRun.py writes each sample to a SharedWindow, a ring of samples in shared memory that it never waits on. The renderer process copies new samples from it
+at its own frame rate and draws them with EnvGraph (EnvDisplay.py), in a matplotlib window or headless (display_mode in LabSettings.py).
+Alert graphs are requested over the renderer's stdin and returned as PNG bytes on its stdout, at mms_dpi. GraphRenderer restarts the process if it exits or stops updating its heartbeat,
+and render_alert returns None when no graph arrives in time so the caller can draw it itself.
+Started by GraphRenderer: python3 GraphRenderer.py <shared memory file> <settings as JSON>
+"""
+import io
+import os
+import sys
+import json
+import mmap
+import time
+import select
+import signal
+import threading
+import tempfile
+import subprocess
+import numpy as np
+from RingBuffer import RingBuffer, MinMaxBuffer, OPEN_ROWS
+
+COUNTERS = 3                                                                    #write sequence (odd while writing), samples written, render requests
+HEADER = 8*COUNTERS + 8                                                         #counters and the renderer's heartbeat
+
+class SharedWindow:
+    """
+    Last capacity samples (time, temperature, humidity) in shared memory, written by one process and read by another. Created if name is None, else attached.
+    The memory is a file mapped by both processes, name is its path, in /dev/shm where available so it is never written to the SD card.
+    Reads are retried while a write is in progress (a sequence lock), so the writer never waits.
+    """
+    def __init__(self, capacity, name=None):
+        self.capacity = capacity
+        size = HEADER + 3*8*capacity
+        if name is None:
+            descriptor, name = tempfile.mkstemp(prefix='LEMAS-window-', dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+            os.ftruncate(descriptor, size)                                      #zero filled
+            os.close(descriptor)
+        with open(name, 'r+b') as fin:
+            self.memory = mmap.mmap(fin.fileno(), size)                         #stays mapped after the file is closed
+        self.counters = np.ndarray(COUNTERS, dtype=np.int64, buffer=self.memory)
+        self.heartbeat = np.ndarray(1, dtype=np.float64, buffer=self.memory, offset=8*COUNTERS)
+        self.samples = np.ndarray((capacity, 3), dtype=np.float64, buffer=self.memory, offset=HEADER)
+        self.name = name
+
+    def append(self, timestamp, temperature, humidity):
+        """
+        Write a sample, replacing the oldest one
+        """
+        self.counters[0] += 1
+        self.samples[self.counters[1] % self.capacity] = (timestamp, temperature, humidity)
+        self.counters[1] += 1
+        self.counters[0] += 1
+
+    def read(self, total):
+        """
+        Samples written after the first total, at most capacity of them, and the number written
+        """
+        while True:
+            sequence = int(self.counters[0])
+            if sequence % 2:                                                    #write in progress
+                time.sleep(0.001)
+                continue
+            written = int(self.counters[1])
+            samples = self.samples[np.arange(max(total, written - self.capacity), written) % self.capacity] #copies
+            if int(self.counters[0]) == sequence:
+                return samples, written
+
+    def close(self, unlink=False):
+        del self.counters, self.heartbeat, self.samples                         #views of the mapping, which cannot be closed while they exist
+        self.memory.close()
+        if unlink:
+            os.remove(self.name)
+
+class GraphRenderer:
+    """
+    Runs and supervises the renderer process for the graphs of a RingBuffer or MinMaxBuffer window. settings holds the LabSettings values the renderer needs (see RenderMain).
+    Restarts the process when it exits or its heartbeat is older than timeout seconds, at most once every restart_wait seconds. A new process is given the whole window again.
+    """
+    def __init__(self, window, settings, timeout=60, restart_wait=10):
+        self.window = window
+        self.shared = SharedWindow(window.capacity + OPEN_ROWS)                 #room for a whole window, even a MinMaxBuffer's
+        self.settings = settings
+        self.timeout = timeout
+        self.restart_wait = restart_wait
+        self.lock = threading.Lock()                                            #the process is restarted by the main thread and asked for alert graphs by the alert stage
+        self.channel = threading.Lock()                                         #held while waiting on a reply, never by the main thread
+        self.requests = 0
+        self.replies = b''                                                      #read from the renderer but not yet parsed
+        self.replying = None                                                    #process the replies were read from
+        self.process = None
+        self.started = -restart_wait
+        self.start()
+
+    def start(self):
+        """
+        Start the renderer process, caller holds the lock or is the constructor
+        """
+        self.shared.counters[1] = 0                                             #the new process reads from the start of the window
+        for sample in zip(self.window['time'], self.window['temperature'], self.window['humidity']):
+            self.shared.append(*sample)
+        self.shared.heartbeat[0] = time.monotonic() + self.timeout              #time to import matplotlib before the first heartbeat
+        self.process = subprocess.Popen([sys.executable, os.path.dirname(os.path.realpath(__file__))+'/GraphRenderer.py', self.shared.name, json.dumps(self.settings)],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.started = time.monotonic()
+
+    def append(self, timestamp, temperature, humidity):
+        """
+        Add a sample to the window and pass it to the renderer, never waits on it
+        """
+        self.window.append(timestamp, temperature, humidity)
+        self.shared.append(timestamp, temperature, humidity)
+
+    def request_render(self):
+        """
+        Ask a headless renderer to draw the display now, safe from a signal handler
+        """
+        self.shared.counters[2] += 1
+
+    def check(self):
+        """
+        Restart the renderer if it exited or hung, returns False if it was restarted
+        """
+        if (self.process.poll() is None) and (time.monotonic() - self.shared.heartbeat[0] < self.timeout):
+            return True
+        if time.monotonic() - self.started < self.restart_wait:
+            return True
+        with self.lock:
+            if self.process.poll() is None:
+                print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Graph renderer not responding, restarting it...')
+                self.process.kill()
+            else:
+                print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Graph renderer exited with code '+str(self.process.returncode)+', restarting it...')
+            self.process.wait()
+            self.start()
+        return False
+
+    def render_alert(self, timestamp, timeout=10):
+        """
+        Have the renderer draw the alert graph, including the sample at timestamp. Returns the PNG as bytes, None if it did not arrive within timeout seconds.
+        Replies are 'done <request> <length>' lines followed by length bytes of image. A restart by check() meanwhile ends the wait, the old process is killed.
+        """
+        with self.channel:
+            with self.lock:
+                process = self.process
+            if process is not self.replying:                                    #restarted, drop a partial reply of the old process
+                self.replies = b''
+                self.replying = process
+            self.requests += 1
+            try:
+                process.stdin.write(b'alert %d %.6f\n' % (self.requests, timestamp))
+                process.stdin.flush()
+                deadline = time.monotonic() + timeout
+                while True:
+                    header, newline, image = self.replies.partition(b'\n')
+                    if newline and (len(image) >= int(header.split()[2])):      #a whole reply
+                        length = int(header.split()[2])
+                        self.replies = image[length:]
+                        if header.split()[1] == b'%d' % self.requests:          #skip replies to requests that timed out
+                            return image[:length]
+                        continue
+                    if not select.select([process.stdout], [], [], max(deadline - time.monotonic(), 0))[0]:
+                        return None
+                    data = os.read(process.stdout.fileno(), 1 << 16)
+                    if not data:                                                #renderer exited
+                        return None
+                    self.replies += data
+            except (OSError, ValueError):                                       #renderer exited
+                return None
+
+    def close(self):
+        """
+        Stop the renderer and free the shared memory, e.g. at exit
+        """
+        with self.lock:
+            if self.process.poll() is None:
+                self.process.kill()
+                self.process.wait()
+        self.shared.close(unlink=True)
+
+def RenderMain(name, settings):
+    """
+    Renderer process. Draws the samples of the SharedWindow name every display_frametime seconds (gui), or every display_interval seconds and on request (headless, framebuffer), and answers alert graph requests on stdin.
+    """
+    import matplotlib
+    if settings['display_mode'] != 'gui':                                       #off-screen backend, no X display or GUI event loop
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import matplotlib.gridspec as gridspec
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from EnvDisplay import EnvGraph, Framebuffer
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)                                #Ctrl+C stops LEMASRun.py, the renderer exits with it when stdin closes
+    replies = sys.stdout.buffer                                                 #stdout answers alert requests, anything printed goes to stderr
+    sys.stdout = sys.stderr
+    shared = SharedWindow(settings['capacity'] + OPEN_ROWS, name)
+    if settings['bucket']:                                                      #long graphs, see BucketSeconds
+        window = MinMaxBuffer(settings['capacity'], settings['bucket'], 'temperature', 'humidity')
+    else:
+        window = RingBuffer(settings['capacity'], 'temperature', 'humidity')
+    total = 0
+    graph_args = ([settings['Tmin'], settings['Tmax']], [settings['RHmin'], settings['RHmax']], settings['margins'], settings['capacity'], settings['linewidth'],
+                  settings['nticks_y'], settings['tickspacing_x'], settings['maxticks_x'], settings['fontsizes'])
+
+    ## Display figure
+    gs = gridspec.GridSpec(settings['r_plot'], settings['c_plot'])
+    gs.update(hspace=settings['hspace'])
+    if settings['display_mode'] == 'gui':
+        plt.ion()                                                               #activate interactive plotting
+    fig = plt.figure(num=1, figsize=settings['figsize'], dpi=settings['dpi'])
+    ax1 = fig.add_subplot(gs[0, :])
+    ax2 = fig.add_subplot(gs[1, :], sharex=ax1)
+    fig.subplots_adjust(left=0.06, right=1, top=0.98, bottom=0.14)
+    if settings['display_mode'] == 'gui':
+        fig.canvas.toolbar.pack_forget()
+    display_graph = EnvGraph(ax1, ax2, *graph_args, blit=(settings['display_mode'] == 'gui') and getattr(fig.canvas, 'supports_blit', False))
+    framebuffer = Framebuffer(settings['framebuffer_device']) if settings['display_mode'] == 'framebuffer' else None
+
+    ## Alert figure, off-screen and sized for MMS
+    alert_fig = Figure(figsize=settings['figsize'], dpi=settings['mms_dpi'])
+    FigureCanvasAgg(alert_fig)
+    alert_ax1 = alert_fig.add_subplot(gs[0, :])
+    alert_ax2 = alert_fig.add_subplot(gs[1, :], sharex=alert_ax1)
+    alert_fig.subplots_adjust(left=0.06, right=1, top=0.98, bottom=0.14)
+    alert_graph = EnvGraph(alert_ax1, alert_ax2, *graph_args)
+
+    rendered = -np.inf
+    renders = None                                                              #headless modes draw the first graphs straight away
+    pending = b''                                                               #requests read but not answered
+    while True:
+        shared.heartbeat[0] = time.monotonic()
+        samples, total = shared.read(total)
+        for sample in samples:
+            window.append(*sample)
+        fresh = len(samples) > 0
+
+        ## Alert graph requests, 'alert <request> <timestamp>' lines. Headless modes wait here for the next check, the GUI in plt.pause
+        if select.select([sys.stdin], [], [], 0 if settings['display_mode'] == 'gui' else 1)[0]:
+            data = os.read(sys.stdin.fileno(), 4096)                            #unbuffered, select sees every request
+            if not data:                                                        #LEMASRun.py exited
+                return
+            pending += data
+        while b'\n' in pending:
+            line, pending = pending.split(b'\n', 1)
+            request = line.decode('ascii').split()
+            deadline = time.monotonic() + 2
+            while (not len(window) or window['time'][-1] < float(request[2])) and (time.monotonic() < deadline): #wait for the sample that raised the alert
+                time.sleep(0.05)
+                samples, total = shared.read(total)
+                for sample in samples:
+                    window.append(*sample)
+            alert_graph.update(window)
+            image = io.BytesIO()
+            alert_fig.savefig(image, format='png')                              #lossless, re-encoded for each gateway's budget
+            replies.write(b'done %s %d\n' % (request[1].encode('ascii'), len(image.getvalue())) + image.getvalue())
+            replies.flush()
+
+        ## Live display
+        if settings['display_mode'] == 'gui':
+            if fresh:
+                display_graph.update(window)
+                display_graph.draw()                                            #blits the lines alone when the axes are unchanged
+            plt.pause(settings['display_frametime'])                            #handle window events until the next frame
+        elif (renders != int(shared.counters[2])) or (settings['display_interval'] and (time.monotonic() - rendered >= settings['display_interval'])):
+            renders = int(shared.counters[2])
+            rendered = time.monotonic()
+            display_graph.update(window)
+            display_graph.draw()
+            if framebuffer is not None:
+                framebuffer.show(fig)
+            if settings['display_path']:
+                fig.savefig(settings['display_path'])
+
+if __name__ == '__main__':
+    RenderMain(sys.argv[1], json.loads(sys.argv[2]))
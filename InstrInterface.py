@@ -1,15 +1,22 @@
 """
 Defines sensor functions. Current interfaces use modbus protocols.
-Sets up interface.
+Sets up interface. Sensors are selected through the drivers in SensorDrivers.py, the Comet T3311 driver (DriverComet.py) uses these functions.
+minimalmodbus is only imported when connecting to a modbus instrument.
 """
 import time
-import minimalmodbus                                                            #for modbus RTU protocols
-def ConnectInstr(instrport):                                                    #Connect to instrument with modbus RTU protocol
+import collections
+from RegisterMaps import registermaps
+
+#a single acquisition: temperature (deg. C), humidity (%RH), raw register values and acquisition time (seconds since epoch)
+EnvReading = collections.namedtuple('EnvReading', ['temperature', 'humidity', 'raw', 'timestamp'])
+
+def ConnectInstr(instrport, address=1):                                         #Connect to instrument with modbus RTU protocol
     """
-    Connect to instrument using modbus protocols. This will need rewritten if not using Comet T3311
+    Connect to instrument at modbus slave address using modbus protocols. This will need rewritten if not using Comet T3311
     """
     print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Connecting to instrument...')
-    instr_obj = minimalmodbus.Instrument(instrport, 1)                          #modbus protocols
+    import minimalmodbus                                                        #for modbus RTU protocols
+    instr_obj = minimalmodbus.Instrument(instrport, address)                    #modbus protocols
     time.sleep(5)
     try:
         instr_obj.read_register(48, 1)
@@ -19,6 +26,12 @@ def ConnectInstr(instrport):
 
     return instr_obj
 
+def DisconnectInstr(instr_obj):
+    """
+    Close the serial port of the instrument, shared by every instrument on the bus. The next ConnectInstr on the port opens it again.
+    """
+    instr_obj.serial.close()
+
 #functions for temperature and humidity measurement using modbus protocols
 #modbus calls on an address in the hardware where the relevent data is stored, refer to instrument manuals.
 def ReadTemperature(instr_obj):                                                 #read instrument address for temperature
@@ -35,10 +48,44 @@ def ReadHumidity(instr_obj):
     temphumid = instr_obj.read_register(49, 1)
     return round(temphumid, 4)
 
+def ConvertRegister(raw, channel):                                              #convert a raw register value using a channel of a register map
+    """
+    Convert one register from a block read into engineering units using a channel definition from RegisterMaps.py
+    """
+    value = raw[channel['offset']]
+    if channel['signed'] and value >= 0x8000:                                   #two's complement for signed registers
+        value = value - 0x10000
+    value = (value/10**channel['decimals'] + channel['bias'])*channel['gain']
+    return round(value, 4)
+
+def ReadEnvironment(instr_obj, registermap=None):                               #read temperature and humidity in one modbus transaction
+    """
+    Read the block of registers described by registermap (see RegisterMaps.py) with a single modbus request and return an EnvReading. Defaults to the Comet T3311 map.
+    """
+    if registermap is None:
+        registermap = registermaps['CometT3311']
+    raw = instr_obj.read_registers(registermap['start'], registermap['count'], registermap['functioncode'])
+    timestamp = time.time()
+    return EnvReading(ConvertRegister(raw, registermap['temperature']), ConvertRegister(raw, registermap['humidity']), tuple(raw), timestamp)
+
 #this is to clear buffer-related issues when reading from the instrument.
+def ClearInstr(instr_obj):
+    """
+    Toggle the baud rate to clear the Comet T3311 buffer, without waiting for the instrument to settle. This will need rewritten if not using Comet T3311
+    """
+    instr_obj.serial.baudrate = 19200
+    try:
+        instr_obj.read_register(48, 1)
+    except Exception:
+        pass
+    instr_obj.serial.baudrate = 9600
+
+    return instr_obj
+
 def Instr_errfix(instr_obj):
     """
     The Comet T3311 occassionally has issues reporting new measurements. This is to reset the connection and try again. This will need rewritten if not using Comet T3311
+    Blocks for 10 seconds, see InstrRecovery.py for recovering without blocking
     """
     print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Error reading from instrument, clearing buffer...')
     instr_obj.serial.baudrate = 19200
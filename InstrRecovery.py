@@ -0,0 +1,109 @@
+"""
+Instrument connection with non-blocking recovery.
+A failed read moves the connection from healthy to degraded. After reconnect_after consecutive failures it is reconnecting: a background thread reopens the port, clears the instrument and retries with exponential backoff and jitter, and after offline_after seconds of failed attempts the connection is reported offline (attempts continue at the maximum backoff).
+Reopening the port recovers a USB adapter that was unplugged and plugged back in. Any failure of an attempt only moves on to the next wait.
+An instrument that could not be opened at all (instr_obj None) starts out reconnecting. A good read or reconnect returns the connection to healthy. While reconnecting or offline, read() returns None immediately so the caller records a gap instead of waiting on the instrument.
+"""
+import time
+import random
+import threading
+
+#connection states
+HEALTHY = 'healthy'
+DEGRADED = 'degraded'
+RECONNECTING = 'reconnecting'
+OFFLINE = 'offline'
+
+class InstrConnection:
+    """
+    Wraps one instrument object, read and cleared through its driver (see SensorDrivers.py) for the sensor of SensorList.py. lock serializes access to a serial port shared with other sensors on the same bus.
+    backoff is [<first wait>, <maximum wait>] between reconnect attempts in seconds, jitter is the maximum random fraction added to each wait.
+    """
+    def __init__(self, name, instr_obj, driver, sensor, lock, reconnect_after=3, backoff=(5, 300), offline_after=600, jitter=0.5, settle=5):
+        self.name = name
+        self.instr_obj = instr_obj
+        self.driver = driver
+        self.sensor = sensor
+        self.lock = lock
+        self.reconnect_after = reconnect_after
+        self.backoff = backoff
+        self.offline_after = offline_after
+        self.jitter = jitter
+        self.settle = settle                                                    #seconds for the instrument to settle after clearing its buffer
+        self.state = HEALTHY
+        self.failures = 0                                                       #consecutive failed reads
+        self.reconnector = None
+        if instr_obj is None:                                                   #port missing at startup, keep trying in the background
+            self.startreconnect()
+
+    def setstate(self, state):
+        """
+        Change state, reporting the transition
+        """
+        if state != self.state:
+            print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Instrument '+self.name+' '+self.state+' -> '+state)
+            self.state = state
+
+    def read(self):
+        """
+        Read the instrument once. Returns an EnvReading, or None if the read failed or the instrument is being reconnected.
+        """
+        if self.state in (RECONNECTING, OFFLINE):
+            return None
+        try:
+            with self.lock:
+                reading = self.driver.Read(self.instr_obj, self.sensor)
+        except Exception:
+            self.failures += 1
+            if self.failures >= self.reconnect_after:
+                self.startreconnect()
+            else:
+                self.setstate(DEGRADED)
+            return None
+        self.failures = 0
+        self.setstate(HEALTHY)
+        return reading
+
+    def startreconnect(self):
+        """
+        Move to reconnecting and start the background thread
+        """
+        self.setstate(RECONNECTING)
+        self.reconnector = threading.Thread(target=self.reconnect, name='LEMAS reconnect '+self.name, daemon=True)
+        self.reconnector.start()
+
+    def reopen(self):
+        """
+        Close the port if the driver can (see SensorDrivers.py) and connect to the instrument again, caller holds the lock
+        """
+        if (self.instr_obj is not None) and hasattr(self.driver, 'Disconnect'):
+            try:
+                self.driver.Disconnect(self.instr_obj, self.sensor)
+            except Exception:                                                   #port already gone
+                pass
+        self.instr_obj = self.driver.Connect(self.sensor['port'], self.sensor['address'], self.sensor)
+
+    def reconnect(self):
+        """
+        Background thread. Reopen, clear and test the instrument until a read succeeds, waiting with exponential backoff and jitter between attempts.
+        """
+        started = time.monotonic()
+        wait = self.backoff[0]
+        while True:
+            try:
+                with self.lock:
+                    self.reopen()
+                    self.driver.Clear(self.instr_obj, self.sensor)
+                time.sleep(self.settle)                                         #other sensors on the bus are read meanwhile
+                with self.lock:
+                    self.driver.Read(self.instr_obj, self.sensor)
+            except Exception as error:
+                print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Reconnecting instrument '+self.name+' failed: '+str(error))
+            else:
+                self.failures = 0
+                self.setstate(HEALTHY)
+                return
+            if (self.state == RECONNECTING) and (time.monotonic() - started > self.offline_after):
+                self.setstate(OFFLINE)
+            time.sleep(wait*(1 + random.uniform(0, self.jitter)))
+            wait = min(wait*2, self.backoff[1])
@@ -0,0 +1,135 @@
+"""
+Software stand-in for a modbus sensor, for developing and soak testing LEMAS without a Comet T3311.
+Set instrport (LabSettings.py) or a port in SensorList.py to 'sim:<scenario>' and the simulated driver (DriverSimulated.py) connects a SimulatedInstrument with the same read interface as minimalmodbus.Instrument.
+Scenarios:
+    steady    - environment holds at the middle of its controls with sensor noise
+    hvac      - temperature and humidity cycle with the HVAC, inside the controls
+    excursion - hvac, plus an excursion past the controls for 30 minutes of every 2 hours
+    dropout   - steady, but the sensor stops answering for 5 minutes of every 30 minutes
+    garbage   - steady, but some reads return random register values
+Run this file to benchmark acquisition through the polling engine: python3 InstrSimulator.py <scenario> <number of samples> <number of sensors>
+"""
+import sys
+import time
+import math
+import random
+from RegisterMaps import registermaps
+
+SCENARIOS = ['steady', 'hvac', 'excursion', 'dropout', 'garbage']
+
+class SimulatedSerial:
+    """
+    Stand-in for the pyserial port of minimalmodbus.Instrument
+    """
+    def __init__(self):
+        self.baudrate = 9600
+
+class SimulatedInstrument:
+    """
+    Simulated modbus instrument. Tlimits and RHlimits are [<minimum>, <maximum>] controls the waveforms are placed around.
+    latency is the time each read takes in seconds, errorrate the fraction of reads that fail, speed how many simulated seconds pass per real second.
+    """
+    def __init__(self, scenario='hvac', Tlimits=(19.5, 20.5), RHlimits=(10.0, 60.0), registermap=None, latency=0.05, errorrate=0.0, speed=1, seed=None):
+        if scenario not in SCENARIOS:
+            raise ValueError('Unknown simulator scenario '+scenario+', use one of '+', '.join(SCENARIOS))
+        self.scenario = scenario
+        self.Tlimits = Tlimits
+        self.RHlimits = RHlimits
+        self.registermap = registermap if registermap is not None else registermaps['CometT3311']
+        self.latency = latency
+        self.errorrate = errorrate
+        self.speed = speed
+        self.random = random.Random(seed)
+        self.serial = SimulatedSerial()
+        self.started = time.monotonic()
+
+    def environment(self, t):
+        """
+        Temperature (deg. C) and humidity (%RH) of the scenario t simulated seconds after start
+        """
+        Tmid, Thalf = sum(self.Tlimits)/2, (self.Tlimits[1] - self.Tlimits[0])/2
+        RHmid, RHhalf = sum(self.RHlimits)/2, (self.RHlimits[1] - self.RHlimits[0])/2
+        temperature = Tmid + self.random.gauss(0, 0.02)
+        humidity = RHmid + self.random.gauss(0, 0.2)
+        if self.scenario in ('hvac', 'excursion'):                              #20 minute HVAC cycle
+            temperature += 0.6*Thalf*math.sin(2*math.pi*t/1200)
+            humidity += 0.3*RHhalf*math.sin(2*math.pi*t/1200 + 1)
+        if self.scenario == 'excursion':                                        #ramp past the controls over 10 minutes, hold, ramp back
+            phase = t % 7200
+            if phase < 1800:
+                excursion = min(phase, 1800 - phase, 600)/600
+                temperature += excursion*(Thalf + 2)
+                humidity += excursion*(RHhalf + 5)
+        return temperature, humidity
+
+    def encode(self, value, channel):
+        """
+        Convert a value into the register a real sensor would report, the inverse of ConvertRegister
+        """
+        raw = int(round((value/channel['gain'] - channel['bias'])*10**channel['decimals']))
+        return raw & 0xFFFF
+
+    def registers(self):
+        """
+        Current register block, applying latency, errors and scenario faults
+        """
+        time.sleep(self.latency)
+        t = (time.monotonic() - self.started)*self.speed
+        if self.random.random() < self.errorrate:
+            raise IOError('Simulated instrument did not respond')
+        if (self.scenario == 'dropout') and (t % 1800 > 1500):
+            raise IOError('Simulated instrument dropped out')
+        raw = [0]*self.registermap['count']
+        if (self.scenario == 'garbage') and (self.random.random() < 0.05):
+            return [self.random.randint(0, 0xFFFF) for register in raw]
+        temperature, humidity = self.environment(t)
+        raw[self.registermap['temperature']['offset']] = self.encode(temperature, self.registermap['temperature'])
+        raw[self.registermap['humidity']['offset']] = self.encode(humidity, self.registermap['humidity'])
+        return raw
+
+    def read_registers(self, registeraddress, number_of_registers, functioncode=3):
+        """
+        Same as minimalmodbus.Instrument.read_registers
+        """
+        raw = self.registers()
+        offset = registeraddress - self.registermap['start']
+        if (offset < 0) or (offset + number_of_registers > len(raw)):
+            raise ValueError('Simulated instrument has no register '+str(registeraddress))
+        return raw[offset:offset + number_of_registers]
+
+    def read_register(self, registeraddress, number_of_decimals=0, functioncode=3, signed=False):
+        """
+        Same as minimalmodbus.Instrument.read_register
+        """
+        value = self.read_registers(registeraddress, 1, functioncode)[0]
+        if signed and value >= 0x8000:
+            value = value - 0x10000
+        return value/10**number_of_decimals
+
+def ConnectSimulator(instrport, address=1, model=None):
+    """
+    Build a SimulatedInstrument from a 'sim:<scenario>' port, with the sim_ settings from LabSettings.py and the controls of this device's lab.
+    Registers are encoded with the register map of model (RegisterMaps.py), sensormodel from LabSettings.py if None.
+    """
+    from LabID import labID
+    from Tcontrols import Tcontrols
+    from RHcontrols import RHcontrols
+    import LabSettings
+    return SimulatedInstrument(instrport.split(':', 1)[1] or 'hvac', Tcontrols[labID], RHcontrols[labID], registermaps[LabSettings.sensormodel if model is None else model],
+                               LabSettings.sim_latency, LabSettings.sim_errorrate, LabSettings.sim_speed, seed=address)
+
+if __name__ == '__main__':
+    from SensorPoller import PollingEngine
+    scenario = sys.argv[1] if len(sys.argv) > 1 else 'hvac'
+    nsamples = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    nsensors = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    sensors = [{'labID': 'sim'+str(isensor), 'port': 'sim:'+scenario, 'address': isensor + 1, 'serial': '', 'model': 'CometT3311'} for isensor in range(nsensors)]
+    engine = PollingEngine(sensors)
+    engine.poll()                                                               #connect
+    ngaps = 0
+    tstart = time.monotonic()
+    for isample in range(nsamples):
+        ngaps += sum(sensorreading.reading is None for sensorreading in engine.poll())
+    elapsed = time.monotonic() - tstart
+    print(scenario+': '+str(nsamples)+' ticks of '+str(nsensors)+' sensors in %.2f s, %.0f samples/hr, %d gaps' % (elapsed, nsamples*nsensors/elapsed*3600, ngaps))
+    engine.close()
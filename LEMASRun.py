@@ -27,18 +27,24 @@ Change log from v1.12 to v1.13
 ///////////////////////////////////////////////////////////////////////////////
 """
 #pylint: disable=W0703, E0401, C0413, W0401
-import smtplib
+import io
 import time
 import os
 import csv
+import math
 import datetime
 import copy
+import queue
+import signal
+import threading
+import atexit
 from email.mime.text import MIMEText
 from email.mime.image import MIMEImage
 from email.mime.multipart import MIMEMultipart
 import numpy as np
-import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
 print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Starting Laboratory Environment Monitoring and Alert System (LEMAS)')
 install_location = os.path.dirname(os.path.realpath(__file__))
@@ -65,12 +71,50 @@ from LabSettings import *
 
 from InstrInterface import *
 
-correction = copy.deepcopy(corrections[sensorserial])                           #[temperature, humidity]
+from SensorList import sensors
+
+from SensorPoller import *
+
+from Pipeline import *
+
+from SpikeFilter import *
+
+from Scheduler import *
+
+from CSVAppender import *
+
+from EnvBinary import BinaryAppender
+
+from EnvDatabase import EnvDatabase
+
+from SampleJournal import SampleJournal
+
+from EnvArchive import Archiver
+
+from EnvQuery import INDEX_INTERVAL, RecentRows
+
+from EnvRollup import Rollup, QueryRollup, TIERS as ROLLUP_TIERS
+
+from OutageEvents import OutageEvents
+
+from RingBuffer import RingBuffer, MinMaxBuffer, BucketSeconds
+
+from EnvDisplay import EnvGraph, CompactImage
+
+from GraphRenderer import GraphRenderer
+
+from MailTransport import MailTransport
+
+if not sensors:                                                                 #default to the single sensor of this device
+    sensors = [{'labID': labID, 'port': instrport, 'address': 1, 'serial': sensorserial, 'model': sensormodel, 'driver': sensordriver}]
+iprimary = [sensor['labID'] for sensor in sensors].index(labID)                 #sensor graphed and used for alerts
+correction = copy.deepcopy(corrections[sensors[iprimary]['serial']])            #[temperature, humidity]
 TestmsgDate = datetime.datetime.strptime(TestmsgDate, "%B %d, %Y %H:%M:%S")
 
 #///////////////////////////Outage Parameter Setup\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
 #set up parameters
 graph_pts = round(graphtime*pts_hr)                                             #maximum number of recent points to plot
+graph_bucket = BucketSeconds(graphtime*3600, graph_points) if graph_pts > graph_points else 0 #too many points to draw, graph the minimum and maximum of each bucket of seconds
 sleeptimer = (pts_hr / 60 / 60)**-1                                             #amount of time for system to wait until next temperature, seconds
 Tmin = Tcontrols[labID][0]                                                      #get lower temperature limit for assigned lab
 Tmax = Tcontrols[labID][1]                                                      #get upper temperature limit for assigned lab
@@ -90,6 +134,9 @@ ethoutage_sent = False
 
 #///////////////////////////Function Definitions\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
 #define message sending functions
+mail = MailTransport(SMTPaddress, SMTPport, username, password, smtp_keepalive) #one SMTP session reused by every message
+atexit.register(mail.close)
+
 def SendMessage(toaddress, message):                                            #function for sending regular messages
     """
     Internal function for sending text-only messages (SMS).
@@ -101,23 +148,11 @@ def SendMessage(toaddress, message):
     text = MIMEText(message)
     msg.attach(text)
 
-    server = smtplib.SMTP(SMTPaddress, SMTPport)
-    try:
-        server.starttls()
-    except Exception:
-        print('Looks like your SMTP server may not support TLS. Continuing to send message without it.')
-    if not username:
-        try:
-            server.login(username, password)
-        except Exception:
-            print('Either your username and/or password is incorrect, or you do not need to log in to your SMTP server to send messages.')
-            print('If a message is received, then no login is needed and you can leave username and password blank.')
-    server.sendmail('dmgalert@nist.gov', toaddress, msg.as_string())
-    server.quit()
+    mail.send('dmgalert@nist.gov', toaddress, msg)                              #shared session, see MailTransport.py
 
-def SendMessageMMS(toaddress, message, img_path):                               #function for sending messages with image attached
+def SendMessageMMS(toaddress, message, image):                                  #function for sending messages with image attached
     """
-    Internal function for sending text messages with image attachments (MMS).
+    Internal function for sending text messages with image attachments (MMS). image is a MIME image part, see AlertImage, or None to send the text only.
     """
     msg = MIMEMultipart()                                                       #define msg as having multiple components
     msg['Subject'] = 'DMG Alert: '+labID+' Environment Event'
@@ -125,43 +160,44 @@ def SendMessageMMS(toaddress, message, img_path):
     msg['To'] = toaddress
     text = MIMEText(message)
     msg.attach(text)
-    img_file = open(img_path, 'rb').read()
-    image_attach = MIMEImage(img_file)
-    msg.attach(image_attach)
+    if image is not None:
+        msg.attach(image)                                                       #already encoded, shared by every message of a sample
+    mail.send(fromaddress, toaddress, msg)
 
-    server = smtplib.SMTP(SMTPaddress, SMTPport)
-    try:
-        server.starttls()
-    except Exception:
-        print('Looks like your SMTP server may not support TLS. Continuing to send message without it.')
-    if not username:
-        try:
-            server.login(username, password)
-        except Exception:
-            print('Either your username and/or password is incorrect, or you do not need to log in to your SMTP server to send messages.')
-            print('If a message is received, then no login is needed and you can leave username and password blank.')
-    time.sleep(0.5)
-    server.sendmail(fromaddress, toaddress, msg.as_string())
-    server.quit()
+def LogReading(sensorreading, timestamp):                                       #log a reading from a sensor other than the primary sensor
+    """
+    Internal function for appending readings of additional sensors to <month><YYYY>-all.env.csv in a subdirectory of envdata_directory named after their labID. Missed readings are logged as nan.
+    """
+    sensor_correction = corrections[sensorreading.serial]
+    if sensorreading.reading is None:                                           #gap
+        sensor_values = [float('nan'), float('nan')]
+    else:
+        timestamp = sensorreading.reading.timestamp
+        sensor_values = [sensorreading.reading.temperature + sensor_correction[0], sensorreading.reading.humidity + sensor_correction[1]]
+    sensor_logs[sensorreading.labID].append(timestamp, ','+str(sensor_values[0])+','+str(sensor_values[1]))
+    if database is not None:
+        database.add_sample(sensorreading.labID, timestamp, sensor_values[0], sensor_values[1], FLAG_GAP if sensorreading.reading is None else 0)
+
+def LogSchedule(report):                                                        #log sampling statistics
+    """
+    Internal function for appending a ScheduleReport to <month><YYYY>-schedule.env.csv, to show the device meets its sampling rate.
+    """
+    schedule_log.append(time.time(), ',%d,%d,%d,%.4f,%.4f,%.2f,%.2f' % tuple(report))
+    schedule_log.flush()                                                        #reports are rare, write each one
+    print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Sampled %.2f of %.2f pts/hr, %d overruns, %d skipped, jitter mean %.4f s max %.4f s' % (report.pts_hr, report.pts_hr_set, report.overruns, report.skipped, report.jitter_mean, report.jitter_max))
 
-instr_obj = ConnectInstr(instrport)                                             #connect to instrument
+engine = PollingEngine(sensors, driver=sensordriver, reconnect_after=reconnect_after, backoff=reconnect_backoff, offline_after=offline_after) #connect to instruments, one worker thread per serial port
 
 #////////////////////////Variable Initialization\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
-## Initialize variables and figure setup
-currenttime = np.array([])                                                      #initialize empty lists
-axestime = np.array([])
-temperature = []
-humidity = []
+## Initialize variables and figure setup, the display is drawn by the renderer process (GraphRenderer.py)
+if graph_bucket:                                                                #rolling window of the graphs, preallocated
+    window = MinMaxBuffer(2*math.ceil(graphtime*3600/graph_bucket), graph_bucket, 'temperature', 'humidity')
+else:
+    window = RingBuffer(graph_pts, 'temperature', 'humidity')
 tf_alert_T = []
 tf_alert_RH = []
-plt.ion()                                                                       #activate interactive plotting
-fig = plt.figure(num=1, figsize=(figsize_x, figsize_y), dpi=dpi_set)             #get matplotlib figure ID, set figure size
 gs = gridspec.GridSpec(r_plot, c_plot)
 gs.update(hspace=hspace_set)
-ax1 = plt.subplot(gs[0, :])
-ax2 = plt.subplot(gs[1, :])
-fig.subplots_adjust(left=0.06, right=1, top=0.98, bottom=0.14)
-fig.canvas.toolbar.pack_forget()
 labstatus_T = 'normal'
 labstatus_RH = 'normal'
 
@@ -169,211 +205,275 @@ labstatus_RH = 'normal'
 ## Initial temperature, humidity, and time values
 #used for inside the loop, checking for bad readings
 #check requires at least two values, second acquired in the loop
-#initial temperature
-try:
-    temptemp = ReadTemperature(instr_obj)                                       #read instrument modbus address for temperature
-except Exception:                                                               #reestablish connection if failed
-    instr_obj = Instr_errfix(instr_obj)
-    try:
-        temptemp = ReadTemperature(instr_obj)                                   #read instrumnet modbus address for temperature
-    except Exception:
-        instr_obj = Instr_errfix(instr_obj)
-        try:
-            temptemp = ReadTemperature(instr_obj)
-        except Exception:
-            print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Communications with instrument failed')
-temperature.append(temptemp + correction[0])
-
-#initial humidity
-try:
-    temphumid = ReadHumidity(instr_obj)                                         #read instrument modbus address for humidity
-except Exception:                                                               #reestablish connection if failed
-    instr_obj = Instr_errfix(instr_obj)
-    try:
-        temphumid = ReadHumidity(instr_obj)                                     #read instrument modbus address for humidity
-    except Exception:
-        instr_obj = Instr_errfix(instr_obj)
-        try:
-            temphumid = ReadHumidity(instr_obj)
-        except Exception:
-            print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Communications with instrument failed')
-humidity.append(temphumid + correction[1])
-
-#initial time data
-currenttime = np.append(currenttime, time.strftime("%Y-%m-%d %H:%M:%S"))        #get current system time (yyyy mm dd hh mm ss)
-axestime = np.append(axestime, time.strftime("%H:%M"))
-
-#/////////////////////////////Eternal Loop\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
-## Measure temperature and humidity for all eternity
-while True:
-    ti = time.time()                                                            #begin/reset active timer---------------------------------------------------------------------------
-    #//////////////////////////Instrument Communications\\\\\\\\\\\\\\\\\\\\\\\\\\\\
-    #read temperature
-    try:
-        temptemp = ReadTemperature(instr_obj)                                   #read instrument modbus address for temperature
-    except Exception:                                                           #reestablish connection if failed
-        instr_obj = Instr_errfix(instr_obj)
-        try:
-            temptemp = ReadTemperature(instr_obj)                               #read instrument modbus address for temperature
-        except Exception:
-            instr_obj = Instr_errfix(instr_obj)
-            try:
-                temptemp = ReadTemperature(instr_obj)
-            except Exception:
-                print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Communications with instrument failed')
+#initial temperature and humidity, one modbus transaction per sensor
+batch = engine.poll()
+reading = batch[iprimary].reading
+readingtime = time.time()
+if reading is None:                                                             #start anyway, the other sensors are logged and the primary sensor's missed reads are gaps and outages
+    print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Could not read the primary sensor '+labID+', logging gaps until it is reconnected')
+    window.append(readingtime, math.nan, math.nan)
+else:
+    window.append(readingtime, reading.temperature + correction[0], reading.humidity + correction[1])
+
+#/////////////////////////////Pipeline Stages\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+## Acquisition publishes each sample to the storage, display and alert stages through bounded queues and never waits on them
+pipeline = Pipeline()
+display_queue = pipeline.add_queue('display', stage_queue)                      #consumed by the main thread, matplotlib must stay on it
+
+def Acquire(reading):                                                           #acquisition stage, producer of samples
+    """
+    Internal function for the acquisition thread. Reads the sensors every sleeptimer seconds on a drift-free schedule, rejects spikes and publishes a Sample to every stage. A missed read is published as a gap (nan).
+    reading is the initial reading of the primary sensor, None if it could not be read at startup.
+    """
+    Tfilter = HampelFilter(spike_window, spike_sigma, rereadT)
+    RHfilter = HampelFilter(spike_window, spike_sigma, rereadRH)
+    if reading is not None:                                                     #seed the filters with the initial reading
+        Tfilter.filter(reading.temperature + correction[0])
+        RHfilter.filter(reading.humidity + correction[1])
+    scheduler = SampleScheduler(sleeptimer, schedule_policy)                    #ticks on monotonic deadlines every sleeptimer seconds
+    while True:
+        #//////////////////////////Instrument Communications\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+        #read all sensors, one modbus transaction per sensor, serial ports in parallel. Failed instruments are reconnected in the background
+        if spike_filter == 'median':                                            #oversample, back to back
+            batches = [engine.poll() for i in range(spike_window)]
+            readings = [batch[iprimary].reading for batch in batches if batch[iprimary].reading is not None]
+        else:
+            batches = [engine.poll()]
+            readings = [batches[0][iprimary].reading] if batches[0][iprimary].reading is not None else []
+        batch = batches[-1]
+
+        #reject suspected bad sensor reads
+        flags = 0
+        if not readings:                                                        #missed sample, recorded as a gap instead of repeating the last value
+            temptemp, temphumid = float('nan'), float('nan')
+            flags = FLAG_GAP
+        elif spike_filter == 'median':
+            temptemp, Tspike = MedianOfN([reading.temperature + correction[0] for reading in readings], rereadT)
+            temphumid, RHspike = MedianOfN([reading.humidity + correction[1] for reading in readings], rereadRH)
+        else:
+            temptemp, Tspike = Tfilter.filter(readings[0].temperature + correction[0])
+            temphumid, RHspike = RHfilter.filter(readings[0].humidity + correction[1])
+        if readings:
+            flags = FLAG_T_SPIKE*Tspike | FLAG_RH_SPIKE*RHspike
+        pipeline.publish(Sample(time.time(), temptemp, temphumid, flags, batch))
+
+        scheduler.wait()                                                        #sleep until the next deadline, time taken above does not shift the schedule
+        if scheduler.elapsed() >= schedule_report*60:
+            LogSchedule(scheduler.report())
+
+def StoreSample(sample):                                                        #storage stage
+    """
+    Internal function for the storage stage. Logs each sample to <month><YYYY>-all.env.csv and out of range samples to <month><YYYY>-outages.env.csv
+    """
+    #///////////////////////////////Environment Logs\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    ## Journal the sample first, it is recovered after a power loss if it has not reached the logs
+    if journal is not None:
+        journal.add_sample(sample)
 
-    #if suspected bad sensor read, read temperature again
-    if abs(temptemp - temperature[-1]) > rereadT:
-        time.sleep(10)
-        try:
-            temptemp = ReadTemperature(instr_obj)                               #read instrument modbus address for temperature
-        except Exception:
-            instr_obj = Instr_errfix(instr_obj)
-            try:
-                temptemp = ReadTemperature(instr_obj)                           #read instrument modbus address for temperature
-            except Exception:
-                instr_obj = Instr_errfix(instr_obj)
-                try:
-                    temptemp = ReadTemperature(instr_obj)
-                except Exception:
-                    print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Communications with instrument failed')
-    temperature.append(temptemp + correction[0])
+    ## Append to the open files of this month, the appenders create each month's file and header and write rows in batches
+    #files get stored with month and year as filename in .csv format with .env.csv extension in envdata_directory
+    env_log.append(sample.timestamp, ','+str(sample.temperature)+','+str(sample.humidity))
+    if storage_outage_rows:
+        outage_log.rollover(sample.timestamp)                                   #every month gets an outage file, even without outages
+    if storage_binary:
+        binary_log.append(sample.timestamp, sample.temperature, sample.humidity, sample.flags)
+    if database is not None:
+        database.add_sample(labID, sample.timestamp, sample.temperature, sample.humidity, sample.flags)
+    if rollup is not None:                                                      #5 minute, hourly and daily statistics
+        rollup.add(sample.timestamp, sample.temperature, sample.humidity)
+
+    ## Log additional sensors polled by this device
+    for isensor, sensorreading in enumerate(sample.batch):
+        if isensor != iprimary:
+            LogReading(sensorreading, sample.timestamp)
+
+    ## Log rejected spikes to a -rejected.env.csv file, with the filtered values that were stored
+    if sample.flags & (FLAG_T_SPIKE | FLAG_RH_SPIKE):
+        rejected_log.append(sample.timestamp, ','+str(sample.temperature)+','+str(sample.humidity)
+                            +(',TEMPERATURE SPIKE,' if sample.flags & FLAG_T_SPIKE else ', ,')+('HUMIDITY SPIKE' if sample.flags & FLAG_RH_SPIKE else ' '))
+
+    ## Log outages to a -outage.env.csv file, excursions are also logged as events by the alert stage
+    if storage_outage_rows and ((sample.temperature > Tmax) or (sample.temperature < Tmin) or (sample.humidity > RHmax) or (sample.humidity < RHmin)): #if either T or RH out
+        outagerow = ','+str(sample.temperature)+','+str(sample.humidity)
+        #Record outage type
+        if (sample.temperature > Tmax) or (sample.temperature < Tmin):
+            outagerow += ',TEMPERATURE OUTAGE,'
+        if (sample.humidity > RHmax) or (sample.humidity < RHmin):
+            outagerow += ', ,HUMIDITY OUTAGE'
+        outage_log.append(sample.timestamp, outagerow)
+        if database is not None:
+            database.add_outage(labID, sample.timestamp, sample.temperature, sample.humidity, (sample.temperature > Tmax) or (sample.temperature < Tmin), (sample.humidity > RHmax) or (sample.humidity < RHmin))
+        outage_log.flush()                                                      #outages are written immediately
+
+    ## Write out the logs and empty the journal every storage_flush seconds
+    if (journal is not None) and (time.monotonic() - journal.checkpointed >= storage_flush):
+        FlushLogs()
+
+#monthly logs in envdata_directory, kept open for the storage stage
+env_log = CSVAppender(envdata_directory, '-all.env.csv', 'time,Temperature (deg. C),Humidity (%RH)', storage_flush, storage_fsync, INDEX_INTERVAL) #indexed for time range queries, see EnvQuery.py
+outage_log = CSVAppender(envdata_directory, '-outages.env.csv', 'time,Temperature (deg. C),Humidity (%RH),Temperature Outage?,Humidity Outage?', storage_flush, storage_fsync)
+rejected_log = CSVAppender(envdata_directory, '-rejected.env.csv', 'time,Temperature (deg. C),Humidity (%RH),Temperature Rejected?,Humidity Rejected?', storage_flush, storage_fsync)
+schedule_log = CSVAppender(envdata_directory, '-schedule.env.csv', 'time,Points,Skipped,Overruns,Mean Jitter (s),Max Jitter (s),Achieved (pts/hr),Configured (pts/hr)', storage_flush, storage_fsync)
+binary_log = BinaryAppender(envdata_directory, '-all.env.bin', storage_flush, storage_fsync)
+database = EnvDatabase(storage_database, storage_flush) if storage_database else None #samples and outages for time range queries
+rollup = Rollup(envdata_directory, [Tmin, Tmax], [RHmin, RHmax], sleeptimer, storage_flush, storage_fsync) if storage_rollup else None #statistics tiers
+sensor_logs = dict((sensor['labID'], CSVAppender(envdata_directory+'/'+sensor['labID'].replace('/', '-'), '-all.env.csv', 'time,Temperature (deg. C),Humidity (%RH)', storage_flush, storage_fsync, INDEX_INTERVAL))
+                   for isensor, sensor in enumerate(sensors) if isensor != iprimary) #CSVAppender of each additional sensor
+journal = SampleJournal(envdata_directory+'/LEMAS.journal') if storage_journal else None #samples not yet in the logs and alert state, for power loss recovery
+
+def FlushLogs():
+    """
+    Internal function writing out every log, then checkpointing the journal since its samples are in the logs
+    """
+    for log in [env_log, outage_log, rejected_log, schedule_log, binary_log] + list(sensor_logs.values()):
+        log.flush()
+    if database is not None:
+        database.flush()
+    if rollup is not None:
+        rollup.flush()
+    if journal is not None:
+        journal.checkpoint()
+
+def CloseLogs():
+    """
+    Internal function writing out rows still in memory at exit
+    """
+    for log in [env_log, outage_log, rejected_log, schedule_log, binary_log] + list(sensor_logs.values()):
+        log.close()
+    if database is not None:
+        database.close()
+    if rollup is not None:
+        rollup.close()
+    if journal is not None:
+        journal.checkpoint()
+        journal.close()
+atexit.register(CloseLogs)
+
+## Rebuild the open rollup buckets from the log, including those of a day that ended while stopped
+if rollup is not None:
+    rollup.resume(envdata_directory)
+
+## Store samples journaled before a power loss or crash that did not reach the logs, skipping rows already written
+if journal is not None:
+    journaled, alertstate = journal.recover()
+    if journaled:
+        print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Recovering '+str(len(journaled))+' journaled samples...')
+        replaylogs = [env_log, outage_log, rejected_log, binary_log] + list(sensor_logs.values()) + ([database] if database is not None else [])
+        for log in replaylogs:
+            log.replaying = True
+        for sample in journaled:
+            StoreSample(sample)
+        for log in replaylogs:
+            log.replaying = False
+    FlushLogs()                                                                 #starts journaling
+
+## Warm start the rolling window with the last graphtime hours of the log, read backwards from its end, so the graphs and outage checks have history after a restart
+## Long graphs take the minimum and maximum of the rollup buckets (EnvRollup.py) that fit in their own buckets, and only the log rows after the last one, so a restart costs the same whatever graphtime is
+history = []
+historystart = time.time() - graphtime*3600
+rolluptiers = [tier for tier, seconds in ROLLUP_TIERS.items() if storage_rollup and graph_bucket and (graph_bucket % seconds == 0)]
+if rolluptiers:
+    for stats in QueryRollup(envdata_directory, rolluptiers[-1], historystart):
+        history += [[stats.time, stats.Tmin, stats.RHmin], [stats.time, stats.Tmax, stats.RHmax]]
+    if history:
+        historystart = history[-1][0] + ROLLUP_TIERS[rolluptiers[-1]]
+for row in RecentRows(envdata_directory, graph_pts - 1, historystart):
+    history.append([time.mktime(datetime.datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S").timetuple()), float(row[1]), float(row[2])])
+history = [row for row in history if row[0] < int(readingtime)]
+if history:
+    if time.time() - history[-1][0] > 2*sleeptimer:                             #mark the time the node was down as a gap
+        history.append([history[-1][0] + sleeptimer, math.nan, math.nan])
+    initial = window.copy()                                                     #the first reading follows the history
+    window.clear()
+    for row in history[1 - graph_pts:]:
+        window.append(*row)
+    window.append(*[initial[channel][-1] for channel in ['time', 'temperature', 'humidity']])
+    print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Loaded '+str(len(history))+' points of history from the logs')
+
+## Renderer process draws the display from the window, a stalled or crashed renderer never holds up sampling and is restarted
+render_settings = {'capacity': window.capacity, 'bucket': graph_bucket, 'display_mode': display_mode, 'display_frametime': display_frametime, 'display_interval': display_interval, 'display_path': display_path,
+                   'framebuffer_device': framebuffer_device, 'figsize': [figsize_x, figsize_y], 'dpi': dpi_set, 'mms_dpi': mms_dpi, 'r_plot': r_plot, 'c_plot': c_plot, 'hspace': hspace_set,
+                   'Tmin': Tmin, 'Tmax': Tmax, 'RHmin': RHmin, 'RHmax': RHmax, 'margins': [[graphTmin, graphTmax], [graphRHmin, graphRHmax]], 'linewidth': GraphLinewidth,
+                   'nticks_y': nticks_y, 'tickspacing_x': tickspacing_x, 'maxticks_x': maxticks_x, 'fontsizes': [FontsizeLabel, FontsizeYticks, FontsizeXticks]}
+renderer = GraphRenderer(window, render_settings, render_timeout)
+atexit.register(renderer.close)
+
+def RequestRender(signum, frame):
+    """
+    Internal function for SIGUSR1 (LEMAS render), draws the graphs of a headless node now
+    """
+    renderer.request_render()
+signal.signal(signal.SIGUSR1, RequestRender)
+
+storage_stage = pipeline.add_stage('storage', StoreSample, stage_queue)
+if archive_codec:                                                               #compress closed months at low priority
+    Archiver(envdata_directory, archive_codec).start()
+
+#//////////////////////Communications with outside world\\\\\\\\\\\\\\\\\\\\\\\\
+## Alert stage keeps its own rolling window and draws alert graphs on its own off-screen figure
+alert_window = window.copy()
+alert_recent = RingBuffer(2, 'temperature', 'humidity')                         #latest two samples for the outage checks, the window of a long graph holds buckets
+alert_recent.append(*[window[channel][-1] for channel in ['time', 'temperature', 'humidity']])
+alert_previous = time.time()                                                    #time of the previous sample, the start of an outage
+outage_events = OutageEvents(envdata_directory, storage_fsync)                  #excursions from outage to return to normal
+atexit.register(outage_events.close)
+alert_fig = Figure(figsize=(figsize_x, figsize_y), dpi=mms_dpi)                 #off-screen figure, never touched by the display
+FigureCanvasAgg(alert_fig)
+alert_ax1 = alert_fig.add_subplot(gs[0, :])
+alert_ax2 = alert_fig.add_subplot(gs[1, :], sharex=alert_ax1)
+alert_fig.subplots_adjust(left=0.06, right=1, top=0.98, bottom=0.14)
+alert_graph = EnvGraph(alert_ax1, alert_ax2, [Tmin, Tmax], [RHmin, RHmax], [[graphTmin, graphTmax], [graphRHmin, graphRHmax]], window.capacity, GraphLinewidth, nticks_y, tickspacing_x, maxticks_x,
+                       (FontsizeLabel, FontsizeYticks, FontsizeXticks))
+
+alert_image = [None, None, {}]                                                  #sample index, PNG and MIME image parts by byte budget of the last alert graph
+
+def MMSBudget(toaddress):
+    """
+    Internal function returning the largest graph in bytes for an address or list of addresses, from mms_budget by the domain of each address
+    """
+    addresses = [toaddress] if isinstance(toaddress, str) else toaddress
+    return min(mms_budget.get(address.rsplit('@', 1)[-1].strip().lower(), mms_budget['']) for address in addresses)
 
-    #read humidity
+def AlertImage(window, toaddress):                                              #graph for attaching to messages
+    """
+    Internal function returning the graph of the alert stage's rolling window as a MIME image part that fits the MMS budget of toaddress. Drawn in memory at most once per sample,
+    by the renderer process, or on the off-screen figure here if the renderer does not answer, and encoded once per budget for every message and recipient of that sample.
+    """
+    if alert_image[0] != window.total:
+        image = renderer.render_alert(window['time'][-1])
+        if image is None:
+            alert_graph.update(window)
+            buffer = io.BytesIO()
+            alert_fig.savefig(buffer, format='png')
+            image = buffer.getvalue()
+        alert_image[:] = [window.total, image, {}]
+    budget = MMSBudget(toaddress)
+    if budget not in alert_image[2]:
+        alert_image[2][budget] = MIMEImage(*CompactImage(alert_image[1], budget)) #base64 encoded once
+    return alert_image[2][budget]
+
+def AlertImages(window, toaddresses):                                           #graphs for the recipients of a message
+    """
+    Internal function returning AlertImage for each address, drawn before any message is sent. If the graph cannot be drawn the messages are sent text only, a drawing error is not an internet outage.
+    """
     try:
-        temphumid = ReadHumidity(instr_obj)                                     #read instrument modbus address for humidity
-    except Exception:                                                           #reestablish connection if failed
-        instr_obj = Instr_errfix(instr_obj)
-        try:
-            temphumid = ReadHumidity(instr_obj)                                 #read instrument modbus address for humidity
-        except Exception:
-            instr_obj = Instr_errfix(instr_obj)
-            try:
-                temphumid = ReadHumidity(instr_obj)
-            except Exception:
-                print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Communications with instrument failed')
+        return [AlertImage(window, toaddress) for toaddress in toaddresses]
+    except Exception as err:
+        print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Could not draw the alert graph, sending messages without it: '+repr(err))
+        return [None]*len(toaddresses)
 
-    #if suspected bad sensor read, read humidity again
-    if abs(temphumid - humidity[-1]) > rereadRH:
-        time.sleep(10)
-        try:
-            temphumid = ReadHumidity(instr_obj)                                 #read instrument modbus address for humidity
-        except Exception:
-            instr_obj = Instr_errfix(instr_obj)
-            try:
-                temphumid = ReadHumidity(instr_obj)                             #read instrument modbus address for humidity
-            except Exception:
-                instr_obj = Instr_errfix(instr_obj)
-                try:
-                    temphumid = ReadHumidity(instr_obj)
-                except Exception:
-                    print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Communications with instrument failed')
-    humidity.append(temphumid + correction[1])
-
-    #get and format time
-    currenttime = np.append(currenttime, time.strftime("%Y-%m-%d %H:%M:%S"))    #get current system time (yyyy mm dd hh mm ss)
-    axestime = np.append(axestime, time.strftime("%H:%M"))
-
-    #remove oldest data points from memory that no longer need graphed
-    if len(temperature) >= graph_pts:
-        del temperature[0]
-        del humidity[0]
-        currenttime = np.delete(currenttime, 0)
-        axestime = np.delete(axestime, 0)
-
-    #///////////////////////////////Update Graphs\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
-    time_vec = range(len(axestime))
-
-    #plot temperature
-    ax1 = plt.subplot(gs[0, :])
-    plt.cla()
-    plt.plot(time_vec, temperature, 'r-', linewidth=GraphLinewidth)
-    plt.plot(time_vec, np.zeros([len(time_vec),])+Tmin, 'b-', linewidth=0.25)
-    plt.plot(time_vec, np.zeros([len(time_vec),])+Tmax, 'b-', linewidth=0.25)
-    plt.fill_between(np.array(time_vec), np.zeros([len(time_vec),])+Tmin, np.zeros([len(time_vec),])-1000, alpha=0.2, color='lightblue')
-    plt.fill_between(np.array(time_vec), np.zeros([len(time_vec),])+Tmax, np.zeros([len(time_vec),])+1000, alpha=0.2, color='lightblue')
-    ax1.set_ylim([min(temperature)-graphTmin, max(temperature)+graphTmax])      #y-axis limits
-    ax1.ticklabel_format(style='plain')                                         #disable scientific notation on y-axis
-    plt.setp(ax1.get_xticklabels(), visible=False)                              #hide tickmarks, will use shared axis
-    plt.grid(color='gray', alpha=0.3)
-    plt.text(0.05, 0.1, 'Temperature (deg. C)', transform=ax1.transAxes, alpha=0.5, fontsize=FontsizeLabel, color='gray') #add transparent text to bottom left of first axes
-    ax1.patch.set_facecolor('black')
-    plt.yticks(np.round(np.linspace(min(temperature)-graphTmin, max(temperature)+graphTmax, nticks_y), 1), fontsize=FontsizeYticks)
-    plt.ticklabel_format(useOffset=False)
-
-    #plot humidity with temperature's x-axis
-    ax2 = plt.subplot(gs[1, :], sharex=ax1)
-    plt.cla()
-    plt.plot(time_vec, humidity, 'g-', linewidth=GraphLinewidth)
-    plt.plot(time_vec, np.zeros([len(time_vec),])+RHmin, 'b-', linewidth=0.25)
-    plt.plot(time_vec, np.zeros([len(time_vec),])+RHmax, 'b-', linewidth=0.25)
-    plt.fill_between(np.array(time_vec), np.zeros([len(time_vec),])+RHmin, np.zeros([len(time_vec),])-1000, alpha=0.2, color='lightblue')
-    plt.fill_between(np.array(time_vec), np.zeros([len(time_vec),])+RHmax, np.zeros([len(time_vec),])+1000, alpha=0.2, color='lightblue')
-    ax2.set_ylim([min(humidity)-graphRHmin, max(humidity)+graphRHmax])
-    ax2.ticklabel_format(style='plain')
-    plt.grid(color='gray', alpha=0.3)
-    plt.text(0.05, 0.1, 'Humidity (%RH) ', transform=ax2.transAxes, alpha=0.5, fontsize=FontsizeLabel, color='gray')
-    ax2.patch.set_facecolor('black')
-    plt.yticks(np.round(np.linspace(min(humidity)-graphRHmin, max(humidity)+graphRHmax, nticks_y), 1), fontsize=FontsizeYticks)
-    plt.ticklabel_format(useOffset=False)
-
-    #setup xticks
-    plt.xticks(np.arange(min(time_vec), max(time_vec), tickspacing_x), axestime[np.arange(min(time_vec), max(time_vec), tickspacing_x)], rotation='vertical', fontsize=FontsizeXticks)
-    plt.pause(0.001)
+def AlertSample(sample):                                                        #alert stage
+    """
+    Internal function for the alert stage. Checks each sample against the lab controls and sends outage, incremental and return to normal messages.
+    """
+    global TestmsgSent, ethoutage, ethoutage_sent, ethoutage_Toutmessage, ethoutage_Tinmessage, ethoutage_RHoutmessage, ethoutage_RHinmessage, msglog
+    global labstatus_T, labstatus_RH, tf_alert_T, tf_alert_RH, TincAlert, RHincAlert, alert_previous
+    alert_window.append(sample.timestamp, sample.temperature, sample.humidity) #oldest point drops out of the window
+    alert_recent.append(sample.timestamp, sample.temperature, sample.humidity)
+    temperature, humidity = alert_recent['temperature'], alert_recent['humidity']
 
-    #///////////////////////////////Environment Logs\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
-    ## Data file management
-    #Create EnvironmentData directory if it does not exist
-    if not os.path.isdir(envdata_directory):
-        os.makedirs(envdata_directory)
+    mail.expire()                                                               #close the SMTP session once idle for smtp_keepalive seconds
 
-    ## Read csv and append to end of file
-    #files get stored with month and year as filename in .csv format with .env.csv extension in envdata_directory
-    monthYYYY = time.strftime("%B%Y")                                           #get month and year for title of file
-    if os.path.isfile(envdata_directory+'/'+monthYYYY+'-all.env.csv'):          #use existing monthYYYY.env.csv file
-        envfile = open(envdata_directory+'/'+monthYYYY+'-all.env.csv', 'a')     #open file with append properties
-        envfile.write(str(currenttime[-1]))                                     #add time of measurement
-        envfile.write(','+str(temperature[-1]))                                 #add latest temperature
-        envfile.write(','+str(humidity[-1]))                                    #add latest humidity
-        envfile.write('\n')
-        envfile.close()                                                         #close file
-    else:                                                                       #otherwise create new monthYYYY.env.csv
-        envfile = open(envdata_directory+'/'+monthYYYY+'-all.env.csv', 'w')     #create file with write properties
-        envfile.write('time,Temperature (deg. C),Humidity (%RH)\n')             #write header
-        envfile.write(str(currenttime[-1]))                                     #add time of measurement
-        envfile.write(','+str(temperature[-1]))                                 #add latest temperature
-        envfile.write(','+str(humidity[-1]))                                    #add latest humidity
-        envfile.write('\n')
-        envfile.close()                                                         #close file
-
-        envfile = open(envdata_directory+'/'+monthYYYY+'-outages.env.csv', 'w') #create file with write properties
-        envfile.write('time,Temperature (deg. C),Humidity (%RH),Temperature Outage?,Humidity Outage?\n') #write header
-        envfile.close()                                                         #close file
-
-    ## Log outages to a -outage.env.csv file
-    if (temperature[-1] > Tmax) or (temperature[-1] < Tmin) or (humidity[-1] > RHmax) or (humidity[-1] < RHmin): #if either T or RH out
-        #existing outage file
-        if os.path.isfile(envdata_directory+'/'+monthYYYY+'-outages.env.csv'):  #use existing monthYYYY.env.csv file
-            envfile = open(envdata_directory+'/'+monthYYYY+'-outages.env.csv', 'a') #open file with append properties
-            envfile.write(str(currenttime[-1]))                                 #add time of measurement
-            envfile.write(','+str(temperature[-1]))                             #add latest temperature
-            envfile.write(','+str(humidity[-1]))                                #add latest humidity
-        #new outage file
-        else:                                                                   #otherwise create new monthYYYY.env.csv
-            envfile = open(envdata_directory+'/'+monthYYYY+'-outages.env.csv', 'w') #create file with write properties
-            envfile.write('time,Temperature (deg. C),Humidity (%RH),Temperature Outage?,Humidity Outage?\n') #write header
-            envfile.write(str(currenttime[-1]))                                 #add time of measurement
-            envfile.write(','+str(temperature[-1]))                             #add latest temperature
-            envfile.write(','+str(humidity[-1]))                                #add latest humidity
-        #Record outage type
-        if (temperature[-1] > Tmax) or (temperature[-1] < Tmin):
-            envfile.write(',TEMPERATURE OUTAGE,')
-        if (humidity[-1] > RHmax) or (humidity[-1] < RHmin):
-            envfile.write(', ,HUMIDITY OUTAGE')
-        envfile.write('\n')
-        envfile.close()
-
-    #//////////////////////Communications with outside world\\\\\\\\\\\\\\\\\\\\\\\\
     ## Update NoContact list
     NoContact = []                                                              #reinitialize No Contact list
     labusers = copy.deepcopy(labusers_dict[labID])                              #reinitialize labusers
@@ -394,25 +494,26 @@ while True:
     if (TestmsgDate-comparetime) < datetime.timedelta(0, 30*60) and (TestmsgDate-comparetime) > datetime.timedelta(0, 0): #if 30 minutes prior to sending test message
         if not TestmsgSent:                                                     #if test message has not been sent
             message = testmsg(labID, temperature, humidity)
-            plt.savefig(install_location+'/tmpimg/outage.jpg')                  #save current figure
+            image, = AlertImages(alert_window, [labcontacts])                   #one graph for the whole list
             for naddress in range(len(labcontacts)):
-                SendMessageMMS(labcontacts, message, install_location+'/tmpimg/outage.jpg') #send test message with attached graph
+                SendMessageMMS(labcontacts, message, image)                     #send test message with attached graph
             print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Sending scheduled test message to users...')
             TestmsgSent = True
     else:                                                                       #if not 30 minutes before sending test message
         TestmsgSent = False                                                     #set test message to has not been sent
 
     ## Temperature alerts
+    outage_events.update('temperature', sample.timestamp, temperature[-1], [Tmin, Tmax]) #follow an open excursion
     #initial temperature outage
     if (temperature[-1] > Tmax) or (temperature[-1] < Tmin):                    #if outside of temperature range
         if (temperature[-2] > Tmax) or (temperature[-2] < Tmin):                #if previous temperature was also out of range
             if labstatus_T == 'normal':                                         #if lab status was previously normal, or there was an ethernet outage
-                plt.savefig(install_location+'/tmpimg/outage.jpg')              #save current figure
                 message = TOUTmsg(labID, Tmin, Tmax, temperature, humidity)
                 msglog = 'Start log for'+labID+'\n\n'+message+'\n'
+                images = AlertImages(alert_window, labcontacts)                 #drawn before sending, see AlertImages
                 for naddress, labcontact in enumerate(labcontacts):
                     try:
-                        SendMessageMMS(labcontact, message, install_location+'/tmpimg/outage.jpg') #connect to SMTP server and send outage message with graph attached
+                        SendMessageMMS(labcontact, message, images[naddress]) #connect to SMTP server and send outage message with graph attached
                         msglog = msglog+'\n'+labcontact
                     except Exception:                                           #if cannot reach internet to send messages, continue logging and send outage alert when internet connection resumes
                         if not ethoutage:
@@ -425,6 +526,9 @@ while True:
                 except Exception:
                     pass
                 labstatus_T = 'warning'                                         #elevate status
+                outage_events.start('temperature', alert_previous, 'outage')    #excursion started with the previous sample
+                outage_events.update('temperature', alert_previous, temperature[-2], [Tmin, Tmax])
+                outage_events.update('temperature', sample.timestamp, temperature[-1], [Tmin, Tmax])
             elif labstatus_T == 'warning':                                      #if temperature was already out
                 tf_alert_T = [time.time()]                                      #reset temperature alert timer
 
@@ -434,14 +538,15 @@ while True:
             if (temperature[-1] > Tmin) and (temperature[-1] < Tmax):           #if temperature is within spec
                 TincAlert = [Tmin - TincSet, Tmax + TincSet]                    #reset TincAlert
             elif temperature[-1] > TincAlert[1]:                                #if temperature increased
-                plt.savefig(install_location+'/tmpimg/outage.jpg')
                 message = Tincmsg(labID, Tmin, Tmax, temperature, humidity)
+                outage_events.alert('temperature', 'increase')
                 msglog = 'Start log for'+labID+'\n\n'+message+'\n'
                 TincAlert[1] = TincAlert[1] + TincSet                           #set new incremental alert parameters
                 TincAlert[0] = TincAlert[1] - 2*TincSet
+                images = AlertImages(alert_window, labcontacts)                 #drawn before sending, see AlertImages
                 for naddress, labcontact in enumerate(labcontacts):
                     try:
-                        SendMessageMMS(labcontacts[naddress], message, install_location+'/tmpimg/outage.jpg') #connect to SMTP server and send outage message with graph attached
+                        SendMessageMMS(labcontacts[naddress], message, images[naddress]) #connect to SMTP server and send outage message with graph attached
                         msglog = msglog+'\n'+labcontacts[naddress]
                     except Exception:                                           #if cannot reach internet to send messages, continue logging and send outage alert when internet connection resumes
                         if not ethoutage:
@@ -454,14 +559,15 @@ while True:
                 except Exception:
                     pass
             elif temperature[-1] < TincAlert[0]:                                #if temperature decreased
-                plt.savefig(install_location+'/tmpimg/outage.jpg')
                 message = Tdecmsg(labID, Tmin, Tmax, temperature, humidity)
+                outage_events.alert('temperature', 'decrease')
                 msglog = 'Start log for'+labID+'\n\n'+message+'\n'
                 TincAlert[0] = TincAlert[0] - TincSet                           #set new incremental alert parameters
                 TincAlert[1] = TincAlert[0] + 2*TincSet
+                images = AlertImages(alert_window, labcontacts)                 #drawn before sending, see AlertImages
                 for naddress, labcontact in enumerate(labcontacts):
                     try:
-                        SendMessageMMS(labcontacts[naddress], message, install_location+'/tmpimg/outage.jpg') #connect to SMTP server and send outage message with graph attached
+                        SendMessageMMS(labcontacts[naddress], message, images[naddress]) #connect to SMTP server and send outage message with graph attached
                         msglog = msglog+'\n'+labcontacts[naddress]
                     except Exception:                                           #if cannot reach internet to send messages, continue logging and send outage alert when internet connection resumes
                         if not ethoutage:
@@ -475,9 +581,10 @@ while True:
                     pass
     #temperature outage under an internet outage
     if ethoutage:                                                               #if under internet outage, try to send queued messages
+        images = AlertImages(alert_window, labcontacts)                         #drawn before sending, see AlertImages
         for naddress, labcontact in enumerate(labcontacts):
             try:
-                SendMessageMMS(labcontacts[naddress], ethoutage_Toutmessage, install_location+'/tmpimg/outage.jpg') #connect to SMTP server and send outage message with graph attached
+                SendMessageMMS(labcontacts[naddress], ethoutage_Toutmessage, images[naddress]) #connect to SMTP server and send outage message with graph attached
                 ethoutage_sent = True                                           #set status of messages queued under ethernet outage
             except Exception:                                                   #if cannot reach internet to send messages, continue logging and send outage alert when internet connection resumes
                 pass
@@ -492,12 +599,12 @@ while True:
             if not tf_alert_T:                                                  #if temperature alert timer has not been set
                 tf_alert_T = [time.time()]                                      #set the start of the temperature alert timer
             elif (time.time() - tf_alert_T[0]) > normalstatus_wait*60:          #if normalstatus_wait has passed since temperature alert timer has start/reset
-                plt.savefig(install_location+'/tmpimg/outage.jpg')              #save current figure
                 message = TRETURNmsg(labID, Tmin, Tmax, temperature, humidity)
                 msglog = 'Start log for'+labID+'\n\n'+message+'\n'
+                images = AlertImages(alert_window, labcontacts)                 #drawn before sending, see AlertImages
                 for naddress, labcontact in enumerate(labcontacts):
                     try:
-                        SendMessageMMS(labcontacts[naddress], message, install_location+'/tmpimg/outage.jpg') #connect to SMTP server and send outage message with graph attached
+                        SendMessageMMS(labcontacts[naddress], message, images[naddress]) #connect to SMTP server and send outage message with graph attached
                         msglog = msglog+'\n'+labcontacts[naddress]
                     except Exception:
                         if not ethoutage:
@@ -510,13 +617,15 @@ while True:
                 except Exception:
                     pass
                 labstatus_T = 'normal'                                          #reduce status
+                outage_events.end('temperature', sample.timestamp, 'return')
                 tf_alert_T = []                                                 #remove temperature alert timer
 
     #temperature outage under an internet outage
     if ethoutage:                                                               #if under internet outage, try to send queued messages
+        images = AlertImages(alert_window, labcontacts)                         #drawn before sending, see AlertImages
         for naddress, labcontact in enumerate(labcontacts):
             try:
-                SendMessageMMS(labcontacts[naddress], ethoutage_Tinmessage, install_location+'/tmpimg/outage.jpg') #connect to SMTP server and send outage message with graph attached
+                SendMessageMMS(labcontacts[naddress], ethoutage_Tinmessage, images[naddress]) #connect to SMTP server and send outage message with graph attached
                 ethoutage_sent = True                                           #set status of messages queued under ethernet outage
             except Exception:                                                   #if cannot reach internet to send messages, continue logging and send outage alert when internet connection resumes
                 pass
@@ -526,16 +635,17 @@ while True:
             pass
 
     ## Humidity alerts
+    outage_events.update('humidity', sample.timestamp, humidity[-1], [RHmin, RHmax])
     #initial humidity outage
     if (humidity[-1] > RHmax) or (humidity[-1] < RHmin):                        #if outside of humidity range
         if (humidity[-2] > RHmax) or (humidity[-2] < RHmin):                    #if previous humidity was also out of range
             if labstatus_RH == 'normal':                                        #if lab status was previously normal
-                plt.savefig(install_location+'/tmpimg/outage.jpg')              #save current figure
                 message = RHOUTmsg(labID, RHmin, RHmax, temperature, humidity)
                 msglog = 'Start log for'+labID+'\n\n'+message+'\n'
+                images = AlertImages(alert_window, labcontacts)                 #drawn before sending, see AlertImages
                 for naddress, labcontact in enumerate(labcontacts):
                     try:
-                        SendMessageMMS(labcontacts[naddress], message, install_location+'/tmpimg/outage.jpg') #connect to SMTP server and send outage message with graph attached
+                        SendMessageMMS(labcontacts[naddress], message, images[naddress]) #connect to SMTP server and send outage message with graph attached
                         msglog = msglog+'\n'+labcontacts[naddress]
                     except Exception:
                         if not ethoutage:
@@ -548,6 +658,9 @@ while True:
                 except Exception:
                     pass
                 labstatus_RH = 'warning'                                        #elevate status
+                outage_events.start('humidity', alert_previous, 'outage')
+                outage_events.update('humidity', alert_previous, humidity[-2], [RHmin, RHmax])
+                outage_events.update('humidity', sample.timestamp, humidity[-1], [RHmin, RHmax])
             elif labstatus_RH == 'warning':                                     #if humidity was already out
                 tf_alert_RH = [time.time()]                                     #reset humidity alert timer
     #incremental humidity alerts
@@ -556,14 +669,15 @@ while True:
             if (humidity[-1] > RHmin) and (humidity[-1] < RHmax):               #if humidity is within spec
                 RHincAlert = [RHmin - RHincSet, RHmax + RHincSet]               #reset TincAlert
             elif humidity[-1] > RHincAlert[1]:                                  #if humidity increased
-                plt.savefig(install_location+'/tmpimg/outage.jpg')
                 message = RHincmsg(labID, RHmin, RHmax, temperature, humidity)
+                outage_events.alert('humidity', 'increase')
                 msglog = 'Start log for'+labID+'\n\n'+message+'\n'
                 RHincAlert[1] = RHincAlert[1] + RHincSet                        #set new incremental alert parameters
                 RHincAlert[0] = RHincAlert[1] - 2*RHincSet
+                images = AlertImages(alert_window, labcontacts)                 #drawn before sending, see AlertImages
                 for naddress, labcontact in enumerate(labcontacts):
                     try:
-                        SendMessageMMS(labcontacts[naddress], message, install_location+'/tmpimg/outage.jpg') #connect to SMTP server and send outage message with graph attached
+                        SendMessageMMS(labcontacts[naddress], message, images[naddress]) #connect to SMTP server and send outage message with graph attached
                         msglog = msglog+'\n'+labcontacts[naddress]
                     except Exception:                                           #if cannot reach internet to send messages, continue logging and send outage alert when internet connection resumes
                         if not ethoutage:
@@ -576,14 +690,15 @@ while True:
                 except Exception:
                     pass
             elif humidity[-1] < RHincAlert[0]:                                  #if humidity decreased
-                plt.savefig(install_location+'/tmpimg/outage.jpg')
                 message = RHdecmsg(labID, RHmin, RHmax, temperature, humidity)
+                outage_events.alert('humidity', 'decrease')
                 msglog = 'Start log for'+labID+'\n\n'+message+'\n'
                 RHincAlert[0] = RHincAlert[0] - RHincSet                        #set new incremental alert parameters
                 RHincAlert[1] = RHincAlert[0] + 2*RHincSet
+                images = AlertImages(alert_window, labcontacts)                 #drawn before sending, see AlertImages
                 for naddress, labcontact in enumerate(labcontacts):
                     try:
-                        SendMessageMMS(labcontacts[naddress], message, install_location+'/tmpimg/outage.jpg') #connect to SMTP server and send outage message with graph attached
+                        SendMessageMMS(labcontacts[naddress], message, images[naddress]) #connect to SMTP server and send outage message with graph attached
                         msglog = msglog+'\n'+labcontacts[naddress]
                     except Exception:                                           #if cannot reach internet to send messages, continue logging and send outage alert when internet connection resumes
                         if not ethoutage:
@@ -597,9 +712,10 @@ while True:
                 except Exception:
                     pass
     if ethoutage:                                                               #if under internet outage, try to send queued messages
+        images = AlertImages(alert_window, labcontacts)                         #drawn before sending, see AlertImages
         for naddress, labcontact in enumerate(labcontacts):
             try:
-                SendMessageMMS(labcontacts[naddress], ethoutage_RHoutmessage, install_location+'/tmpimg/outage.jpg') #connect to SMTP server and send outage message with graph attached
+                SendMessageMMS(labcontacts[naddress], ethoutage_RHoutmessage, images[naddress]) #connect to SMTP server and send outage message with graph attached
                 ethoutage_sent = True                                           #set status of messages queued under ethernet outage
             except Exception:                                                   #if cannot reach internet to send messages, continue logging and send outage alert when internet connection resumes
                 pass
@@ -616,10 +732,10 @@ while True:
             elif (time.time() - tf_alert_RH[0]) > normalstatus_wait*60:         #if normalstatus_wait has passed since humidity alert timer has start/reset
                 message = RHRETURNmsg(labID, RHmin, RHmax, temperature, humidity)
                 msglog = 'Start log for'+labID+'\n\n'+message+'\n'
-                plt.savefig(install_location+'/tmpimg/outage.jpg')              #save current figure
+                images = AlertImages(alert_window, labcontacts)                 #drawn before sending, see AlertImages
                 for naddress, labcontact in enumerate(labcontacts):
                     try:
-                        SendMessageMMS(labcontacts[naddress], message, install_location+'/tmpimg/outage.jpg') #connect to SMTP server and send outage message with graph attached
+                        SendMessageMMS(labcontacts[naddress], message, images[naddress]) #connect to SMTP server and send outage message with graph attached
                         msglog = msglog+'\n'+labcontacts[naddress]
                     except Exception:
                         if not ethoutage:
@@ -632,11 +748,13 @@ while True:
                 except Exception:
                     pass
                 labstatus_RH = 'normal'                                         #reduce status
+                outage_events.end('humidity', sample.timestamp, 'return')
                 tf_alert_RH = []                                                #remove humidity alert timer
     if ethoutage:                                                               #if under internet outage, try to send queued messages
+        images = AlertImages(alert_window, labcontacts)                         #drawn before sending, see AlertImages
         for naddress, labcontact in enumerate(labcontacts):
             try:
-                SendMessageMMS(labcontacts[naddress], ethoutage_RHinmessage, install_location+'/tmpimg/outage.jpg') #connect to SMTP server and send outage message with graph attached
+                SendMessageMMS(labcontacts[naddress], ethoutage_RHinmessage, images[naddress]) #connect to SMTP server and send outage message with graph attached
                 ethoutage_sent = True                                           #set status of messages queued under ethernet outage
             except Exception:                                                   #if cannot reach internet to send messages, continue logging and send outage alert when internet connection resumes
                 pass
@@ -652,7 +770,39 @@ while True:
             ethoutage = False
             ethoutage_sent = False
 
-    tf = time.time()                                                            #stop timer---------------------------------------------------------------------------
-    if sleeptimer-(tf-ti) > 0:
-        time.sleep(sleeptimer-(tf-ti))                                          #sleep for sleeptimer less time taken for the above lines
+    alert_previous = sample.timestamp
+
+    ## Journal the alert state, recovered after a restart
+    if journal is not None:
+        journal.add_state({'controls': [Tmin, Tmax, RHmin, RHmax, TincSet, RHincSet], 'labstatus_T': labstatus_T, 'labstatus_RH': labstatus_RH,
+                           'TincAlert': list(TincAlert), 'RHincAlert': list(RHincAlert), 'tf_alert_T': list(tf_alert_T), 'tf_alert_RH': list(tf_alert_RH),
+                           'events': outage_events.state()})
+
+## Recover the alert state journaled before a restart, unless the lab controls have changed since
+if (journal is not None) and (journal.state is not None) and (journal.state['controls'] == [Tmin, Tmax, RHmin, RHmax, TincSet, RHincSet]):
+    labstatus_T, labstatus_RH = journal.state['labstatus_T'], journal.state['labstatus_RH']
+    TincAlert, RHincAlert = list(journal.state['TincAlert']), list(journal.state['RHincAlert'])
+    tf_alert_T, tf_alert_RH = list(journal.state['tf_alert_T']), list(journal.state['tf_alert_RH'])
+    outage_events.restore(journal.state.get('events', {}))
+    print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Recovered alert state, temperature status '+labstatus_T+', humidity status '+labstatus_RH)
+
+alert_stage = pipeline.add_stage('alert', AlertSample, stage_queue)
+
+#/////////////////////////////Eternal Loop\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+## Measure temperature and humidity for all eternity on the acquisition thread, pass samples to the renderer on the main thread as they arrive
+acquisition = threading.Thread(target=Acquire, args=(reading,), name='LEMAS acquisition', daemon=True)
+acquisition.start()
+while True:
+    try:
+        samples = [display_queue.get(timeout=sleeptimer)] + display_queue.drain() #wait for the next sample, take along any backlog
+    except queue.Empty:
+        if not acquisition.is_alive():
+            raise SystemExit('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Acquisition stopped')
+        samples = []
+
+    for sample in samples:
+        renderer.append(sample.timestamp, sample.temperature, sample.humidity)  #shared memory, never waits on the renderer
+
+    #///////////////////////////////Update Graphs\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\\
+    renderer.check()                                                            #restart the renderer if it exited or hung
 #end of while
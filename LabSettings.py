@@ -10,6 +10,18 @@ envdata_directory = '/home/'+getpass.getuser()+'/Desktop/EnvironmentData'
 #set communications port. On Raspbian for USB-to-serial it should be /dev/ttyUSB0 (check dmesg immediately after connecting USB), default = /dev/ttyUSB0
 #if using GPIO, some modification will be needed to LEMASRun* scripts
 instrport = '/dev/ttyUSB0'
+#to run without a sensor, set instrport to 'sim:<scenario>' where scenario is steady, hvac, excursion, dropout or garbage (see InstrSimulator.py)
+#sensor model, selects the modbus register map in RegisterMaps.py used to read temperature and humidity in a single request, default is CometT3311
+sensormodel = 'CometT3311'
+#sensor driver, how the sensor is connected and read (see SensorDrivers.py): comet, modbus, ascii or sim. Only the selected driver's libraries are imported, default is comet
+sensordriver = 'comet'
+
+#simulated instrument settings. time for each simulated read, seconds, default is 0.05 seconds
+sim_latency = 0.05
+#fraction of simulated reads that fail, default is 0
+sim_errorrate = 0
+#simulated seconds per real second, e.g. 60 plays an hour of the scenario every minute, default is 1
+sim_speed = 1
 
 ## Display and graph settings
 #display pixels per inch for 5", 800x480 display, default is 190 px/in^2
@@ -25,6 +37,8 @@ figsize_x = 4.2
 figsize_y = 2.2
 #length of time to graph into past, hours, default is 12 hours
 graphtime = 12
+#most points to graph. When graphtime holds more samples, the graphs show the minimum and maximum of each bucket of time instead, read from the rollup logs after a restart. Default is 1600, two per pixel of the 800 pixel display
+graph_points = 1600
 #amount of space to graph above maximum temperature in graph time range, deg. C. Keep greater than 0.05 deg. C, too small will cause y-axis ticks to appear equal when using a low number of y-ticks
 graphTmax = 0.5
 #amount of space to graph below minimum temperature in graph time range, deg. C. Keep greater than 0.05 deg. C, too small will cause y-axis ticks to appear equal when using a low number of y-ticks
@@ -35,6 +49,8 @@ graphRHmax = 1
 graphRHmin = 1
 #number of points between each x-axis tickmark, default is 20 points per tick
 tickspacing_x = 20
+#most tickmarks on the time axis, the points between tickmarks are raised for long graphs, default is 24 tickmarks
+maxticks_x = 24
 #numbter of ticks on the y-axis, default is 3 tickmarks
 nticks_y = 3
 #fontsize for graph label text, Temperature (deg.C) amd Humidity (RH) text
@@ -45,6 +61,22 @@ FontsizeYticks = 5
 FontsizeXticks = 5
 #linewidth of plots of temperature and humidity
 GraphLinewidth = 2.0
+#how graphs are shown: gui (a matplotlib window, needs an X display), headless (no window, graphs are drawn off-screen only when needed) or framebuffer (headless, drawn straight to framebuffer_device for the attached display), default is gui
+display_mode = 'gui'
+#headless and framebuffer modes: seconds between drawing the graphs, 0 draws them only for alerts and on request (LEMAS render), default is 300 seconds
+display_interval = 300
+#headless and framebuffer modes: also save the graphs to this image file when drawn, e.g. for a web page. Empty to not save, default is ''
+display_path = ''
+#framebuffer mode: framebuffer device of the attached display, default is /dev/fb0
+framebuffer_device = '/dev/fb0'
+#gui mode: seconds between frames of the display, drawn by a separate renderer process (GraphRenderer.py), default is 1 second
+display_frametime = 1
+#seconds without a frame after which the renderer process is restarted, default is 60 seconds
+render_timeout = 60
+#pixels per inch of the graphs attached to alerts, smaller than the display's for MMS gateways. Fonts and lines keep their size in points, default is 120
+mms_dpi = 120
+#largest attached graph for each carrier gateway, bytes by domain of the contact address, '' for any other domain. The graph is sent as a palette PNG, else a JPEG of lower quality and size, that fits. E.g. {'': 300000, 'mms.example.net': 100000}, default is {'': 300000}
+mms_budget = {'': 300000}
 
 ## Device behavior
 #number of minutes to wait before sending message for return to normal status (for ensuring environment is not oscillating around limits), default is 10 minutes
@@ -57,8 +89,44 @@ TincSet = 5
 RHincSet = 10
 #number of points to record per hour, default is 40 pt/hr (every 90 seconds)
 pts_hr = 40
-#Conditions for reacquiring data from sensor to prevent graphing bad reads
-#if change in temperature from previous is greater than this, reread temperature, deg. C
+#what to do when a point takes longer than its share of the hour, 'skip' drops the missed points and keeps the spacing, 'catchup' takes the missed points back to back, default is 'skip'
+schedule_policy = 'skip'
+#minutes between reports of sampling jitter, overruns and achieved pts_hr, logged to <month><YYYY>-schedule.env.csv, default is 60 minutes
+schedule_report = 60
+#Instrument recovery
+#number of consecutive failed reads before an instrument is reconnected in the background, default is 3. Missed samples are logged as nan
+reconnect_after = 3
+#first and maximum wait between reconnect attempts, seconds. The wait doubles after each failed attempt plus up to 50% random jitter, default is [5, 300]
+reconnect_backoff = [5, 300]
+#number of seconds of failed reconnect attempts before an instrument is reported offline, default is 600 seconds
+offline_after = 600
+#number of samples the storage, display and alert stages may fall behind acquisition before their oldest queued samples are dropped, default is 1000 samples
+stage_queue = 1000
+#Log storage. The monthly .env.csv files are kept open and rows are written together at most every storage_flush seconds, default is 300 seconds (0 writes every row)
+storage_flush = 300
+#when logs are forced from memory onto the SD card: 'flush' after each write, 'close' only when a month's file is closed, 'never' leaves it to the operating system, default is 'flush'
+storage_fsync = 'flush'
+#also log samples with their spike and gap flags to <month><YYYY>-all.env.bin, a binary format numpy loads without parsing (see EnvBinary.py), default is False
+storage_binary = False
+#also store samples of every sensor and outages in a SQLite database for fast time range queries (see EnvDatabase.py), e.g. envdata_directory+'/LEMAS.db'. Rows are inserted every storage_flush seconds, default is '' for no database
+storage_database = ''
+#journal each sample and the alert state to envdata_directory/LEMAS.journal, synced to disk, so a restart after a power loss recovers samples that had not reached the logs and does not resend or miss outage messages (see SampleJournal.py). Logs are only guaranteed on disk with storage_fsync = 'flush', default is True
+storage_journal = True
+#compress the .env.csv logs of closed months in the background to save SD card space, 'gzip' or 'lzma' (smaller, slower), see EnvArchive.py for reading them. Default is '', logs are kept uncompressed
+archive_codec = ''
+#keep 5 minute, hourly and daily statistics (points, sum, sum of squares, min, max, seconds out of controls) in <month><YYYY>-rollup-<tier>.env.csv for long range graphs and reports (see EnvRollup.py), default is True
+storage_rollup = True
+#outages are logged as events, one row per excursion with its start, end, peak and the alerts sent, to <month><YYYY>-events.env.csv (see OutageEvents.py). Also log every out of range sample to <month><YYYY>-outages.env.csv, default is True
+storage_outage_rows = True
+#Spike rejection to prevent graphing bad reads, never waits on the sensor. Rejected readings are logged to <month><YYYY>-rejected.env.csv
+#'hampel' compares each reading to the median of the last spike_window readings and stores the median if it is a spike
+#'median' reads the sensor spike_window times back to back for each point and stores the median, default is 'hampel'
+spike_filter = 'hampel'
+#number of readings used by the spike filter, default is 5
+spike_window = 5
+#hampel filter threshold, number of scaled median absolute deviations from the median before a reading is a spike, default is 3
+spike_sigma = 3
+#smallest change in temperature from the median that is rejected as a spike, deg. C
 rereadT = 0.5
-#if change in humidity from previous is greater than this, reread humidity, %RH
+#smallest change in humidity from the median that is rejected as a spike, %RH
 rereadRH = 1
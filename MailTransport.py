@@ -0,0 +1,99 @@
+"""
+One SMTP session per server, reused for every recipient and alert instead of connecting, starting TLS and logging in for each message.
+The session is checked with NOOP before it is reused after check_after idle seconds. A session the server closed is reopened once, so a message is only lost when a fresh connection fails too.
+Sessions idle for longer than keepalive seconds are closed by expire(), servers drop idle clients anyway.
+"""
+import time
+import smtplib
+import threading
+
+class MailTransport:
+    """
+    Sends messages through the SMTP server at address:port, logging in when username is set
+    """
+    def __init__(self, address, port, username='', password='', keepalive=300, check_after=10, timeout=60):
+        self.address = address
+        self.port = port
+        self.username = username
+        self.password = password
+        self.keepalive = keepalive
+        self.check_after = check_after
+        self.timeout = timeout                                                  #seconds for connecting and each reply
+        self.lock = threading.Lock()
+        self.server = None
+        self.used = 0                                                           #time.monotonic() of the last command
+
+    def connect(self):
+        """
+        Open a session, caller holds the lock
+        """
+        server = smtplib.SMTP(self.address, self.port, timeout=self.timeout)
+        try:
+            server.starttls()
+        except Exception:
+            print('Looks like your SMTP server may not support TLS. Continuing to send message without it.')
+        if self.username:
+            try:
+                server.login(self.username, self.password)
+            except Exception:
+                print('Either your username and/or password is incorrect, or you do not need to log in to your SMTP server to send messages.')
+                print('If a message is received, then no login is needed and you can leave username and password blank.')
+        self.server = server
+        self.used = time.monotonic()
+
+    def drop(self):
+        """
+        Close the session, caller holds the lock
+        """
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:                                                       #already closed by the server
+            self.server.close()
+        self.server = None
+
+    def send(self, fromaddress, toaddress, msg):
+        """
+        Send a MIME message, reusing the open session. Raises if the message could not be sent, e.g. while the network is down.
+        """
+        with self.lock:
+            if (self.server is not None) and (time.monotonic() - self.used > self.check_after):
+                try:
+                    if self.server.noop()[0] != 250:
+                        self.drop()
+                except (smtplib.SMTPException, OSError):                        #closed by the server
+                    self.drop()
+            reused = self.server is not None
+            for attempt in range(2):
+                if self.server is None:
+                    self.connect()
+                try:
+                    self.server.sendmail(fromaddress, toaddress, msg.as_string())
+                    self.used = time.monotonic()
+                    return
+                except (smtplib.SMTPServerDisconnected, OSError):
+                    self.drop()
+                    if not reused or attempt:
+                        raise
+                except smtplib.SMTPResponseException as error:
+                    if error.smtp_code != 421:                                  #refused, the session is still good
+                        raise
+                    self.drop()                                                 #server is closing the session
+                    if not reused or attempt:
+                        raise
+
+    def expire(self):
+        """
+        Close the session if it has been idle for keepalive seconds
+        """
+        with self.lock:
+            if (self.server is not None) and (time.monotonic() - self.used > self.keepalive):
+                self.drop()
+
+    def close(self):
+        """
+        Close the session, e.g. at exit
+        """
+        with self.lock:
+            self.drop()
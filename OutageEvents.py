@@ -0,0 +1,124 @@
+"""
+Outage events, one per temperature or humidity excursion instead of one row per out of range sample.
+An event is opened when the alert stage raises labstatus_T or labstatus_RH to warning and closed when the status returns to normal. Meanwhile it keeps the peak deviation past the controls, when the environment came back inside the controls and the alerts sent.
+Closed events are logged to <month><YYYY>-events.env.csv in envdata_directory, the time of a row is the end of the event. Open events are kept in the journaled alert state (SampleJournal.py).
+Run this file for an excursion report: python3 OutageEvents.py <envdata_directory> <number of days>
+"""
+import sys
+import math
+import time
+import datetime
+import collections
+from CSVAppender import CSVAppender, FSYNC_FLUSH
+from EnvQuery import QueryRange
+
+HEADER = 'time,Channel,Start,Back in Controls,Peak,Peak Deviation,Alerts Sent,Out of Controls (s),Time to Normal (s)'
+
+#a closed event. times are seconds since epoch, back is when the channel came back inside its controls, deviation is how far the peak was past the controls, alerts lists the messages sent
+OutageEvent = collections.namedtuple('OutageEvent', ['channel', 'start', 'back', 'end', 'peak', 'deviation', 'alerts'])
+
+def ParseTime(timestring):
+    """
+    Seconds since epoch of a "%Y-%m-%d %H:%M:%S" log time, nan if empty
+    """
+    if not timestring:
+        return math.nan
+    return time.mktime(datetime.datetime.strptime(timestring, "%Y-%m-%d %H:%M:%S").timetuple())
+
+def FormatTime(timestamp):
+    """
+    Log time of seconds since epoch, empty for nan
+    """
+    if math.isnan(timestamp):
+        return ''
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+
+class OutageEvents:
+    """
+    Open outage events by channel ('temperature' or 'humidity'), and the log of closed events
+    """
+    def __init__(self, directory, fsync=FSYNC_FLUSH):
+        self.log = CSVAppender(directory, '-events.env.csv', HEADER, 0, fsync)  #events are rare, written straight away
+        self.open = {}                                                          #channel: event dictionary
+
+    def start(self, channel, timestamp, alert):
+        """
+        Open an event that started at timestamp, alert is the message that raised the status
+        """
+        self.open[channel] = {'start': timestamp, 'back': math.nan, 'peak': math.nan, 'deviation': 0.0, 'alerts': [alert]}
+
+    def update(self, channel, timestamp, value, limits):
+        """
+        Follow an open event with a new value of its channel and the controls [<minimum>, <maximum>]
+        """
+        event = self.open.get(channel)
+        if (event is None) or math.isnan(value):
+            return
+        deviation = max(value - limits[1], limits[0] - value)
+        if deviation > 0:                                                       #still out
+            event['back'] = math.nan
+            if deviation > event['deviation']:
+                event['peak'] = value
+                event['deviation'] = deviation
+        elif math.isnan(event['back']):
+            event['back'] = timestamp
+
+    def alert(self, channel, alert):
+        """
+        Record a message sent during an open event
+        """
+        if channel in self.open:
+            self.open[channel]['alerts'].append(alert)
+
+    def end(self, channel, timestamp, alert):
+        """
+        Close an event when its status returns to normal, alert is the message sent, and log it
+        """
+        event = self.open.pop(channel, None)
+        if event is None:                                                       #opened before events were kept
+            return
+        event['alerts'].append(alert)
+        back = event['back'] if not math.isnan(event['back']) else timestamp
+        self.log.append(timestamp, ','+channel+','+FormatTime(event['start'])+','+FormatTime(event['back'])+','+str(round(event['peak'], 4))+','+str(round(event['deviation'], 4))
+                        +','+' '.join(event['alerts'])+',%.0f,%.0f' % (back - event['start'], timestamp - event['start']))
+
+    def state(self):
+        """
+        Open events as plain values for the journal, nan is written as None
+        """
+        return dict((channel, dict((key, None if isinstance(value, float) and math.isnan(value) else value) for key, value in event.items())) for channel, event in self.open.items())
+
+    def restore(self, state):
+        """
+        Reopen events from journaled state
+        """
+        self.open = dict((channel, dict((key, math.nan if value is None else value) for key, value in event.items())) for channel, event in state.items())
+
+    def close(self):
+        """
+        Close the log, e.g. at exit
+        """
+        self.log.close()
+
+def QueryEvents(directory, start, end=None):
+    """
+    OutageEvents that ended from start to end (seconds since epoch, end defaults to now)
+    """
+    events = []
+    for row in QueryRange(directory, start, end, '-events.env.csv'):
+        events.append(OutageEvent(row[1], ParseTime(row[2]), ParseTime(row[3]), ParseTime(row[0]), float(row[4]), float(row[5]), row[6].split()))
+    return events
+
+if __name__ == '__main__':
+    directory = sys.argv[1] if len(sys.argv) > 1 else '.'
+    days = float(sys.argv[2]) if len(sys.argv) > 2 else 90
+    events = QueryEvents(directory, time.time() - days*86400)
+    for channel in ['temperature', 'humidity']:
+        excursions = [event for event in events if event.channel == channel]
+        if not excursions:
+            print(channel+': no excursions in %g days' % days)
+            continue
+        durations = [event.end - event.start for event in excursions]
+        worst = max(excursions, key=lambda event: event.deviation)
+        print(channel+': %d excursions in %g days, %.1f h until normal in total, longest %.1f h, worst peak %g on %s'
+              % (len(excursions), days, sum(durations)/3600, max(durations)/3600, worst.peak, FormatTime(worst.start)))
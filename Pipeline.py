@@ -0,0 +1,112 @@
+"""
+Bounded queues and consumer stages decoupling acquisition from storage, display and alerting.
+The acquisition loop publishes every sample to each stage queue without waiting on any stage. When a queue is full its overflow policy decides which sample is dropped, and the drop is counted and reported.
+"""
+import time
+import queue
+import threading
+import collections
+
+#a corrected sample of the primary sensor passed between stages, timestamp is seconds since epoch, flags holds the FLAG_ bits below, batch holds the SensorReadings of every sensor for this tick
+Sample = collections.namedtuple('Sample', ['timestamp', 'temperature', 'humidity', 'flags', 'batch'])
+
+#sample flag bits
+FLAG_T_SPIKE = 1                                                                #temperature reading rejected as a spike, filtered value stored instead
+FLAG_RH_SPIKE = 2                                                               #humidity reading rejected as a spike, filtered value stored instead
+FLAG_GAP = 4                                                                    #sensor could not be read, temperature and humidity are nan
+
+#overflow policies
+DROP_OLDEST = 'drop oldest'                                                     #discard the oldest queued sample to make room, stage always sees the most recent data
+DROP_NEWEST = 'drop newest'                                                     #discard the sample being published, stage keeps its backlog in order
+
+class StageQueue:
+    """
+    Bounded queue between the producer and one consumer stage. put() never blocks the producer.
+    """
+    def __init__(self, name, maxsize, policy=DROP_OLDEST):
+        self.name = name
+        self.policy = policy
+        self.dropped = 0                                                        #number of samples lost to overflow
+        self.queue = queue.Queue(maxsize)
+
+    def put(self, item):
+        """
+        Queue item for the stage, applying the overflow policy if the stage has fallen maxsize items behind
+        """
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                self.dropped += 1
+                print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : '+self.name+' stage is behind, '+self.policy+' sample ('+str(self.dropped)+' dropped)')
+                if self.policy == DROP_NEWEST:
+                    return
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:                                             #consumer caught up in the meantime
+                    pass
+
+    def get(self, timeout=None):
+        """
+        Wait for the next item. Raises queue.Empty on timeout.
+        """
+        return self.queue.get(timeout=timeout)
+
+    def drain(self):
+        """
+        Return every queued item without waiting
+        """
+        items = []
+        while True:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                return items
+
+class Stage(threading.Thread):
+    """
+    Consumer thread calling handler(item) for every item of its StageQueue. An exception in the handler is reported and the stage carries on with the next item.
+    """
+    def __init__(self, stagequeue, handler):
+        threading.Thread.__init__(self, name='LEMAS '+stagequeue.name, daemon=True)
+        self.stagequeue = stagequeue
+        self.handler = handler
+
+    def run(self):
+        while True:
+            item = self.stagequeue.get()
+            try:
+                self.handler(item)
+            except Exception as err:
+                print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Error in '+self.stagequeue.name+' stage: '+repr(err))
+
+class Pipeline:
+    """
+    Fans published samples out to every stage queue
+    """
+    def __init__(self):
+        self.queues = []
+
+    def add_queue(self, name, maxsize, policy=DROP_OLDEST):
+        """
+        Add a queue consumed by the caller, e.g. the display which must run on the main thread
+        """
+        stagequeue = StageQueue(name, maxsize, policy)
+        self.queues.append(stagequeue)
+        return stagequeue
+
+    def add_stage(self, name, handler, maxsize, policy=DROP_OLDEST):
+        """
+        Add a queue consumed by its own thread calling handler for each sample, the stage is started immediately
+        """
+        stage = Stage(self.add_queue(name, maxsize, policy), handler)
+        stage.start()
+        return stage
+
+    def publish(self, item):
+        """
+        Hand item to every stage without blocking
+        """
+        for stagequeue in self.queues:
+            stagequeue.put(item)
@@ -0,0 +1,15 @@
+"""
+Modbus register maps for supported sensors, used by ReadEnvironment in InstrInterface.py
+If a new sensor needs added, the format is: registermaps['<sensor model>'] = {'start': <first register>, 'count': <number of registers>, 'functioncode': <3 for holding, 4 for input registers>,
+    'temperature': {'offset': <register offset from start>, 'decimals': <implied decimals>, 'signed': <True/False>, 'bias': <added after scaling>, 'gain': <multiplied after bias>},
+    'humidity': {<same fields as temperature>}}
+Values are converted as (register/10**decimals + bias)*gain, and must end up in deg. C and %RH
+Set the sensor model used by this device with sensormodel in LabSettings.py
+"""
+registermaps = {}                                                               #initialize empty dictionary
+
+#Comet T3311, temperature in deg. F at register 48, humidity in %RH at register 49, both with one implied decimal
+registermaps['CometT3311'] = {'start': 48, 'count': 2, 'functioncode': 3,
+                              'temperature': {'offset': 0, 'decimals': 1, 'signed': False, 'bias': -32, 'gain': 5/9},
+                              'humidity': {'offset': 1, 'decimals': 1, 'signed': False, 'bias': 0, 'gain': 1}}
+#registermaps['<sensor model>'] = {'start': <register>, 'count': <registers>, 'functioncode': 3, 'temperature': {...}, 'humidity': {...}}
@@ -0,0 +1,217 @@
+"""
+Fixed size rolling window of the latest samples, for the display and alert graphs.
+RingBuffer preallocates its arrays, so adding a sample neither allocates nor copies the window. Every value is written twice, at i and i + capacity, so the window in time order is always one contiguous slice and is read without copying.
+The minimum and maximum of each channel are kept by monotonic deques (RollingExtrema) in constant amortized time per sample, for the y-axis limits.
+MinMaxBuffer graphs long time spans in a fixed number of points: each bucket of time keeps only the minimum and maximum of each channel, which preserves the shape of the graph at about a bucket per pixel.
+"""
+import math
+import collections
+import numpy as np
+from EnvRollup import BucketStart
+
+OPEN_ROWS = 3                                                                   #rows a MinMaxBuffer adds for its open bucket
+
+class RollingExtrema:
+    """
+    Minimum and maximum of the last capacity values added. Gaps (nan) are ignored.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.count = 0                                                          #values added so far
+        self.minima = collections.deque()                                       #(count, value), values increasing from the oldest
+        self.maxima = collections.deque()                                       #(count, value), values decreasing from the oldest
+
+    def add(self, value):
+        """
+        Add a value, dropping the one that left the window
+        """
+        expired = self.count - self.capacity
+        for extrema in (self.minima, self.maxima):
+            if extrema and (extrema[0][0] <= expired):
+                extrema.popleft()
+        if not math.isnan(value):
+            while self.minima and (self.minima[-1][1] >= value):                #can never be the minimum again
+                self.minima.pop()
+            self.minima.append((self.count, value))
+            while self.maxima and (self.maxima[-1][1] <= value):
+                self.maxima.pop()
+            self.maxima.append((self.count, value))
+        self.count += 1
+
+    def min(self):
+        """
+        Minimum of the window, nan if it holds only gaps
+        """
+        return self.minima[0][1] if self.minima else math.nan
+
+    def max(self):
+        """
+        Maximum of the window, nan if it holds only gaps
+        """
+        return self.maxima[0][1] if self.maxima else math.nan
+
+class RingBuffer:
+    """
+    The last capacity samples, times in seconds since epoch and float channels, e.g. RingBuffer(480, 'temperature', 'humidity').
+    window['temperature'] and window['time'] are read-only views in time order, window.min('temperature') the minimum of the window.
+    """
+    def __init__(self, capacity, *channels):
+        self.capacity = capacity
+        self.channels = channels
+        self.arrays = collections.OrderedDict((channel, np.full(2*capacity, np.nan)) for channel in ('time',) + channels)
+        self.extrema = dict((channel, RollingExtrema(capacity)) for channel in channels)
+        self.end = 0                                                            #position after the latest sample
+        self.length = 0
+        self.total = 0                                                          #samples appended, the index of the next one
+
+    def __len__(self):
+        return self.length
+
+    def append(self, timestamp, *values):
+        """
+        Add a sample, one value per channel, replacing the oldest one once the window is full
+        """
+        for array, value in zip(self.arrays.values(), (timestamp,) + values):
+            array[self.end] = array[self.end + self.capacity] = value
+        for channel, value in zip(self.channels, values):
+            self.extrema[channel].add(value)
+        self.end = (self.end + 1) % self.capacity
+        self.length = min(self.length + 1, self.capacity)
+        self.total += 1
+
+    def __getitem__(self, channel):
+        view = self.arrays[channel][self.end + self.capacity - self.length:self.end + self.capacity]
+        view.flags.writeable = False
+        return view
+
+    def min(self, channel):
+        return self.extrema[channel].min()
+
+    def max(self, channel):
+        return self.extrema[channel].max()
+
+    def clear(self):
+        """
+        Empty the window
+        """
+        self.__init__(self.capacity, *self.channels)
+
+    def copy(self):
+        """
+        A new window holding the same samples
+        """
+        window = RingBuffer(self.capacity, *self.channels)
+        for sample in zip(*[self[channel] for channel in self.arrays]):
+            window.append(*sample)
+        return window
+
+def BucketSeconds(span, points):
+    """
+    Seconds per bucket for graphing span seconds in at most points points, two per bucket. Rounded up to whole hours or 5 minutes, so rollup buckets (EnvRollup.py) fit in them.
+    """
+    seconds = 2*span/points
+    for step in [3600, 300, 1]:
+        if seconds >= step:
+            return math.ceil(seconds/step)*step
+    return seconds
+
+class MinMaxBuffer(RingBuffer):
+    """
+    Rolling window of the minimum and maximum of each channel per bucket of seconds, aligned to local midnight, e.g. MinMaxBuffer(1600, 900, 'temperature', 'humidity') for a week.
+    A closed bucket is two rows, the extreme of each channel reached first and then the other one. capacity counts these rows.
+    The open bucket adds OPEN_ROWS rows: its extremes so far and the latest sample, so the window always ends with the latest sample. total counts the samples appended.
+    """
+    def __init__(self, capacity, seconds, *channels):
+        RingBuffer.__init__(self, capacity, *channels)
+        self.seconds = seconds
+        self.start = None                                                       #start of the open bucket, None before the first sample
+        self.extremes = []                                                      #[minimum, its time, maximum, its time] of each channel in the open bucket
+        self.latest = ()
+
+    def append(self, timestamp, *values):
+        """
+        Add a sample to the open bucket, closing it when the sample starts a later bucket
+        """
+        total = self.total
+        start = BucketStart(timestamp, self.seconds)
+        if (self.start is not None) and (start > self.start):
+            for row in self.bucket()[:2]:
+                RingBuffer.append(self, *row)
+            self.start = None
+        if self.start is None:
+            self.start = start
+            self.extremes = [[math.nan, timestamp, math.nan, timestamp] for value in values]
+        for extremes, value in zip(self.extremes, values):
+            if math.isnan(value):                                               #gaps only show when a whole bucket is missing
+                continue
+            if not (value >= extremes[0]):                                      #also true for the first value of the bucket
+                extremes[0:2] = [value, timestamp]
+            if not (value <= extremes[2]):
+                extremes[2:4] = [value, timestamp]
+        self.latest = (timestamp,) + values
+        self.total = total + 1
+
+    def bucket(self):
+        """
+        Rows of the open bucket: the first extremes at its start, the second ones at its middle or the latest sample's time if earlier, and the latest sample
+        """
+        first = tuple(extremes[0] if extremes[1] <= extremes[3] else extremes[2] for extremes in self.extremes)
+        second = tuple(extremes[2] if extremes[1] <= extremes[3] else extremes[0] for extremes in self.extremes)
+        return [(self.start,) + first, (min(self.start + self.seconds/2, self.latest[0]),) + second, self.latest]
+
+    def __len__(self):
+        return self.length + (OPEN_ROWS if self.start is not None else 0)
+
+    def __getitem__(self, channel):
+        view = RingBuffer.__getitem__(self, channel)
+        if self.start is None:
+            return view
+        column = list(self.arrays).index(channel)
+        rows = np.concatenate((view, [row[column] for row in self.bucket()]))   #copies, at most capacity + OPEN_ROWS values
+        rows.flags.writeable = False
+        return rows
+
+    def min(self, channel):
+        if self.start is None:
+            return RingBuffer.min(self, channel)
+        return float(np.fmin(RingBuffer.min(self, channel), self.extremes[self.channels.index(channel)][0])) #nan only if both are
+
+    def max(self, channel):
+        if self.start is None:
+            return RingBuffer.max(self, channel)
+        return float(np.fmax(RingBuffer.max(self, channel), self.extremes[self.channels.index(channel)][2]))
+
+    def clear(self):
+        """
+        Empty the window
+        """
+        self.__init__(self.capacity, self.seconds, *self.channels)
+
+    def copy(self):
+        """
+        A new window holding the same buckets, its rows fall in the same buckets again
+        """
+        window = MinMaxBuffer(self.capacity, self.seconds, *self.channels)
+        for sample in zip(*[self[channel] for channel in self.arrays]):
+            window.append(*sample)
+        window.total = self.total
+        return window
+
+if __name__ == '__main__':
+    import time
+    for capacity in [480, 43200, 604800]:                                       #12 h at 40 pts/hr, 12 h and a week at 1 Hz
+        window = RingBuffer(capacity, 'temperature', 'humidity')
+        values = 20 + np.random.randn(2*capacity)
+        tstart = time.perf_counter()
+        for i, value in enumerate(values):
+            window.append(i, value, value)
+        tappend = (time.perf_counter() - tstart)/len(values)
+        assert (window.min('temperature') == values[-capacity:].min()) and (window['temperature'] == values[-capacity:]).all()
+        listwindow = list(values[:capacity])
+        tstart = time.perf_counter()
+        for value in values[capacity:capacity + 100]:                           #the lists it replaces
+            listwindow.append(value)
+            del listwindow[0]
+            np.nanmin(listwindow), np.nanmax(listwindow)
+        tlist = (time.perf_counter() - tstart)/100
+        print('%d points: %.2f us per sample, lists with nanmin/nanmax %.2f us' % (capacity, tappend*1e6, tlist*1e6))
@@ -0,0 +1,137 @@
+"""
+Append-only journal of samples and alert state, for recovering after a power loss.
+Each sample is journaled and synced to disk before it reaches the buffered logs (see CSVAppender.py). When the logs have been written out the journal is checkpointed: it is rewritten to hold only the latest alert state.
+On restart, recover() returns the samples journaled after the last checkpoint, which may not have reached the logs, and the last alert state, so a node neither resends nor misses outage messages.
+Samples are journaled with the readings of every sensor of their tick (the batch) when more than one sensor is polled, so the logs of additional sensors are recovered too.
+Records are [crc32][length][type][payload]. A record with a bad checksum or cut short ends the journal, anything after it is discarded.
+"""
+import os
+import json
+import time
+import zlib
+import struct
+import threading
+from Pipeline import Sample
+from InstrInterface import EnvReading
+from SensorPoller import SensorReading
+
+RECORD = struct.Struct('<II')                                                   #checksum of type and payload, length of payload
+SAMPLE = struct.Struct('<dddI')                                                 #timestamp, temperature, humidity, flags, followed by the batch as JSON if it has more than one reading
+SAMPLE_RECORD = b'S'
+STATE_RECORD = b'A'
+
+def EncodeBatch(batch):
+    """
+    Batch of SensorReadings as JSON bytes, empty for a batch of the primary sensor only
+    """
+    if len(batch) < 2:
+        return b''
+    return json.dumps([list(sensorreading[:4]) + [None if sensorreading.reading is None else list(sensorreading.reading), sensorreading.state] for sensorreading in batch]).encode('utf-8')
+
+def DecodeBatch(data):
+    """
+    Batch of SensorReadings from EncodeBatch
+    """
+    if not data:
+        return []
+    return [SensorReading(*(values[:4] + [None if values[4] is None else EnvReading(values[4][0], values[4][1], tuple(values[4][2]), values[4][3]), values[5]]))
+            for values in json.loads(data.decode('utf-8'))]
+
+class SampleJournal:
+    """
+    Journal at path. state holds the last alert state written or recovered, a dictionary of plain values.
+    """
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self.lock = threading.Lock()                                            #written by the storage and alert stages
+        self.state = None
+        self.journalfile = None                                                 #opened by the first checkpoint
+        self.checkpointed = time.monotonic()
+        self.closed = False
+
+    def recover(self):
+        """
+        Read the journal. Returns the list of Samples since the last checkpoint and the last alert state (None if there is none).
+        Store the samples, then call checkpoint() to start journaling.
+        """
+        samples = []
+        data = b''
+        if os.path.isfile(self.path):
+            with open(self.path, 'rb') as fin:
+                data = fin.read()
+        position = 0
+        while position + RECORD.size <= len(data):
+            checksum, length = RECORD.unpack_from(data, position)
+            record = data[position + RECORD.size:position + RECORD.size + 1 + length]
+            if (len(record) != 1 + length) or (zlib.crc32(record) != checksum): #torn or corrupt record, end of the journal
+                break
+            if record[:1] == SAMPLE_RECORD:
+                samples.append(Sample(*SAMPLE.unpack(record[1:1 + SAMPLE.size]), batch=DecodeBatch(record[1 + SAMPLE.size:])))
+            elif record[:1] == STATE_RECORD:
+                self.state = json.loads(record[1:].decode('utf-8'))
+            position += RECORD.size + 1 + length
+        if position < len(data):
+            print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Discarded '+str(len(data) - position)+' bytes of a torn record at the end of '+self.path)
+        return samples, self.state
+
+    def write(self, recordtype, payload):
+        """
+        Append one record and sync it to disk, caller holds the lock
+        """
+        if self.journalfile is None:                                            #not started or closed at exit
+            return
+        record = recordtype + payload
+        self.journalfile.write(RECORD.pack(zlib.crc32(record), len(payload)) + record)
+        self.journalfile.flush()
+        if self.fsync:
+            os.fsync(self.journalfile.fileno())
+
+    def add_sample(self, sample):
+        """
+        Journal a sample of the primary sensor and the readings of its tick
+        """
+        batch = EncodeBatch(sample.batch)
+        with self.lock:
+            self.write(SAMPLE_RECORD, SAMPLE.pack(sample.timestamp, sample.temperature, sample.humidity, sample.flags) + batch)
+
+    def add_state(self, state):
+        """
+        Journal the alert state if it changed
+        """
+        with self.lock:
+            if state != self.state:
+                self.state = state
+                self.write(STATE_RECORD, json.dumps(state).encode('utf-8'))
+
+    def checkpoint(self):
+        """
+        Replace the journal with one holding only the alert state, once every journaled sample is safely in the logs
+        """
+        with self.lock:
+            if self.closed:
+                return
+            if os.path.dirname(self.path) and not os.path.isdir(os.path.dirname(self.path)):
+                os.makedirs(os.path.dirname(self.path))
+            temporary = self.path+'.tmp'
+            with open(temporary, 'wb') as fout:
+                if self.state is not None:
+                    record = STATE_RECORD + json.dumps(self.state).encode('utf-8')
+                    fout.write(RECORD.pack(zlib.crc32(record), len(record) - 1) + record)
+                fout.flush()
+                os.fsync(fout.fileno())
+            os.replace(temporary, self.path)                                    #atomic, a crash leaves either the old or the new journal
+            if self.journalfile is not None:
+                self.journalfile.close()
+            self.journalfile = open(self.path, 'ab')
+            self.checkpointed = time.monotonic()
+
+    def close(self):
+        """
+        Close the journal, e.g. at exit
+        """
+        with self.lock:
+            if self.journalfile is not None:
+                self.journalfile.close()
+            self.journalfile = None
+            self.closed = True
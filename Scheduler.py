@@ -0,0 +1,79 @@
+"""
+Drift-free sampling scheduler on monotonic clock deadlines.
+Tick k is due at start + k*interval, so time spent working never shifts later ticks, and wall clock jumps (e.g. NTP) do not affect the cadence.
+When a tick overruns past the next deadline, the catchup policy runs the missed ticks back to back, the skip policy drops them and waits for the next deadline on the grid.
+Per-tick jitter, overruns, skipped ticks and the achieved points per hour are kept for reporting.
+"""
+import time
+import math
+import collections
+
+#overrun policies
+CATCHUP = 'catchup'
+SKIP = 'skip'
+
+#statistics since the last report. jitter is how late ticks started after their deadline, seconds
+ScheduleReport = collections.namedtuple('ScheduleReport', ['ticks', 'skipped', 'overruns', 'jitter_mean', 'jitter_max', 'pts_hr', 'pts_hr_set'])
+
+class SampleScheduler:
+    """
+    Schedules ticks every interval seconds. Call wait() after each tick's work.
+    """
+    def __init__(self, interval, policy=SKIP):
+        if policy not in (CATCHUP, SKIP):
+            raise ValueError('Unknown scheduler policy '+str(policy)+', use '+CATCHUP+' or '+SKIP)
+        self.interval = interval
+        self.policy = policy
+        self.start = time.monotonic()
+        self.tick = 0                                                           #index of the current tick on the deadline grid
+        self.reset(self.start)
+
+    def reset(self, now):
+        """
+        Start a new reporting window
+        """
+        self.window_start = now
+        self.ticks = 1                                                          #ticks started in this window, including the current one
+        self.skipped = 0
+        self.overruns = 0
+        self.jitter_sum = 0.0
+        self.jitter_max = 0.0
+
+    def wait(self):
+        """
+        Sleep until the next tick is due. Returns how late the tick starts after its deadline, seconds.
+        """
+        self.tick += 1
+        deadline = self.start + self.tick*self.interval
+        now = time.monotonic()
+        if now > deadline:                                                      #this tick's work ran past the next deadline
+            self.overruns += 1
+            if self.policy == SKIP:
+                tick = math.ceil((now - self.start)/self.interval)              #next deadline still ahead
+                self.skipped += tick - self.tick
+                self.tick = tick
+                deadline = self.start + self.tick*self.interval
+        if deadline > now:
+            time.sleep(deadline - now)
+        jitter = max(time.monotonic() - deadline, 0.0)
+        self.ticks += 1
+        self.jitter_sum += jitter
+        self.jitter_max = max(self.jitter_max, jitter)
+        return jitter
+
+    def elapsed(self):
+        """
+        Seconds since the last report
+        """
+        return time.monotonic() - self.window_start
+
+    def report(self):
+        """
+        Return the ScheduleReport since the last report and start a new reporting window
+        """
+        now = time.monotonic()
+        elapsed = max(now - self.window_start, self.interval)
+        ticks = self.ticks - 1                                                  #the tick that just started belongs to the next window
+        report = ScheduleReport(ticks, self.skipped, self.overruns, self.jitter_sum/max(ticks, 1), self.jitter_max, ticks/elapsed*3600, 3600/self.interval)
+        self.reset(now)
+        return report
@@ -0,0 +1,44 @@
+"""
+Registry of sensor drivers. A driver is a module defining:
+    Connect(port, address, sensor) - open the sensor, returns the instrument object
+    Read(instr_obj, sensor)        - read temperature and humidity once, returns an EnvReading (InstrInterface.py), raises on failure
+    Clear(instr_obj, sensor)       - clear the instrument's buffer after failed reads, without waiting for it to settle
+    Disconnect(instr_obj, sensor)  - (optional) close the port, so Connect opens it again when recovering an unplugged adapter
+sensor is the sensor's dictionary from SensorList.py, so drivers can take extra settings from it.
+Drivers are imported the first time they are used, so a device only imports the libraries of the protocols it polls.
+To add a sensor type, write a driver module and add it to drivers below, or call RegisterDriver before polling.
+"""
+import importlib
+
+#driver name: module
+drivers = {'comet': 'DriverComet',                                              #Comet T3311 and other sensors with a map in RegisterMaps.py, modbus RTU
+           'modbus': 'DriverModbus',                                            #generic modbus RTU sensor, register map and serial settings from SensorList.py
+           'ascii': 'DriverASCII',                                              #plain serial sensor answering a text command with temperature and humidity
+           'sim': 'DriverSimulated'}                                            #simulated sensor, see InstrSimulator.py
+
+loaded = {}                                                                     #driver name: imported module
+
+def RegisterDriver(name, module):
+    """
+    Add or replace a driver. module is the name of the driver module, imported when first used.
+    """
+    drivers[name] = module
+    loaded.pop(name, None)
+
+def LoadDriver(name):
+    """
+    Import the driver registered as name, once
+    """
+    if name not in loaded:
+        if name not in drivers:
+            raise ValueError('Unknown sensor driver '+str(name)+', use one of '+', '.join(sorted(drivers)))
+        loaded[name] = importlib.import_module(drivers[name])
+    return loaded[name]
+
+def DriverFor(sensor, default='comet'):
+    """
+    Name of the driver for a sensor of SensorList.py. Simulated ports (sim:<scenario>) always use the simulated driver.
+    """
+    if sensor['port'].startswith('sim:'):
+        return 'sim'
+    return sensor.get('driver') or default
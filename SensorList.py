@@ -0,0 +1,10 @@
+"""
+Sensors polled by this device. Leave empty to poll the single sensor at instrport (LabSettings.py) for labID (LabID.py).
+If sensors need added, the format is: sensors.append({'labID': '<labID>', 'port': '<serial port>', 'address': <modbus slave address>, 'serial': '<sensor serial number>', 'model': '<sensor model in RegisterMaps.py>'})
+Optionally set 'driver' to the sensor driver in SensorDrivers.py (default is sensordriver in LabSettings.py), drivers may read extra keys such as 'baudrate' or 'command' (see the Driver*.py files).
+Each serial port is polled on its own thread, sensors sharing a port (RS-485 bus) are polled one after another.
+The sensor with the same labID as LabID.py is graphed and used for alerts, all other sensors are logged to a subdirectory of envdata_directory named after their labID.
+"""
+sensors = []                                                                    #initialize empty list
+
+#sensors.append({'labID': '219/G032', 'port': '/dev/ttyUSB0', 'address': 1, 'serial': '', 'model': 'CometT3311'})
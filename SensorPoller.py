@@ -0,0 +1,106 @@
+"""
+Polling engine for several sensors on several serial ports.
+Each serial port is owned by a worker thread which reads the sensors on its bus one after another, all ports are read in parallel.
+Failed sensors, including sensors whose port could not be opened, are recovered in the background (see InstrRecovery.py) and are reported as gaps meanwhile.
+A port that falls behind is not given more ticks than it can queue, its sensors are reported unread for the ticks it missed.
+"""
+import time
+import queue
+import threading
+import collections
+from InstrRecovery import InstrConnection, OFFLINE
+from SensorDrivers import LoadDriver, DriverFor
+
+#one sensor's result for a tick, reading is an EnvReading or None if the sensor could not be read, state is the connection state after the read
+SensorReading = collections.namedtuple('SensorReading', ['labID', 'port', 'address', 'serial', 'reading', 'state'])
+
+class PortWorker(threading.Thread):
+    """
+    Worker thread owning the instrument connections of every sensor on one serial port
+    """
+    def __init__(self, port, sensors, results, recovery, driver, backlog=2):
+        threading.Thread.__init__(self, name='LEMAS poll '+port, daemon=True)
+        self.port = port
+        self.sensors = sensors
+        self.results = results                                                  #shared queue of (tick, [SensorReading, ...])
+        self.recovery = recovery                                                #keyword arguments for InstrConnection
+        self.drivers = [LoadDriver(DriverFor(sensor, driver)) for sensor in sensors] #imported here, an unknown driver stops the program at startup
+        self.requests = queue.Queue(backlog)                                    #ticks to poll, None to stop
+        self.lock = threading.Lock()                                            #serializes the bus between polling and background reconnects
+        self.connections = []
+
+    def run(self):
+        for sensor, driver in zip(self.sensors, self.drivers):                  #connect in the worker so ports connect in parallel
+            try:
+                instr_obj = driver.Connect(self.port, sensor['address'], sensor)
+            except Exception as error:                                          #e.g. adapter unplugged, the connection reconnects in the background
+                print('\n'+time.strftime("%Y-%m-%d %H:%M:%S")+' : Could not connect to instrument '+sensor['labID']+' on '+self.port+': '+str(error))
+                instr_obj = None
+            self.connections.append(InstrConnection(sensor['labID'], instr_obj, driver, sensor, self.lock, **self.recovery))
+        while True:
+            tick = self.requests.get()
+            if tick is None:
+                break
+            batch = []
+            for sensor, connection in zip(self.sensors, self.connections):      #slaves on a shared bus are read back to back
+                reading = connection.read()
+                batch.append(SensorReading(sensor['labID'], self.port, sensor['address'], sensor['serial'], reading, connection.state))
+            self.results.put((tick, batch))
+
+class PollingEngine:
+    """
+    Owns one PortWorker per serial port. poll() reads every sensor once and returns the batch of SensorReadings in the order sensors were given.
+    sensors is a list of dictionaries in the format of SensorList.py, driver is the default driver name (SensorDrivers.py) for sensors without a 'driver' key, recovery holds keyword arguments for InstrConnection (reconnect_after, backoff, offline_after)
+    """
+    def __init__(self, sensors, timeout=60, driver='comet', **recovery):
+        self.sensors = sensors
+        self.timeout = timeout                                                  #seconds to wait for a port before reporting its sensors as unread
+        self.tick = 0
+        self.results = queue.Queue()
+        ports = collections.OrderedDict()
+        for sensor in sensors:                                                  #group sensors by serial port
+            ports.setdefault(sensor['port'], []).append(sensor)
+        self.workers = [PortWorker(port, portsensors, self.results, recovery, driver) for port, portsensors in ports.items()]
+        for worker in self.workers:
+            worker.start()
+
+    def poll(self):
+        """
+        Read every sensor once, ports in parallel. Returns a list of SensorReading, one per sensor.
+        """
+        self.tick += 1
+        pending = 0
+        for worker in self.workers:
+            try:
+                worker.requests.put_nowait(self.tick)
+                pending += 1
+            except queue.Full:                                                  #port still busy with earlier ticks, its sensors are unread
+                pass
+        readings = {}
+        deadline = time.monotonic() + self.timeout
+        while pending:
+            try:
+                tick, batch = self.results.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if tick != self.tick:                                               #late batch from a tick that already timed out
+                continue
+            pending -= 1
+            for sensorreading in batch:
+                readings[(sensorreading.port, sensorreading.address)] = sensorreading
+        return [readings.get((sensor['port'], sensor['address']), SensorReading(sensor['labID'], sensor['port'], sensor['address'], sensor['serial'], None, OFFLINE)) for sensor in self.sensors]
+
+    def close(self):
+        """
+        Stop all port workers
+        """
+        for worker in self.workers:
+            while True:
+                try:
+                    worker.requests.put_nowait(None)
+                    break
+                except queue.Full:                                              #drop ticks the worker has not started
+                    try:
+                        worker.requests.get_nowait()
+                    except queue.Empty:
+                        pass
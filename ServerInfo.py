@@ -13,3 +13,5 @@ fromaddress = 'dmgalert@nist.gov'
 #the username and password of the email address. leave the string blank if login to the smtp server is not needed to send messages.
 username = ''
 password = ''
+#seconds an idle SMTP session is kept open for the next messages, it is checked with NOOP before reuse and reopened if the server closed it. Default is 300 seconds
+smtp_keepalive = 300
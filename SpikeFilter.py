@@ -0,0 +1,47 @@
+"""
+Streaming spike rejection for sensor readings, replaces rereading the sensor after a 10 second sleep.
+HampelFilter compares each reading to the median of the last few readings, MedianOfN keeps the median of several readings taken back to back.
+Both work on a fixed, small number of readings, so the cost per sample is constant, and neither sleeps.
+"""
+import math
+import collections
+
+def Median(values):
+    """
+    Median of a short list of values
+    """
+    ordered = sorted(values)
+    middle = len(ordered)//2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle-1] + ordered[middle])/2
+
+class HampelFilter:
+    """
+    Hampel filter over the last window readings of one channel. A reading further than sigma scaled median absolute deviations, and at least floor, from the window median is rejected and replaced by the median.
+    A real step change is accepted once it fills half the window.
+    """
+    def __init__(self, window, sigma, floor):
+        self.values = collections.deque(maxlen=window)
+        self.sigma = sigma
+        self.floor = floor                                                      #smallest deviation rejected, keeps a flat signal (MAD of 0) from rejecting small changes
+
+    def filter(self, value):
+        """
+        Returns (value to store, True if value was rejected). Gaps (nan) pass through and do not enter the window.
+        """
+        if math.isnan(value):
+            return value, False
+        self.values.append(value)
+        median = Median(self.values)
+        mad = 1.4826*Median([abs(x - median) for x in self.values])             #scaled to a standard deviation for normal noise
+        if abs(value - median) > max(self.sigma*mad, self.floor):
+            return median, True
+        return value, False
+
+def MedianOfN(values, floor):
+    """
+    Median of readings taken back to back. Returns (median, True if any reading was further than floor from the median).
+    """
+    median = Median(values)
+    return median, any(abs(x - median) > floor for x in values)
@@ -0,0 +1,7 @@
+"""
+The LEMAS modules are flat files in the repository root, tests import them from there
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,49 @@
+"""
+Monthly logs roll over with one header each, a torn last row is cut off on reopening, and the sidecar index answers range queries
+"""
+import os
+import time
+from CSVAppender import CSVAppender
+from EnvQuery import IndexPath, QueryRange
+
+JULY = time.mktime((2017, 7, 25, 0, 0, 0, 0, 0, -1))
+MIDNIGHT = time.mktime((2017, 8, 1, 0, 0, 0, 0, 0, -1))
+
+def Lines(path):
+    with open(path) as fin:
+        return fin.read().split('\n')
+
+def test_rollover(tmp_path):
+    log = CSVAppender(str(tmp_path), '-all.env.csv', 'time,a', flush_interval=3600)
+    for i in range(-2, 2):
+        log.append(MIDNIGHT + 60*i, ','+str(i))
+    log.close()
+    assert Lines(str(tmp_path / 'July2017-all.env.csv')) == ['time,a', '2017-07-31 23:58:00,-2', '2017-07-31 23:59:00,-1', '']
+    assert Lines(str(tmp_path / 'August2017-all.env.csv')) == ['time,a', '2017-08-01 00:00:00,0', '2017-08-01 00:01:00,1', '']
+
+def test_torn_row(tmp_path):
+    log = CSVAppender(str(tmp_path), '-all.env.csv', 'time,a')
+    log.append(JULY, ',1')
+    log.close()
+    path = str(tmp_path / 'July2017-all.env.csv')
+    with open(path, 'a') as fout:
+        fout.write('2017-07-25 00:01:00,2')                                     #power lost in the middle of a row
+    log = CSVAppender(str(tmp_path), '-all.env.csv', 'time,a')
+    log.append(JULY + 120, ',3')
+    log.close()
+    assert Lines(path) == ['time,a', '2017-07-25 00:00:00,1', '2017-07-25 00:02:00,3', '']
+
+def test_index_range(tmp_path):
+    log = CSVAppender(str(tmp_path), '-all.env.csv', 'time,a', flush_interval=3600, index_interval=3600)
+    times = [JULY + 600*i for i in range(2*24*6)]                               #two days, a row every 10 minutes
+    for i, timestamp in enumerate(times):
+        log.append(timestamp, ','+str(i))
+    log.close()
+    path = str(tmp_path / 'July2017-all.env.csv')
+    with open(IndexPath(path)) as fin:
+        assert len(fin.readlines()) == 48                                       #an entry an hour
+    start, end = JULY + 5*3600 + 1200, JULY + 30*3600 + 600
+    rows = list(QueryRange(str(tmp_path), start, end))
+    assert [int(row[1]) for row in rows] == [i for i, timestamp in enumerate(times) if start <= timestamp <= end]
+    os.remove(IndexPath(path))                                                  #a missing index is rebuilt
+    assert list(QueryRange(str(tmp_path), start, end)) == rows
@@ -0,0 +1,20 @@
+"""
+The simulated driver reads back what the simulator encodes, whichever register map the sensor uses
+"""
+import DriverSimulated
+from RegisterMaps import registermaps
+
+def test_sensor_model_register_map():
+    registermaps['TestCelsius'] = {'start': 100, 'count': 4, 'functioncode': 3,
+                                   'temperature': {'offset': 2, 'decimals': 2, 'signed': True, 'bias': 0, 'gain': 1},
+                                   'humidity': {'offset': 3, 'decimals': 1, 'signed': False, 'bias': 0, 'gain': 1}}
+    try:
+        sensor = {'labID': 'sim', 'port': 'sim:steady', 'address': 7, 'serial': '', 'model': 'TestCelsius'}
+        instr_obj = DriverSimulated.Connect(sensor['port'], sensor['address'], sensor)
+        instr_obj.latency = 0
+        reading = DriverSimulated.Read(instr_obj, sensor)
+        assert sum(instr_obj.Tlimits)/2 - 0.5 < reading.temperature < sum(instr_obj.Tlimits)/2 + 0.5
+        assert sum(instr_obj.RHlimits)/2 - 2 < reading.humidity < sum(instr_obj.RHlimits)/2 + 2
+    finally:
+        del registermaps['TestCelsius']
+        DriverSimulated.instruments.pop(('sim:steady', 7), None)
@@ -0,0 +1,35 @@
+"""
+Archiving of closed months must not remove a log an appender still writes to
+"""
+import os
+import time
+import threading
+from CSVAppender import CSVAppender
+from EnvArchive import ClosedLogs, ClaimLog, UnclaimLog, Compress, ReadRows
+
+LASTMONTH = time.mktime((2017, 7, 15, 12, 0, 0, 0, 0, -1))
+
+def test_open_log_is_not_claimed(tmp_path):
+    log = CSVAppender(str(tmp_path), '-rejected.env.csv', 'time,a')
+    log.append(LASTMONTH, ',1')                                                 #stays open until its next row
+    path, = ClosedLogs(str(tmp_path))
+    assert not ClaimLog(path)
+    log.close()
+    assert ClaimLog(path)
+    UnclaimLog(path)
+
+def test_appender_waits_for_archiving(tmp_path):
+    log = CSVAppender(str(tmp_path), '-all.env.csv', 'time,a')
+    log.append(LASTMONTH, ',1')
+    log.close()
+    path, = ClosedLogs(str(tmp_path))
+    assert ClaimLog(path)
+    late = threading.Thread(target=log.append, args=(LASTMONTH + 60, ',2'))     #e.g. a sample replayed from the journal
+    late.start()
+    time.sleep(0.2)
+    assert late.is_alive()                                                      #blocked until the log is compressed
+    Compress(path, pause=0)
+    UnclaimLog(path)
+    late.join(5)
+    log.close()
+    assert [row[1] for row in ReadRows(str(tmp_path), 'July2017')] == ['1', '2']
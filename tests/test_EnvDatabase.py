@@ -0,0 +1,27 @@
+"""
+Replaying journaled samples into the database stores each sample and outage once
+"""
+from EnvDatabase import EnvDatabase
+
+def Replay(database, timestamps):
+    database.replaying = True
+    for timestamp in timestamps:
+        database.add_sample('lab', timestamp, 30.0, 40.0)
+        database.add_outage('lab', timestamp, 30.0, 40.0, True, False)
+    database.replaying = False
+
+def test_replay_stores_outages(tmp_path):
+    database = EnvDatabase(str(tmp_path/'LEMAS.db'), flush_interval=0)          #the sample is inserted before its outage
+    Replay(database, [1000, 1060])
+    assert [row[1] for row in database.outages('lab')] == [1000, 1060]
+    database.close()
+
+def test_replay_skips_stored_rows(tmp_path):
+    database = EnvDatabase(str(tmp_path/'LEMAS.db'), flush_interval=3600)
+    database.add_sample('lab', 1000, 30.0, 40.0)                                #stored before the crash
+    database.add_outage('lab', 1000, 30.0, 40.0, True, False)
+    database.flush()
+    Replay(database, [1000, 1060])
+    assert [row[0] for row in database.samples('lab', 0)] == [1000, 1060]
+    assert [row[1] for row in database.outages('lab')] == [1000, 1060]
+    database.close()
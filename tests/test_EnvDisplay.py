@@ -0,0 +1,61 @@
+"""
+Alert graphs are shrunk to the byte budget of a gateway, or sent as drawn without Pillow.
+A blitted EnvGraph shifting by a sample keeps its axes and draws the same time labels as a full draw.
+"""
+import io
+import sys
+import time
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from EnvDisplay import CompactImage, EnvGraph
+from RingBuffer import RingBuffer
+
+def Graph():
+    fig = Figure(figsize=(4.2, 2.2), dpi=190)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    ax.plot(range(480), [20 + (i % 37)/50 for i in range(480)], 'r-')
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+def test_fits_budget():
+    image = Graph()
+    compact, subtype = CompactImage(image, 8000)
+    assert len(compact) <= 8000 < len(image)
+    assert subtype in ('png', 'jpeg')
+
+def test_without_pillow(monkeypatch):
+    image = Graph()
+    monkeypatch.setitem(sys.modules, 'PIL', None)                               #import fails
+    assert CompactImage(image, 30000) == (image, 'png')
+
+def Window(n):
+    window = RingBuffer(480, 'temperature', 'humidity')
+    start = time.time() - 90000
+    for i in range(n):
+        window.append(start + i*90, 20 + (i % 40)/100, 45 + (i % 40)/20)
+    return window, start                                                        #periodic, so the limits stay put
+
+def test_blit_time_labels():
+    window, start = Window(480)
+    graphs = []
+    for blit in (True, False):
+        fig = Figure(figsize=(4.2, 2.2), dpi=190)
+        FigureCanvasAgg(fig)
+        graphs.append(EnvGraph(fig.add_subplot(2, 1, 1), fig.add_subplot(2, 1, 2), [19.5, 20.5], [40, 50], [[0.5, 0.5], [1, 1]], 480, blit=blit))
+    for graph in graphs:
+        graph.update(window)
+        graph.draw()
+    for i in range(480, 490):
+        window.append(start + i*90, 20 + (i % 40)/100, 45 + (i % 40)/20)
+        for graph in graphs:
+            graph.update(window)
+            assert not graph.changed                                            #the labels moved, the axes did not
+            graph.draw()
+        bottom = int(graphs[0].figure.bbox.height - graphs[0].axes[1].bbox.y0) + 1 #rows under the humidity axes
+        blitted, drawn = [np.asarray(graph.figure.canvas.buffer_rgba())[bottom:] for graph in graphs]
+        assert (blitted == drawn).all()
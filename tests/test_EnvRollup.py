@@ -0,0 +1,43 @@
+"""
+Rollup buckets open at a restart are rebuilt from the log, also when the restart crosses midnight
+"""
+import time
+from CSVAppender import CSVAppender
+from EnvRollup import Rollup, QueryRollup
+
+DAY = time.mktime((2017, 7, 14, 0, 0, 0, 0, 0, -1))
+
+def Run(directory, timestamps):
+    """
+    Log samples and their rollups as LEMASRun.py does, then stop
+    """
+    log = CSVAppender(directory, '-all.env.csv', 'time,Temperature (deg. C),Humidity (%RH)')
+    rollup = Rollup(directory, [18, 22], [30, 50], 60)
+    for timestamp in timestamps:
+        log.append(timestamp, ',20.0,40.0')
+        rollup.add(timestamp, 20.0, 40.0)
+    log.close()
+    rollup.close()
+
+def Resume(directory, now, timestamps):
+    rollup = Rollup(directory, [18, 22], [30, 50], 60)
+    rollup.resume(directory, now=now)
+    for timestamp in timestamps:
+        rollup.add(timestamp, 20.0, 40.0)
+    rollup.close()
+
+def test_restart_across_midnight(tmp_path):
+    directory = str(tmp_path)
+    Run(directory, [DAY + 22*3600 + 60*i for i in range(118)])                  #22:00 to 23:57
+    Resume(directory, DAY + 86400 + 330, [DAY + 86400 + 360])                   #restarted at 00:05:30
+    fivemin = [stats.time for stats in QueryRollup(directory, '5min', DAY, DAY + 86400)]
+    assert fivemin == [DAY + 22*3600 + 300*i for i in range(24)]                #each once, including 23:55
+    assert [(stats.time, stats.count) for stats in QueryRollup(directory, 'hourly', DAY, DAY + 86400)] == [(DAY + 22*3600, 60), (DAY + 23*3600, 58)]
+    assert [(stats.time, stats.count) for stats in QueryRollup(directory, 'daily', DAY, DAY + 86400)] == [(DAY, 118)]
+
+def test_restart_same_day(tmp_path):
+    directory = str(tmp_path)
+    Run(directory, [DAY + 10*3600 + 60*i for i in range(30)])                   #10:00 to 10:29
+    Resume(directory, DAY + 11*3600, [DAY + 11*3600 + 60*i for i in range(61)])
+    assert [(stats.time, stats.count) for stats in QueryRollup(directory, 'hourly', DAY, DAY + 86400)] == [(DAY + 10*3600, 30), (DAY + 11*3600, 60)]
+    assert len(QueryRollup(directory, '5min', DAY, DAY + 86400)) == 18
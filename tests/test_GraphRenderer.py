@@ -0,0 +1,33 @@
+"""
+A hung renderer must not hold up the main thread while the alert stage waits on it
+"""
+import sys
+import time
+import threading
+import subprocess
+from RingBuffer import RingBuffer
+from GraphRenderer import GraphRenderer
+
+class HungRenderer(GraphRenderer):
+    """
+    Renderer process that never draws or answers
+    """
+    def start(self):
+        self.process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.shared.heartbeat[0] = time.monotonic()
+        self.started = time.monotonic()
+
+def test_check_restarts_while_alert_waits():
+    window = RingBuffer(10, 'temperature', 'humidity')
+    renderer = HungRenderer(window, {}, timeout=0.5, restart_wait=0)
+    try:
+        waiting = threading.Thread(target=renderer.render_alert, args=(time.time(), 10))
+        waiting.start()
+        time.sleep(1)                                                           #heartbeat is stale
+        tstart = time.monotonic()
+        assert not renderer.check()                                             #restarted without waiting on the alert request
+        assert time.monotonic() - tstart < 2
+        waiting.join(2)
+        assert not waiting.is_alive()                                           #killing the old process ended the wait
+    finally:
+        renderer.close()
@@ -0,0 +1,82 @@
+"""
+InstrConnection state machine: degraded, reconnecting, offline and back to healthy, with a scripted driver
+"""
+import time
+import threading
+from InstrRecovery import InstrConnection, HEALTHY, DEGRADED, RECONNECTING, OFFLINE
+
+class ScriptedDriver:
+    """
+    Driver whose Connect, Clear and Read fail while the matching flag is set
+    """
+    def __init__(self):
+        self.read_fails = False
+        self.clear_fails = False
+        self.connect_fails = False
+        self.connects = 0
+        self.disconnects = 0
+
+    def Connect(self, port, address, sensor):
+        self.connects += 1
+        if self.connect_fails:
+            raise IOError('no such port '+port)
+        return object()
+
+    def Disconnect(self, instr_obj, sensor):
+        self.disconnects += 1
+
+    def Clear(self, instr_obj, sensor):
+        if self.clear_fails:
+            raise IOError('clear failed')
+
+    def Read(self, instr_obj, sensor):
+        if self.read_fails:
+            raise IOError('read failed')
+        return 'reading'
+
+def Connection(driver, **options):
+    sensor = {'labID': 'test', 'port': '/dev/ttyUSB9', 'address': 1}
+    settings = {'reconnect_after': 2, 'backoff': (0.01, 0.02), 'offline_after': 0.1, 'jitter': 0, 'settle': 0}
+    settings.update(options)
+    return InstrConnection('test', object(), driver, sensor, threading.Lock(), **settings)
+
+def WaitFor(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+def test_failed_reads_degrade_then_reconnect():
+    driver = ScriptedDriver()
+    connection = Connection(driver)
+    assert connection.read() == 'reading' and connection.state == HEALTHY
+    driver.read_fails = True
+    assert connection.read() is None and connection.state == DEGRADED
+    assert connection.read() is None and connection.state == RECONNECTING
+    assert connection.read() is None                                            #returns straight away while reconnecting
+    driver.read_fails = False
+    WaitFor(lambda: connection.state == HEALTHY)
+    assert driver.connects >= 1 and driver.disconnects >= 1                     #the port was reopened
+    assert connection.read() == 'reading'
+
+def test_clear_and_connect_failures_keep_retrying_until_offline_and_back():
+    driver = ScriptedDriver()
+    connection = Connection(driver)
+    driver.read_fails = driver.clear_fails = driver.connect_fails = True        #adapter unplugged
+    connection.read()
+    connection.read()
+    WaitFor(lambda: connection.state == OFFLINE)
+    assert connection.reconnector.is_alive()                                    #failures do not end the reconnect thread
+    driver.read_fails = driver.clear_fails = driver.connect_fails = False       #plugged back in
+    WaitFor(lambda: connection.state == HEALTHY)
+    assert connection.read() == 'reading'
+
+def test_unopened_instrument_starts_reconnecting():
+    driver = ScriptedDriver()
+    driver.connect_fails = True
+    sensor = {'labID': 'test', 'port': '/dev/ttyUSB9', 'address': 1}
+    connection = InstrConnection('test', None, driver, sensor, threading.Lock(), backoff=(0.01, 0.02), jitter=0, settle=0)
+    assert connection.state == RECONNECTING and connection.read() is None
+    driver.connect_fails = False
+    WaitFor(lambda: connection.state == HEALTHY)
+    assert connection.read() == 'reading'
@@ -0,0 +1,117 @@
+"""
+The SMTP session is reused, reopened when NOOP finds it closed or a reused session drops a message, and closed by expire() once idle
+"""
+import time
+import smtplib
+import pytest
+from email.mime.text import MIMEText
+from MailTransport import MailTransport
+
+class Server:
+    """
+    smtplib.SMTP stand-in, noop and sendmail fail while the server has closed the session
+    """
+    sessions = []
+    down = False                                                                #new sessions are closed straight away
+
+    def __init__(self, address, port, timeout=None):
+        self.closed = Server.down
+        self.quits = 0
+        self.sent = []
+        self.noops = 0
+        Server.sessions.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        pass
+
+    def noop(self):
+        self.noops += 1
+        if self.closed:
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        return (250, b'OK')
+
+    def sendmail(self, fromaddress, toaddress, msg):
+        if self.closed:
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        self.sent.append(toaddress)
+
+    def quit(self):
+        if self.closed:
+            raise smtplib.SMTPServerDisconnected('please run connect() first')
+        self.quits += 1
+
+    def close(self):
+        pass
+
+class Clock:
+    """
+    Monotonic clock that only moves when advanced
+    """
+    now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    Server.sessions = []
+    Server.down = False
+    monkeypatch.setattr(smtplib, 'SMTP', Server)
+    clock = Clock()
+    monkeypatch.setattr(time, 'monotonic', clock.monotonic)
+    return clock
+
+def Send(transport, toaddress):
+    transport.send('lemas@example.com', toaddress, MIMEText('alert'))
+
+def test_reused(clock):
+    transport = MailTransport('smtp.example.com', 587, 'lemas', 'secret')
+    Send(transport, 'a@example.com')
+    clock.now += 5
+    Send(transport, 'b@example.com')
+    session, = Server.sessions
+    assert session.sent == ['a@example.com', 'b@example.com']
+    assert session.noops == 0                                                   #used within check_after seconds
+
+def test_reconnect_after_noop(clock):
+    transport = MailTransport('smtp.example.com', 587)
+    Send(transport, 'a@example.com')
+    Server.sessions[0].closed = True                                            #server dropped the idle client
+    clock.now += 60
+    Send(transport, 'b@example.com')
+    first, second = Server.sessions
+    assert first.noops == 1
+    assert first.sent == ['a@example.com'] and second.sent == ['b@example.com']
+
+def test_reconnect_after_send(clock):
+    transport = MailTransport('smtp.example.com', 587)
+    Send(transport, 'a@example.com')
+    Server.sessions[0].closed = True
+    clock.now += 5                                                              #not checked with NOOP
+    Send(transport, 'b@example.com')
+    first, second = Server.sessions
+    assert second.sent == ['b@example.com']
+
+def test_fresh_session_fails(clock):
+    transport = MailTransport('smtp.example.com', 587)
+    Server.down = True
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        Send(transport, 'a@example.com')
+    assert len(Server.sessions) == 1                                            #no second attempt on a fresh session
+    assert transport.server is None
+
+def test_expire(clock):
+    transport = MailTransport('smtp.example.com', 587, keepalive=300)
+    Send(transport, 'a@example.com')
+    clock.now += 200
+    transport.expire()
+    assert transport.server is not None
+    clock.now += 200
+    transport.expire()
+    assert transport.server is None
+    assert Server.sessions[0].quits == 1
+    Send(transport, 'b@example.com')
+    assert len(Server.sessions) == 2
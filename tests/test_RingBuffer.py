@@ -0,0 +1,45 @@
+"""
+The rolling minimum and maximum match the window as it wraps around, with gaps and for the buckets of a MinMaxBuffer
+"""
+import math
+import numpy as np
+from RingBuffer import RingBuffer, MinMaxBuffer
+
+def Values(count, seed):
+    values = 20 + np.random.RandomState(seed).randn(count)
+    values[3::7] = np.nan                                                       #gaps
+    return values
+
+def test_wraparound():
+    window = RingBuffer(50, 'temperature', 'humidity')
+    values = Values(170, 1)
+    for i, value in enumerate(values):
+        window.append(i, value, -value)
+        last = values[max(i - 49, 0):i + 1]
+        assert len(window) == len(last)
+        assert (window['time'] == np.arange(max(i - 49, 0), i + 1)).all()
+        assert np.array_equal(window['temperature'], last, equal_nan=True)
+        assert window.min('temperature') == np.nanmin(last)
+        assert window.max('temperature') == np.nanmax(last)
+        assert window.min('humidity') == -np.nanmax(last)
+
+def test_gaps_only():
+    window = RingBuffer(3, 'temperature')
+    window.append(0, 20.0)
+    for i in range(1, 4):
+        window.append(i, math.nan)
+    assert math.isnan(window.min('temperature')) and math.isnan(window.max('temperature'))
+    window.append(4, 21.0)
+    assert window.min('temperature') == window.max('temperature') == 21.0
+
+def test_minmax_buckets():
+    window = MinMaxBuffer(10, 60, 'temperature')                                #5 closed buckets of a minute
+    values = Values(300, 2)
+    for i, value in enumerate(values):
+        timestamp = 10*i                                                        #6 samples a bucket
+        window.append(timestamp, value)
+        first = max(timestamp//60 - 5, 0)*60                                    #start of the oldest bucket in the window
+        kept = values[first//10:i + 1]
+        assert window.min('temperature') == np.nanmin(kept)
+        assert window.max('temperature') == np.nanmax(kept)
+        assert window['time'][-1] == timestamp
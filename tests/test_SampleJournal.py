@@ -0,0 +1,99 @@
+"""
+Journal recovery after a crash, and replaying recovered samples into the logs without repeating rows
+"""
+import time
+from Pipeline import Sample
+from InstrInterface import EnvReading
+from SensorPoller import SensorReading
+from SampleJournal import SampleJournal
+from CSVAppender import CSVAppender
+from EnvArchive import Compress, ReadRows
+
+START = time.mktime((2017, 7, 15, 12, 0, 0, 0, 0, -1))
+
+def Journal(path, samples, state=None):
+    """
+    Journal samples and state, then drop the journal as a crash would
+    """
+    journal = SampleJournal(str(path))
+    journal.recover()
+    journal.checkpoint()
+    for timestamp in samples:
+        journal.add_sample(Sample(timestamp, 20.0, 40.0, 0, []))
+    if state is not None:
+        journal.add_state(state)
+    journal.journalfile.close()
+    return SampleJournal(str(path))
+
+def Replay(log, samples):
+    log.replaying = True
+    for sample in samples:
+        log.append(sample.timestamp, ',%.2f,%.2f' % (sample.temperature, sample.humidity))
+    log.replaying = False
+    log.flush()
+
+def test_recover_samples_and_state(tmp_path):
+    journal = Journal(tmp_path/'LEMAS.journal', [START, START + 60], {'labstatus_T': 'outage'})
+    samples, state = journal.recover()
+    assert [sample.timestamp for sample in samples] == [START, START + 60]
+    assert state == {'labstatus_T': 'outage'}
+
+def test_torn_record_is_discarded(tmp_path):
+    journal = Journal(tmp_path/'LEMAS.journal', [START, START + 60])
+    with open(str(tmp_path/'LEMAS.journal'), 'r+b') as fout:
+        fout.truncate(fout.seek(0, 2) - 3)                                      #power lost while writing the last record
+    samples, state = journal.recover()
+    assert [sample.timestamp for sample in samples] == [START]
+
+def test_large_state(tmp_path):
+    state = {'events': {'T': ['x'*100]*1000}}                                   #more than 64 kB of outage events
+    journal = Journal(tmp_path/'LEMAS.journal', [], state)
+    assert journal.recover()[1] == state
+    journal.checkpoint()
+    journal.close()
+    assert SampleJournal(str(tmp_path/'LEMAS.journal')).recover()[1] == state
+
+def test_replay_skips_rows_in_the_log(tmp_path):
+    log = CSVAppender(str(tmp_path), '-all.env.csv', 'time,a,b')
+    log.append(START, ',20.00,40.00')                                           #reached the log before the crash
+    log.close()
+    samples, state = Journal(tmp_path/'LEMAS.journal', [START, START + 60]).recover()
+    Replay(log, samples)
+    log.close()
+    assert [row[0][-5:] for row in ReadRows(str(tmp_path), 'July2017')] == ['00:00', '01:00']
+
+def test_replay_skips_rows_in_an_archived_log(tmp_path):
+    log = CSVAppender(str(tmp_path), '-all.env.csv', 'time,a,b')
+    log.append(START, ',20.00,40.00')
+    log.close()
+    Compress(str(tmp_path/'July2017-all.env.csv'), pause=0)
+    samples, state = Journal(tmp_path/'LEMAS.journal', [START, START + 60]).recover()
+    Replay(log, samples)
+    log.close()
+    assert [row[0][-5:] for row in ReadRows(str(tmp_path), 'July2017')] == ['00:00', '01:00']
+
+def test_replay_reads_the_log_once(tmp_path, monkeypatch):
+    log = CSVAppender(str(tmp_path), '-all.env.csv', 'time,a,b')
+    reads = []
+    last_time = log.last_time
+    monkeypatch.setattr(log, 'last_time', lambda timestamp: reads.append(timestamp) or last_time(timestamp))
+    samples, state = Journal(tmp_path/'LEMAS.journal', [START + 60*i for i in range(100)]).recover()
+    Replay(log, samples)
+    assert len(reads) == 1
+    Replay(log, samples)                                                        #a later replay sees the rows written by this one
+    log.close()
+    assert len(reads) == 2
+    assert len(list(ReadRows(str(tmp_path), 'July2017'))) == 100
+
+def test_recover_batch_of_additional_sensors(tmp_path):
+    batch = [SensorReading('219/G032', '/dev/ttyUSB0', 1, '123', EnvReading(20.0, 40.0, (680, 400), START), 'healthy'),
+             SensorReading('219/G033', '/dev/ttyUSB0', 2, '', None, 'reconnecting')] #a gap of the second sensor
+    journal = SampleJournal(str(tmp_path/'LEMAS.journal'))
+    journal.recover()
+    journal.checkpoint()
+    journal.add_sample(Sample(START, 20.0, 40.0, 0, batch))
+    journal.add_sample(Sample(START + 60, 20.0, 40.0, 0, batch[:1]))            #primary sensor only, not journaled
+    journal.journalfile.close()
+    samples, state = SampleJournal(str(tmp_path/'LEMAS.journal')).recover()
+    assert samples[0].batch == batch
+    assert samples[1].batch == []
@@ -0,0 +1,66 @@
+"""
+Ticks stay on the deadline grid: an overrun drops the missed ticks with the skip policy and runs them back to back with catchup
+"""
+import time
+import pytest
+from Scheduler import SampleScheduler, CATCHUP, SKIP
+
+class Clock:
+    """
+    Monotonic clock that only moves when slept on or advanced
+    """
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(time, 'sleep', clock.sleep)
+    return clock
+
+def test_no_drift(clock):
+    scheduler = SampleScheduler(10)
+    for i in range(5):
+        clock.now += 3                                                          #work
+        assert scheduler.wait() == 0
+    assert clock.now == 1050
+    assert scheduler.report().skipped == 0
+
+def test_skip(clock):
+    scheduler = SampleScheduler(10, SKIP)
+    clock.now += 25                                                             #ran past the deadlines at 10 and 20
+    scheduler.wait()
+    assert clock.now == 1030
+    clock.now += 1
+    scheduler.wait()
+    assert clock.now == 1040
+    report = scheduler.report()
+    assert (report.ticks, report.skipped, report.overruns) == (2, 2, 1)
+
+def test_catchup(clock):
+    scheduler = SampleScheduler(10, CATCHUP)
+    clock.now += 25
+    scheduler.wait()                                                            #due at 10, runs now
+    assert clock.now == 1025
+    clock.now += 1
+    scheduler.wait()                                                            #due at 20, runs now
+    assert clock.now == 1026
+    clock.now += 1
+    scheduler.wait()                                                            #back on the grid
+    assert clock.now == 1030
+    report = scheduler.report()
+    assert (report.ticks, report.skipped, report.overruns) == (3, 0, 2)
+    assert report.jitter_max == 15
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        SampleScheduler(10, 'later')
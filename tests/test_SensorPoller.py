@@ -0,0 +1,68 @@
+"""
+PollingEngine with a driver whose port cannot be opened, and a port that falls behind
+"""
+import sys
+import time
+import types
+from SensorDrivers import RegisterDriver
+from SensorPoller import PollingEngine
+from InstrRecovery import RECONNECTING
+
+def FakeDriver(name, connect_fails=False, read_delay=0):
+    """
+    Register a driver module built in memory, SensorDrivers imports it through sys.modules
+    """
+    module = types.ModuleType(name)
+    def Connect(port, address, sensor):
+        if connect_fails:
+            raise IOError('could not open port '+port)
+        return object()
+    def Read(instr_obj, sensor):
+        module.reads += 1
+        time.sleep(read_delay)
+        return 'reading'
+    module.reads = 0
+    module.Connect = Connect
+    module.Read = Read
+    module.Clear = lambda instr_obj, sensor: instr_obj
+    sys.modules[name] = module
+    RegisterDriver(name, name)
+    return name
+
+def Sensor(port, driver):
+    return {'labID': port, 'port': port, 'address': 1, 'serial': '0', 'driver': driver}
+
+def test_unopened_port_reports_reconnecting_without_waiting():
+    engine = PollingEngine([Sensor('/dev/missing', FakeDriver('test_missing_driver', connect_fails=True)), Sensor('/dev/good', FakeDriver('test_good_driver'))],
+                           timeout=10, backoff=(60, 60))
+    started = time.monotonic()
+    missing, good = engine.poll()
+    assert time.monotonic() - started < 5                                       #the worker is alive and answered
+    assert (missing.reading is None) and (missing.state == RECONNECTING)
+    assert good.reading == 'reading'
+    assert all(worker.is_alive() for worker in engine.workers)
+    engine.close()
+
+def test_slow_port_is_reported_unread_on_time():
+    engine = PollingEngine([Sensor('/dev/slow2', FakeDriver('test_slow2_driver', read_delay=0.3)), Sensor('/dev/fast', FakeDriver('test_fast_driver'))], timeout=0.05)
+    engine.poll()                                                               #first tick connects
+    time.sleep(0.5)
+    started = time.monotonic()
+    slow, fast = engine.poll()
+    assert time.monotonic() - started < 0.25                                    #waited about the tick timeout, not for the slow read
+    assert (slow.reading is None) and (fast.reading == 'reading')
+    time.sleep(0.5)                                                             #the slow batch of that tick arrives late
+    slow, fast = engine.poll()
+    assert (slow.reading is None) and (fast.reading == 'reading')               #late batch is discarded, not taken for this tick
+    engine.close()
+
+def test_slow_port_does_not_build_a_backlog():
+    driver = FakeDriver('test_slow_driver', read_delay=0.3)
+    engine = PollingEngine([Sensor('/dev/slow', driver)], timeout=0.01)
+    for tick in range(20):
+        engine.poll()                                                           #times out, the port keeps at most its backlog of ticks
+    time.sleep(1.5)                                                             #let the port finish what it was given
+    reads = sys.modules[driver].reads
+    time.sleep(0.6)
+    assert sys.modules[driver].reads == reads <= 5                              #idle again, not working off one read per tick
+    engine.close()
@@ -0,0 +1,44 @@
+"""
+The Hampel filter replaces a lone spike by the window median, passes noise and gaps, and follows a real step change
+"""
+import math
+from SpikeFilter import HampelFilter, MedianOfN
+
+NOISE = [20.0, 20.1, 19.9, 20.05, 19.95, 20.1, 20.0]
+
+def test_spike_rejected():
+    hampel = HampelFilter(7, 3, 0.5)
+    for value in NOISE:
+        assert hampel.filter(value) == (value, False)
+    value, rejected = hampel.filter(35.0)
+    assert rejected
+    assert 19.9 <= value <= 20.1                                                #the median of the window
+    assert hampel.filter(20.0) == (20.0, False)
+
+def test_floor():
+    hampel = HampelFilter(7, 3, 0.5)
+    for value in [20.0]*7:
+        hampel.filter(value)
+    assert hampel.filter(20.3) == (20.3, False)                                 #a flat signal has a MAD of 0
+    assert hampel.filter(21.0)[1]
+
+def test_gap_passes():
+    hampel = HampelFilter(7, 3, 0.5)
+    for value in NOISE:
+        hampel.filter(value)
+    value, rejected = hampel.filter(float('nan'))
+    assert math.isnan(value) and not rejected
+    assert len(hampel.values) == 7
+
+def test_step_accepted():
+    hampel = HampelFilter(7, 3, 0.5)
+    for value in NOISE:
+        hampel.filter(value)
+    results = [hampel.filter(25.0) for i in range(7)]
+    assert results[0][1]
+    assert results[-1] == (25.0, False)
+    assert sum(rejected for value, rejected in results) <= 3                    #accepted once it fills half the window
+
+def test_median_of_n():
+    assert MedianOfN([20.0, 20.1, 35.0], 0.5) == (20.1, True)
+    assert MedianOfN([20.0, 20.1, 19.9], 0.5) == (20.0, False)